@@ -0,0 +1,142 @@
+"""
+データモデルのメモリ使用量ベンチマーク
+
+合成データを全件読み込んでパースしたときのピークRSSを、
+従来の __dict__ を持つ dataclass と現在の __slots__ 版で比較する。
+各計測は別プロセスで行い、インタープリターのみのRSSを差し引いて表示する。
+
+使用方法:
+    python -m benchmarks.bench_models_memory --employees 100000
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from benchmarks.synthetic_data import SyntheticPayrollGenerator
+from src.data.csv_reader import CsvReader
+
+
+@dataclass
+class LegacyKyuyoMeisaiItem:
+    """比較用: 変更前の給与明細項目（__dict__ を持つ dataclass）"""
+    final_value: Any
+    kyuyo_komoku_code: str
+    kyuyo_komoku_kubun: str
+    kyuyo_komoku_name: str
+    order: int
+    process_value: Any
+
+
+@dataclass
+class LegacyKyuyoRecord:
+    """比較用: 変更前の給与レコード（__dict__ を持つ dataclass）"""
+    record_id: str
+    shain_id: str
+    shain_name: str
+    keisan_nengetsu: str
+    shori_nengetsu: str
+    getsu_kyuyo_result_meisai_list: List[LegacyKyuyoMeisaiItem]
+
+
+def _load_legacy(input_path: str) -> list:
+    """変更前のモデルで全件を読み込む"""
+    records = []
+    with open(input_path, 'r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            items = [
+                LegacyKyuyoMeisaiItem(
+                    final_value=item.get('finalValue'),
+                    kyuyo_komoku_code=item.get('kyuyoKomokuCode', ''),
+                    kyuyo_komoku_kubun=item.get('kyuyoKomokuKubun', ''),
+                    kyuyo_komoku_name=item.get('kyuyoKomokuName', ''),
+                    order=item.get('order', 0),
+                    process_value=item.get('processValue')
+                )
+                for item in json.loads(row.get('getsuKyuyoResultMeisaiList', '[]'))
+            ]
+            records.append(LegacyKyuyoRecord(
+                record_id=row.get('__id__', ''),
+                shain_id=row.get('shainId', ''),
+                shain_name=row.get('shainName', ''),
+                keisan_nengetsu=row.get('keisanNengetsu', ''),
+                shori_nengetsu=row.get('shoriNengetsu', ''),
+                getsu_kyuyo_result_meisai_list=items
+            ))
+    return records
+
+
+def _load_slotted(input_path: str) -> list:
+    """現在のモデルで全件を読み込んでパースする（変更前のモデルと同じく読み込み時にパース）"""
+    records = []
+    for record in CsvReader.iter_csv(input_path):
+        record.get_meisai_list()
+        records.append(record)
+    return records
+
+
+def _peak_rss_bytes() -> int:
+    """現在のプロセスのピークRSSをバイト単位で取得"""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _run_child(variant: str, input_path: str) -> None:
+    """子プロセスとして1つのバリアントを計測して結果をJSONで出力"""
+    loaders = {'legacy': _load_legacy, 'slotted': _load_slotted, 'baseline': lambda path: []}
+    records = loaders[variant](input_path)
+    print(json.dumps({'variant': variant, 'records': len(records), 'peak_rss': _peak_rss_bytes()}))
+
+
+def _measure(variant: str, input_path: str) -> Dict[str, Any]:
+    """別プロセスで計測を実行"""
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_models_memory', '--child', variant, '--input', input_path],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='データモデルのメモリ使用量ベンチマーク')
+    parser.add_argument('--employees', type=int, default=100000, help='社員数（デフォルト: 100000）')
+    parser.add_argument('--items', type=int, default=185, help='社員あたりの給与項目数（デフォルト: 185）')
+    parser.add_argument('--input', type=str, help='既存の入力CSV（指定しない場合は合成データを生成）')
+    parser.add_argument('--child', choices=['legacy', 'slotted', 'baseline'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child(args.child, args.input)
+        return
+
+    with tempfile.TemporaryDirectory(prefix='bench_models_') as work_dir:
+        input_path = args.input
+        if input_path is None:
+            input_path = os.path.join(work_dir, 'snapshot.csv')
+            print(f"合成データを生成中... (社員数: {args.employees:,}, 項目数: {args.items})")
+            SyntheticPayrollGenerator(args.employees, args.items).write_csv(input_path)
+
+        baseline = _measure('baseline', input_path)['peak_rss']
+        results = [_measure(variant, input_path) for variant in ('legacy', 'slotted')]
+
+    print(f"\n{'モデル':<10}{'レコード数':>12}{'ピークRSS(MB)':>16}")
+    for result in results:
+        peak_mb = (result['peak_rss'] - baseline) / 1024 / 1024
+        print(f"{result['variant']:<10}{result['records']:>12,}{peak_mb:>16,.1f}")
+
+    legacy, slotted = (result['peak_rss'] - baseline for result in results)
+    if legacy > 0:
+        print(f"\n削減率: {(1 - slotted / legacy) * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+処理段階ごとの性能ベンチマーク
+
+合成データで変更前・変更後のCSVを生成し、
+読み込み（CsvReader.read_csv）、比較（ComparisonService.compare_records）、
+CSV出力（集約CSV）、サマリー集計（SummaryAggregator）、HTML生成（HtmlGenerator）の
+各段階の経過時間とCPU時間を規模ごとに計測してJSONに保存する。
+読み込み時は明細JSONを展開しないため、JSONのパースは比較段階に含まれる。
+
+使用方法:
+    python -m benchmarks.bench_stages --scales 1000 10000 --output results.json
+    python -m benchmarks.bench_stages --scales 1000 --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.synthetic_data import SyntheticPayrollGenerator, parse_ratios
+from src.business.comparison_service import ComparisonService
+from src.business.html_report_service import HtmlReportService
+from src.business.summary_aggregator import SummaryAggregator
+from src.data.consolidated_csv_writer import ConsolidatedCsvWriter
+from src.data.csv_reader import CsvReader
+from src.presentation.html_generator import HtmlGenerator
+from src.presentation.virtual_html_generator import HTML_MODES, VirtualTableHtmlGenerator
+
+
+DEFAULT_SCALES = (1000, 10000, 100000, 1000000)
+STAGES = ('read', 'compare', 'csv_write', 'summary', 'html')
+
+# 既定の不一致の割合（項目ごと）
+DEFAULT_MISMATCH_RATIOS = {'finalValue': 0.01, 'processValue': 0.005, 'order': 0.001}
+
+
+def _timed(function: Callable[[], Any]) -> Dict[str, Any]:
+    """関数を実行して経過時間とCPU時間を計測"""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    value = function()
+    return {
+        'value': value,
+        'wall_seconds': time.perf_counter() - wall_start,
+        'cpu_seconds': time.process_time() - cpu_start,
+    }
+
+
+def run_scale(
+    employees: int,
+    items: int,
+    mismatch_ratios: Dict[str, float],
+    reorder_ratio: float,
+    html_mode: str,
+    work_dir: str
+) -> Dict[str, Any]:
+    """
+    1つの規模で全段階を計測する
+
+    Args:
+        employees: 社員数
+        items: 社員あたりの給与項目数
+        mismatch_ratios: フィールド → 不一致の割合
+        reorder_ratio: 並び順を入れ替える社員の割合
+        html_mode: HTMLの表示形式
+        work_dir: 入出力ファイルを置くディレクトリ
+
+    Returns:
+        規模ごとの計測結果
+    """
+    before_path = os.path.join(work_dir, f'before_{employees}.csv')
+    after_path = os.path.join(work_dir, f'after_{employees}.csv')
+    output_dir = os.path.join(work_dir, f'output_{employees}')
+
+    print(f"\n合成データを生成中... (社員数: {employees:,}, 項目数: {items})")
+    SyntheticPayrollGenerator(employees, items, 0, mismatch_ratios, reorder_ratio).write_pair(
+        before_path, after_path
+    )
+
+    service = ComparisonService()
+    aggregator = SummaryAggregator(service.comparison_fields)
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    def read():
+        return CsvReader.read_csv(before_path), CsvReader.read_csv(after_path)
+
+    stages['read'] = _timed(read)
+    before_records, after_records = stages['read']['value']
+
+    stages['compare'] = _timed(lambda: service.compare_records(before_records, after_records))
+    results = stages['compare']['value']
+
+    def write_csv():
+        with ConsolidatedCsvWriter(output_dir, service.get_csv_fieldnames()) as writer:
+            for result in results:
+                writer.write_record(result.record_id, service.generate_comparison_csv_data([result]))
+
+    def summarize():
+        for result in results:
+            aggregator.add_result(result)
+        return aggregator.get_summary()
+
+    def render_html():
+        report_data = HtmlReportService().generate_html_report_data_from_aggregator(
+            aggregator, os.path.basename(before_path), os.path.basename(after_path)
+        )
+        generator = VirtualTableHtmlGenerator() if html_mode == 'virtual' else HtmlGenerator()
+        generator.generate_html_report(report_data, os.path.join(work_dir, f'report_{employees}.html'))
+
+    stages['csv_write'] = _timed(write_csv)
+    stages['summary'] = _timed(summarize)
+    stages['html'] = _timed(render_html)
+
+    summary = stages['summary']['value']
+    aggregator.close()
+
+    result = {
+        'employees': employees,
+        'items_per_employee': items,
+        'total_items': summary['total_items'],
+        'total_mismatches': summary['total_mismatches'],
+        'stages': {},
+    }
+    for stage in STAGES:
+        wall_seconds = stages[stage]['wall_seconds']
+        result['stages'][stage] = {
+            'wall_seconds': round(wall_seconds, 4),
+            'cpu_seconds': round(stages[stage]['cpu_seconds'], 4),
+            'records_per_second': round(employees / wall_seconds, 1) if wall_seconds > 0 else None,
+            'items_per_second': round(summary['total_items'] / wall_seconds, 1) if wall_seconds > 0 else None,
+        }
+
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    """計測したソースのコミットを取得（gitが使えない場合はNone）"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_results(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Any]]) -> None:
+    """計測結果を表形式で表示（baseline を指定した場合は比率も表示）"""
+    baseline_by_scale = {
+        result['employees']: result for result in (baseline or {}).get('results', [])
+    }
+
+    header = f"\n{'社員数':>10}{'段階':>12}{'経過時間(秒)':>14}{'CPU時間(秒)':>14}{'レコード/秒':>14}"
+    if baseline is not None:
+        header += f"{'前回比':>10}"
+    print(header)
+
+    for result in results:
+        previous = baseline_by_scale.get(result['employees'])
+        for stage, metrics in result['stages'].items():
+            line = (
+                f"{result['employees']:>10,}{stage:>12}{metrics['wall_seconds']:>14.3f}"
+                f"{metrics['cpu_seconds']:>14.3f}{metrics['records_per_second'] or 0:>14,.0f}"
+            )
+            if previous is not None and stage in previous['stages']:
+                previous_seconds = previous['stages'][stage]['wall_seconds']
+                if previous_seconds > 0:
+                    line += f"{metrics['wall_seconds'] / previous_seconds:>9.2f}x"
+            print(line)
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='処理段階ごとの性能ベンチマーク')
+    parser.add_argument(
+        '--scales', type=int, nargs='+', default=list(DEFAULT_SCALES),
+        help='計測する社員数（デフォルト: 1000 10000 100000 1000000）'
+    )
+    parser.add_argument('--items', type=int, default=185, help='社員あたりの給与項目数（デフォルト: 185）')
+    parser.add_argument(
+        '--mismatch', action='append', metavar='FIELD=RATIO',
+        help='変更後の値を変える項目の割合（デフォルト: finalValue=0.01, processValue=0.005, order=0.001）'
+    )
+    parser.add_argument('--reorder-ratio', type=float, default=0.01, help='並び順を入れ替える社員の割合（デフォルト: 0.01）')
+    parser.add_argument('--html-mode', choices=HTML_MODES, default='table', help='HTMLの表示形式（デフォルト: table）')
+    parser.add_argument('--output', type=str, help='計測結果のJSONファイル（デフォルト: bench_stages_<日時>.json）')
+    parser.add_argument('--baseline', type=str, help='比較対象とする過去の計測結果のJSONファイル')
+    parser.add_argument('--work-dir', type=str, help='入出力ファイルを置くディレクトリ（デフォルト: 一時ディレクトリ）')
+    args = parser.parse_args()
+
+    mismatch_ratios = parse_ratios(args.mismatch) if args.mismatch else dict(DEFAULT_MISMATCH_RATIOS)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench_stages_', dir=args.work_dir) as work_dir:
+        for employees in args.scales:
+            results.append(run_scale(
+                employees, args.items, mismatch_ratios, args.reorder_ratio, args.html_mode, work_dir
+            ))
+
+    report = {
+        'benchmark': 'bench_stages',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'config': {
+            'items_per_employee': args.items,
+            'mismatch_ratios': mismatch_ratios,
+            'reorder_ratio': args.reorder_ratio,
+            'html_mode': args.html_mode,
+        },
+        'results': results,
+    }
+
+    output_path = args.output or f"bench_stages_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+    _print_results(results, baseline)
+    print(f"\n計測結果: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
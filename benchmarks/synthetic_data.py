@@ -0,0 +1,246 @@
+"""
+合成給与データ生成器
+
+本番データを使わずに性能を計測するため、getsuKyuyoMeisai形式の
+変更前・変更後のCSVを決定的に（同じ引数なら常に同じ内容で）生成する。
+
+使用方法:
+    python -m benchmarks.synthetic_data --employees 10000 \
+        --before before.csv --after after.csv \
+        --mismatch finalValue=0.01 --mismatch order=0.001 --reorder-ratio 0.05
+"""
+import argparse
+import csv
+import json
+import random
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.data.models import KyuyoRecord
+
+
+# 生成するスナップショットの種類
+SNAPSHOTS = ('before', 'after')
+
+
+class SyntheticPayrollGenerator:
+    """合成給与データ生成クラス
+
+    変更後のスナップショットは変更前と同じ項目から作り、
+    mismatch_ratios の割合で各フィールドの値を変更し、
+    reorder_ratio の割合の社員は項目の並び順を入れ替える（order も振り直す）。
+    kyuyoKomokuCode は項目の突き合わせに使うため変更対象にできない。
+    """
+
+    KUBUN_VALUES = ('支給', '控除', '勤怠', '合計')
+
+    # 値を変更できるフィールド
+    MUTABLE_FIELDS = ('finalValue', 'kyuyoKomokuKubun', 'kyuyoKomokuName', 'order', 'processValue')
+
+    def __init__(
+        self,
+        employees: int,
+        items_per_employee: int = 185,
+        seed: int = 0,
+        mismatch_ratios: Optional[Dict[str, float]] = None,
+        reorder_ratio: float = 0.0
+    ):
+        """
+        Args:
+            employees: 社員数
+            items_per_employee: 社員あたりの給与項目数
+            seed: 乱数のシード
+            mismatch_ratios: フィールド → 変更後の値を変える項目の割合（0〜1）
+            reorder_ratio: 変更後の項目の並び順を入れ替える社員の割合（0〜1）
+        """
+        if employees < 0:
+            raise ValueError(f"employeesは0以上を指定してください: {employees}")
+        if items_per_employee < 1:
+            raise ValueError(f"items_per_employeeは1以上を指定してください: {items_per_employee}")
+        for field, ratio in (mismatch_ratios or {}).items():
+            if field not in self.MUTABLE_FIELDS:
+                raise ValueError(
+                    f"変更できないフィールドです: {field}（指定可能: {', '.join(self.MUTABLE_FIELDS)}）"
+                )
+            if not 0 <= ratio <= 1:
+                raise ValueError(f"不一致の割合は0〜1を指定してください: {field}={ratio}")
+        if not 0 <= reorder_ratio <= 1:
+            raise ValueError(f"reorder_ratioは0〜1を指定してください: {reorder_ratio}")
+
+        self.employees = employees
+        self.items_per_employee = items_per_employee
+        self.seed = seed
+        self.mismatch_ratios = dict(mismatch_ratios or {})
+        self.reorder_ratio = reorder_ratio
+
+        # 給与項目のマスタは全社員で共通
+        self.item_master = [
+            (f"K{code:04d}", self.KUBUN_VALUES[code % len(self.KUBUN_VALUES)], f"給与項目{code:04d}")
+            for code in range(1, items_per_employee + 1)
+        ]
+
+    def iter_rows(self, snapshot: str = 'before') -> Iterator[Dict[str, str]]:
+        """
+        CSVの行を順に生成する
+
+        Args:
+            snapshot: 'before'（変更前）または 'after'（変更後）
+
+        Returns:
+            KyuyoRecord.CSV_COLUMNS をキーとする辞書のイテレーター
+        """
+        if snapshot not in SNAPSHOTS:
+            raise ValueError(f"不明なスナップショットです: {snapshot}")
+
+        for index in range(self.employees):
+            items = self._generate_items(index)
+            if snapshot == 'after':
+                items = self._mutate_items(index, items)
+            yield self._build_row(index, items)
+
+    def write_csv(self, output_path: str, snapshot: str = 'before') -> None:
+        """
+        CSVファイルを生成する
+
+        Args:
+            output_path: 出力ファイルのパス
+            snapshot: 'before'（変更前）または 'after'（変更後）
+        """
+        self._write_rows(output_path, self.iter_rows(snapshot))
+
+    def write_pair(self, before_path: str, after_path: str) -> None:
+        """
+        変更前・変更後のCSVファイルを生成する
+
+        Args:
+            before_path: 変更前ファイルのパス
+            after_path: 変更後ファイルのパス
+        """
+        self.write_csv(before_path, 'before')
+        self.write_csv(after_path, 'after')
+
+    def _write_rows(self, output_path: str, rows: Iterable[Dict[str, str]]) -> None:
+        """CSVの行をファイルに書き込む"""
+        with open(output_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=KyuyoRecord.CSV_COLUMNS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+
+    def _random_for(self, index: int, purpose: str = '') -> random.Random:
+        """社員ごとに独立した乱数生成器を取得"""
+        if purpose:
+            return random.Random(f"{self.seed}:{index}:{purpose}")
+        return random.Random(f"{self.seed}:{index}")
+
+    def _generate_items(self, index: int) -> List[Dict]:
+        """1社員分の給与明細項目を生成"""
+        rng = self._random_for(index)
+        items = []
+
+        for order, (code, kubun, name) in enumerate(self.item_master, start=1):
+            final_value = rng.randrange(0, 500000)
+            items.append({
+                'finalValue': final_value,
+                'kyuyoKomokuCode': code,
+                'kyuyoKomokuKubun': kubun,
+                'kyuyoKomokuName': name,
+                'order': order,
+                'processValue': None if order % 5 == 0 else final_value
+            })
+
+        return items
+
+    def _mutate_items(self, index: int, items: List[Dict]) -> List[Dict]:
+        """1社員分の給与明細項目から変更後の項目を作成"""
+        # 変更前と同じ項目が生成されるよう、変更後専用の乱数生成器を使う
+        rng = self._random_for(index, 'after')
+
+        if self.reorder_ratio and rng.random() < self.reorder_ratio:
+            rng.shuffle(items)
+            for order, item in enumerate(items, start=1):
+                item['order'] = order
+
+        for item in items:
+            for field, ratio in self.mismatch_ratios.items():
+                if ratio and rng.random() < ratio:
+                    item[field] = self._changed_value(field, item[field], rng)
+
+        return items
+
+    def _changed_value(self, field: str, value, rng: random.Random):
+        """変更前と必ず異なる値を生成"""
+        if field == 'finalValue':
+            return value + rng.randrange(1, 10000)
+        if field == 'processValue':
+            return rng.randrange(0, 500000) if value is None else None
+        if field == 'kyuyoKomokuKubun':
+            return self.KUBUN_VALUES[(self.KUBUN_VALUES.index(value) + 1) % len(self.KUBUN_VALUES)]
+        if field == 'kyuyoKomokuName':
+            return f"{value}（変更）"
+        # order
+        return value + self.items_per_employee
+
+    def _build_row(self, index: int, items: List[Dict]) -> Dict[str, str]:
+        """1社員分のCSV行を作成"""
+        return {
+            '__id__': f"doc{index:08d}",
+            'shainId': f"S{index:08d}",
+            'shainName': f"社員{index}",
+            'keisanNengetsu': '202501',
+            'shoriNengetsu': '202502',
+            'getsuKyuyoResultMeisaiList': json.dumps(items, ensure_ascii=False),
+        }
+
+
+def parse_ratios(values: Iterable[str]) -> Dict[str, float]:
+    """
+    "フィールド=割合" 形式の文字列を辞書に変換
+
+    Args:
+        values: "finalValue=0.01" 形式の文字列
+
+    Returns:
+        フィールド → 割合の辞書
+    """
+    ratios = {}
+    for value in values:
+        field, separator, ratio = value.partition('=')
+        if not separator:
+            raise ValueError(f"不一致の割合は フィールド=割合 の形式で指定してください: {value}")
+        try:
+            ratios[field.strip()] = float(ratio)
+        except ValueError:
+            raise ValueError(f"不一致の割合が数値ではありません: {value}")
+    return ratios
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='合成給与データ（変更前・変更後のCSV）を生成')
+    parser.add_argument('--employees', type=int, required=True, help='社員数')
+    parser.add_argument('--items', type=int, default=185, help='社員あたりの給与項目数（デフォルト: 185）')
+    parser.add_argument('--seed', type=int, default=0, help='乱数のシード（デフォルト: 0）')
+    parser.add_argument('--before', type=str, required=True, help='変更前CSVの出力パス')
+    parser.add_argument('--after', type=str, help='変更後CSVの出力パス（指定しない場合は変更前のみ生成）')
+    parser.add_argument(
+        '--mismatch', action='append', default=[], metavar='FIELD=RATIO',
+        help='変更後の値を変える項目の割合（例: finalValue=0.01、複数指定可）'
+    )
+    parser.add_argument(
+        '--reorder-ratio', type=float, default=0.0,
+        help='変更後の項目の並び順を入れ替える社員の割合（デフォルト: 0）'
+    )
+    args = parser.parse_args()
+
+    generator = SyntheticPayrollGenerator(
+        args.employees, args.items, args.seed, parse_ratios(args.mismatch), args.reorder_ratio
+    )
+    generator.write_csv(args.before, 'before')
+    print(f"変更前ファイルを生成しました: {args.before}")
+    if args.after:
+        generator.write_csv(args.after, 'after')
+        print(f"変更後ファイルを生成しました: {args.after}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,21 +4,69 @@
 
 使用方法:
     python main.py <before_file> <after_file> [output_dir]
+    python main.py compare <before_file> <after_file> [output_dir] [--record-id ID | --shain-id ID]
+    python main.py compare <before_file> <after_file> <shard_dir> --shard I/N
+    python main.py merge <shard_dir> [<shard_dir> ...] [--html]
+    python main.py series <snapshot_file> <snapshot_file> [<snapshot_file> ...] [--output-dir DIR]
+    python main.py index <csv_file> [<csv_file> ...]
+    python main.py serve <before_file> [--port PORT] [--queue-size N]
 
 例:
     python main.py source/before_getsuKyuyoMeisai-1760089647.csv source/after_getsuKyuyoMeisai-1760089701.csv
 """
 import sys
 import argparse
+import cProfile
+import json
+import os
+import pstats
+import time
 from pathlib import Path
+from typing import List, Optional, Tuple
 
 from src.presentation.array_diff_controller import ArrayDiffController
+from src.presentation.comparison_server import ComparisonServer
+from src.presentation.comparison_options import ComparisonOptions, OUTPUT_LAYOUTS, MISMATCHES_ONLY_MODES
+from src.presentation.html_generator import PAGE_BY_MODES
+from src.presentation.virtual_html_generator import HTML_MODES
+from src.data.compressed_file import COMPRESSIONS
+from src.data.csv_sorter import CsvSorter
+from src.business.comparison_rules import ComparisonRules, FieldRule
+from src.business.stage_metrics import StageMetrics
+from src.business.shard_summary import ShardSummary
+from src.data.models import ComparisonResult
+
+
+# サブコマンド（先頭の引数がこれ以外の場合は従来どおり compare として扱う）
+SUBCOMMANDS = ('compare', 'index', 'serve', 'merge', 'series')
 
 
 def main():
     """メイン関数"""
+    argv = sys.argv[1:]
+    if argv and argv[0] == 'index':
+        run_index(argv[1:])
+        return
+    if argv and argv[0] == 'serve':
+        run_serve(argv[1:])
+        return
+    if argv and argv[0] == 'merge':
+        run_merge(argv[1:])
+        return
+    if argv and argv[0] == 'series':
+        run_series(argv[1:])
+        return
+    is_compare = bool(argv) and argv[0] == 'compare'
+    if is_compare:
+        argv = argv[1:]
+    
     parser = argparse.ArgumentParser(
+        prog='main.py compare' if is_compare else None,
         description='配列差分比較ツール - getsuKyuyoResultMeisaiListの配列を比較して差分を検出します'
+                    '（入力CSVのインデックス作成は python main.py index、'
+                    '同じ変更前ファイルとの繰り返し比較は python main.py serve、'
+                    'シャードの部分サマリーの統合は python main.py merge、'
+                    '3つ以上の月次スナップショットの連続比較は python main.py series を参照）'
     )
     parser.add_argument(
         'before_file', 
@@ -49,18 +97,247 @@ def main():
         type=str,
         help='HTML出力ファイルパス（--htmlオプションと併用）'
     )
+    parser.add_argument(
+        '--html-page-size', 
+        type=int,
+        default=0,
+        help='不一致詳細を指定件数ごとの別ページに分割し、出力パスには目次ページを出力（デフォルト: 0 = 分割しない）'
+    )
+    parser.add_argument(
+        '--html-page-by', 
+        choices=PAGE_BY_MODES,
+        default='row',
+        help='--html-page-size の単位（row: 不一致の行数、record: レコード数。デフォルト: row）'
+    )
+    parser.add_argument(
+        '--html-mode', 
+        choices=HTML_MODES,
+        default='table',
+        help='不一致詳細の表示形式（table: 表として出力、virtual: JSONを埋め込み表示範囲の行だけを描画。デフォルト: table）'
+    )
+    parser.add_argument(
+        '--html-compress', 
+        action='store_true',
+        help='--html-mode virtual で埋め込むJSONを gzip + Base64 で圧縮（ブラウザで展開）'
+    )
+    parser.add_argument(
+        '--stream', 
+        action='store_true',
+        help='入力を1件ずつ読み進めてソートマージ結合で比較（入力は__id__順にソート済みであること）'
+    )
+    parser.add_argument(
+        '--external-sort', 
+        action='store_true',
+        help='入力を__id__順に外部ソートしてからストリーミング比較する'
+    )
+    parser.add_argument(
+        '--sort-chunk-size', 
+        type=int,
+        default=CsvSorter.DEFAULT_CHUNK_SIZE,
+        help=f'外部ソートで一度にメモリに載せる行数（デフォルト: {CsvSorter.DEFAULT_CHUNK_SIZE}）'
+    )
+    parser.add_argument(
+        '--external-join', 
+        action='store_true',
+        help='入力を__id__のハッシュで一時ファイルに分割し、パーティションの組ごとに比較する（メモリに載らない未ソートの入力向け）'
+    )
+    parser.add_argument(
+        '--memory-budget-mb', 
+        type=int,
+        default=1024,
+        help='--external-join で1つのパーティションの組を比較するときのメモリ上限（MB、デフォルト: 1024）'
+    )
+    parser.add_argument(
+        '--workers', 
+        type=int,
+        default=1,
+        help='比較処理に使用するワーカープロセス数（デフォルト: 1）'
+    )
+    parser.add_argument(
+        '--output-layout', 
+        choices=OUTPUT_LAYOUTS,
+        default='per-record',
+        help='CSVの出力形式（per-record: レコードごと / combined: 1ファイル / partitioned: ハッシュ分割、デフォルト: per-record）'
+    )
+    parser.add_argument(
+        '--partitions', 
+        type=int,
+        default=8,
+        help='--output-layout partitioned のファイル数（デフォルト: 8）'
+    )
+    parser.add_argument(
+        '--mismatches-only', 
+        choices=MISMATCHES_ONLY_MODES,
+        help='一致したデータをCSVに出力しない（row: 全フィールド一致の行を省略 / record: 全項目一致のレコードを省略）'
+    )
+    parser.add_argument(
+        '--snapshot-cache', 
+        type=str,
+        metavar='DIR',
+        help='入力CSVをパースした結果をDIRにキャッシュし、同じ内容のファイルは次回からパースを省略'
+    )
+    parser.add_argument(
+        '--snapshot-cache-max-mb', 
+        type=int,
+        default=2048,
+        help='--snapshot-cache の合計サイズの上限（MB、超えた場合は古いものから削除。デフォルト: 2048）'
+    )
+    parser.add_argument(
+        '--pipeline', 
+        action='store_true',
+        help='読み込み・パース・比較・書き込みを重ねて実行（パース・比較は --workers 個のプロセスで行う）'
+    )
+    parser.add_argument(
+        '--incremental', 
+        action='store_true',
+        help='前回同じ出力ディレクトリに出力した結果を使い、入力が変わったレコードだけを比較し直す'
+    )
+    parser.add_argument(
+        '--checkpoint', 
+        action='store_true',
+        help='比較中の途中経過を出力ディレクトリのジャーナルに記録し、途中で終了しても --resume で再開できるようにする'
+    )
+    parser.add_argument(
+        '--resume', 
+        action='store_true',
+        help='前回 --checkpoint を付けて途中で終了した比較処理を、出力ディレクトリのジャーナルから続きを再開する'
+    )
+    parser.add_argument(
+        '--shard', 
+        type=parse_shard,
+        metavar='I/N',
+        help='__id__のハッシュでN個に分けたうちI番目（0始まり）のレコードだけを比較し、'
+             '出力ディレクトリに merge 用の部分サマリーを保存する'
+    )
+    parser.add_argument(
+        '--top-k', 
+        type=int,
+        default=ShardSummary.DEFAULT_TOP_K,
+        help=f'--shard の部分サマリーに保存する不一致数の上位のレコード数（デフォルト: {ShardSummary.DEFAULT_TOP_K}）'
+    )
+    parser.add_argument(
+        '--compress', 
+        choices=COMPRESSIONS,
+        help='出力するCSV・HTMLを圧縮（gzip: .gz / xz: .xz を付けて出力）'
+    )
+    parser.add_argument(
+        '--compress-level', 
+        type=int,
+        help='--compress の圧縮レベル（0〜9、デフォルト: 6）'
+    )
+    parser.add_argument(
+        '--sqlite', 
+        type=str,
+        help='比較結果を保存するSQLiteファイルのパス'
+    )
+    add_rule_arguments(parser)
+
+    parser.add_argument(
+        '--metrics', 
+        action='store_true',
+        help='処理段階（読み込み・パース・比較・書き込み・集計・HTML生成）ごとの時間・メモリ・件数を表示'
+    )
+    parser.add_argument(
+        '--metrics-json', 
+        type=str,
+        metavar='PATH',
+        help='処理段階ごとの計測結果をJSONファイルに出力（--metricsを含む）'
+    )
+    parser.add_argument(
+        '--profile', 
+        nargs='?',
+        const='comparison.prof',
+        metavar='PATH',
+        help='cProfileで実行全体をプロファイルし統計を出力（デフォルト: comparison.prof）'
+    )
+
+    if is_compare:
+        record_group = parser.add_mutually_exclusive_group()
+        record_group.add_argument(
+            '--record-id', 
+            type=str,
+            help='指定したレコードID（__id__）だけをインデックスから読み込んで比較し、差分を表示'
+        )
+        record_group.add_argument(
+            '--shain-id', 
+            type=str,
+            help='指定した社員ID（shainId）のレコードだけをインデックスから読み込んで比較し、差分を表示'
+        )
+    parser.set_defaults(record_id=None, shain_id=None)
+
+    args = parser.parse_args(argv)
+    
+    if args.html_page_size < 0:
+        parser.error('--html-page-size は0以上を指定してください')
+    if args.html_mode == 'virtual' and args.html_page_size:
+        parser.error('--html-mode virtual と --html-page-size は同時に指定できません')
+    if args.workers < 1:
+        parser.error('--workers は1以上を指定してください')
+    if args.partitions < 1:
+        parser.error('--partitions は1以上を指定してください')
+    if args.memory_budget_mb <= 0:
+        parser.error('--memory-budget-mb は1以上を指定してください')
+    if args.compress_level is not None and not 0 <= args.compress_level <= 9:
+        parser.error('--compress-level は0〜9を指定してください')
+    if args.top_k < 1:
+        parser.error('--top-k は1以上を指定してください')
 
-    args = parser.parse_args()
+    metrics = StageMetrics() if args.metrics or args.metrics_json else None
+    
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
 
     try:
         # コントローラーを初期化
-        controller = ArrayDiffController()
+        controller = ArrayDiffController(metrics)
+        
+        field_rules = build_field_rules(args)
+        
+        options = ComparisonOptions(
+            stream=args.stream,
+            external_sort=args.external_sort,
+            sort_chunk_size=args.sort_chunk_size,
+            external_join=args.external_join,
+            memory_budget_mb=args.memory_budget_mb,
+            workers=args.workers,
+            output_layout=args.output_layout,
+            partitions=args.partitions,
+            sqlite_path=args.sqlite,
+            field_rules=field_rules,
+            mismatches_only=args.mismatches_only,
+            compression=args.compress,
+            compression_level=args.compress_level,
+            snapshot_cache_dir=args.snapshot_cache,
+            snapshot_cache_max_mb=args.snapshot_cache_max_mb,
+            incremental=args.incremental,
+            checkpoint=args.checkpoint,
+            resume=args.resume,
+            pipeline=args.pipeline,
+            shard=args.shard,
+            top_k=args.top_k
+        )
+        
+        # 指定したレコードだけを比較して差分を表示
+        if args.record_id is not None or args.shain_id is not None:
+            results = controller.compare_indexed_records(
+                args.before_file, 
+                args.after_file, 
+                record_id=args.record_id, 
+                shain_id=args.shain_id, 
+                options=options
+            )
+            print_record_comparison(results, controller.comparison_service.comparison_fields)
+            print_metrics(metrics, args.metrics_json)
+            return
         
         # 配列差分比較を実行
         output_files = controller.process_comparison(
             args.before_file, 
             args.after_file, 
-            args.output_dir
+            args.output_dir,
+            options
         )
         
         print(f"\n出力ファイル数: {len(output_files)}")
@@ -73,7 +350,7 @@ def main():
         # サマリーを表示
         if args.summary:
             print("\n=== 比較結果サマリー ===")
-            summary = controller.get_comparison_summary(output_files)
+            summary = controller.get_comparison_summary(sqlite_path=args.sqlite)
             if summary:
                 print(f"総レコード数: {summary['total_records']}")
                 print(f"総項目数: {summary['total_items']}")
@@ -85,11 +362,7 @@ def main():
             
             # 個別レコードのサマリーを表示（不一致があるレコードのみ）
             print("\n=== 個別レコードサマリー（不一致があるレコードのみ） ===")
-            mismatch_records = []
-            for output_file in output_files:
-                record_summary = controller.get_record_comparison_summary(output_file)
-                if record_summary and record_summary['total_mismatches'] > 0:
-                    mismatch_records.append(record_summary)
+            mismatch_records = controller.get_mismatch_record_summaries(args.sqlite)
             
             if mismatch_records:
                 print(f"不一致があるレコード数: {len(mismatch_records)}")
@@ -114,13 +387,23 @@ def main():
         if args.html:
             print("\n=== HTMLレポート生成 ===")
             html_file_path = controller.generate_html_report(
-                output_files, 
+                None, 
                 args.before_file, 
                 args.after_file, 
-                args.html_output
+                args.html_output, 
+                sqlite_path=args.sqlite, 
+                page_size=args.html_page_size, 
+                page_by=args.html_page_by, 
+                html_mode=args.html_mode, 
+                compress=args.html_compress, 
+                compression=args.compress, 
+                compression_level=args.compress_level
             )
             print(f"HTMLレポート: {html_file_path}")
         
+        # 処理段階ごとの計測結果を表示
+        print_metrics(metrics, args.metrics_json)
+        
         print("\n処理が完了しました。")
         
     except FileNotFoundError as e:
@@ -129,6 +412,495 @@ def main():
     except Exception as e:
         print(f"予期しないエラーが発生しました: {e}")
         sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print("\n=== プロファイル（累積時間の上位20件） ===")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+            print(f"プロファイル結果ファイル: {args.profile}")
+
+
+def add_rule_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    比較ルールのオプションを追加（compare / serve で共通）
+    
+    Args:
+        parser: 引数パーサー
+    """
+    parser.add_argument(
+        '--ignore-field', 
+        action='append',
+        default=[],
+        metavar='FIELD',
+        help='比較しない（常に一致とみなす）フィールド（複数指定可）'
+    )
+    parser.add_argument(
+        '--tolerance', 
+        action='append',
+        default=[],
+        metavar='FIELD=VALUE',
+        help='数値の差がVALUE以内なら一致とみなすフィールド（例: finalValue=0.5、複数指定可）'
+    )
+    parser.add_argument(
+        '--order-diff', 
+        choices=['value', 'align'],
+        default='value',
+        help='orderの比較方法（value: 値で比較、align: 相対順序で比較し実際に移動した項目のみ不一致。デフォルト: value）'
+    )
+
+
+def build_field_rules(args: argparse.Namespace) -> Optional[List[FieldRule]]:
+    """
+    比較ルールのオプションからフィールド別の比較ルールを作成
+    
+    Args:
+        args: add_rule_arguments で追加したオプションの解析結果
+        
+    Returns:
+        比較ルールのリスト（指定がない場合はNone = 既定のルール）
+    """
+    if not (args.ignore_field or args.tolerance or args.order_diff == 'align'):
+        return None
+    return ComparisonRules.build_rules(
+        args.ignore_field, 
+        ComparisonRules.parse_tolerances(args.tolerance), 
+        ['order'] if args.order_diff == 'align' else []
+    )
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    --shard の値（I/N）を解析する
+    
+    Args:
+        value: コマンドライン引数の値
+        
+    Returns:
+        (シャード番号, シャード数)
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"I/N の形式で指定してください: {value}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"0 <= I < N となるように指定してください: {value}")
+    return index, count
+
+
+def print_record_comparison(results: List[ComparisonResult], comparison_fields: List[str]) -> None:
+    """
+    レコードごとの比較結果と不一致の内容を表示
+    
+    Args:
+        results: 比較結果のリスト
+        comparison_fields: 比較対象フィールド
+    """
+    if not results:
+        print("指定したレコードは変更前・変更後の両方には存在しません。")
+        return
+    
+    for result in results:
+        mismatches = [
+            (detail, field)
+            for detail in result.comparison_details
+            for field in comparison_fields
+            if not detail[f'{field}_is_match']
+        ]
+        print(f"\n=== レコードID: {result.record_id} ===")
+        print(f"社員ID: {result.shain_id}")
+        print(f"社員名: {result.shain_name}")
+        print(f"項目数: {len(result.comparison_details)}")
+        print(f"不一致数: {len(mismatches)}")
+        for detail, field in mismatches:
+            print(
+                f"  {detail['kyuyoKomokuCode']} {detail['kyuyoKomokuName']} {field}: "
+                f"{detail[f'before_{field}']} → {detail[f'after_{field}']}"
+            )
+
+
+def print_metrics(metrics: Optional[StageMetrics], metrics_json: Optional[str]) -> None:
+    """
+    処理段階ごとの計測結果を表示（計測していない場合は何もしない）
+    
+    Args:
+        metrics: 計測結果
+        metrics_json: 計測結果を書き込むJSONファイルのパス
+    """
+    if metrics is None:
+        return
+    print("\n=== 処理段階ごとの計測結果 ===")
+    print(metrics.format_table())
+    if metrics_json:
+        metrics.write_json(metrics_json)
+        print(f"計測結果ファイル: {metrics_json}")
+
+
+def run_index(argv: List[str]) -> None:
+    """
+    index サブコマンド: 入力CSVのレコード位置インデックスを作成する
+    
+    Args:
+        argv: サブコマンド以降のコマンドライン引数
+    """
+    parser = argparse.ArgumentParser(
+        prog='main.py index',
+        description='入力CSVの record_id / shainId → 行の位置のインデックス（<CSVファイル名>.idx）を作成します'
+    )
+    parser.add_argument('csv_files', nargs='+', metavar='csv_file', help='インデックスを作成するCSVファイル')
+    parser.add_argument('--force', action='store_true', help='有効なインデックスがあっても作成し直す')
+    args = parser.parse_args(argv)
+    
+    controller = ArrayDiffController()
+    try:
+        for csv_file in args.csv_files:
+            start_time = time.time()
+            with controller.open_record_index(csv_file, rebuild=args.force) as index:
+                print(
+                    f"{index.index_path}: {index.record_count}レコード"
+                    f"（{time.time() - start_time:.2f}秒）"
+                )
+    except FileNotFoundError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"予期しないエラーが発生しました: {e}")
+        sys.exit(1)
+
+
+def run_merge(argv: List[str]) -> None:
+    """
+    merge サブコマンド: compare --shard で出力した全シャードの部分サマリーを統合する
+    
+    Args:
+        argv: サブコマンド以降のコマンドライン引数
+    """
+    parser = argparse.ArgumentParser(
+        prog='main.py merge',
+        description='compare --shard I/N で各シャードの出力ディレクトリに保存した部分サマリーを統合し、'
+                    '全体のサマリーと不一致数の上位のレコードを表示します。'
+                    '統合結果は <output-dir>/merged_summary.json に出力します'
+    )
+    parser.add_argument('shard_dirs', nargs='+', metavar='shard_dir', help='各シャードの出力ディレクトリ（全シャード分）')
+    parser.add_argument(
+        '--output-dir', 
+        default='DIFF_KYUYOKOMOKU', 
+        help='統合結果の出力ディレクトリ（デフォルト: DIFF_KYUYOKOMOKU）'
+    )
+    parser.add_argument(
+        '--top-k', 
+        type=int,
+        help='表示する不一致数の上位のレコード数（デフォルト・上限: 各シャードの --top-k）'
+    )
+    parser.add_argument('--html', action='store_true', help='統合したHTMLレポートを生成')
+    parser.add_argument('--html-output', type=str, help='HTML出力ファイルパス（--htmlオプションと併用）')
+    parser.add_argument(
+        '--html-page-size', 
+        type=int,
+        default=0,
+        help='不一致詳細を指定件数ごとの別ページに分割（デフォルト: 0 = 分割しない）'
+    )
+    parser.add_argument(
+        '--html-page-by', 
+        choices=PAGE_BY_MODES,
+        default='row',
+        help='--html-page-size の単位（デフォルト: row）'
+    )
+    parser.add_argument(
+        '--html-mode', 
+        choices=HTML_MODES,
+        default='table',
+        help='不一致詳細の表示形式（デフォルト: table）'
+    )
+    parser.add_argument(
+        '--html-compress', 
+        action='store_true',
+        help='--html-mode virtual で埋め込むJSONを gzip + Base64 で圧縮'
+    )
+    parser.add_argument('--compress', choices=COMPRESSIONS, help='HTMLを圧縮（gzip: .gz / xz: .xz を付けて出力）')
+    parser.add_argument('--compress-level', type=int, help='--compress の圧縮レベル（0〜9、デフォルト: 6）')
+    args = parser.parse_args(argv)
+    
+    if args.html_page_size < 0:
+        parser.error('--html-page-size は0以上を指定してください')
+    if args.html_mode == 'virtual' and args.html_page_size:
+        parser.error('--html-mode virtual と --html-page-size は同時に指定できません')
+    if args.top_k is not None and args.top_k < 1:
+        parser.error('--top-k は1以上を指定してください')
+    if args.compress_level is not None and not 0 <= args.compress_level <= 9:
+        parser.error('--compress-level は0〜9を指定してください')
+    
+    controller = ArrayDiffController()
+    try:
+        merged = controller.merge_shard_summaries(args.shard_dirs)
+        merged_dict = merged.to_dict(args.top_k)
+        
+        print(f"=== 統合したサマリー（シャード数: {len(merged.shards)}） ===")
+        print(f"総レコード数: {merged_dict['total_records']}")
+        print(f"総項目数: {merged_dict['total_items']}")
+        print(f"総不一致数: {merged_dict['total_mismatches']}")
+        print(f"不一致率: {merged_dict['mismatch_rate']:.2f}%")
+        print(f"不一致があるレコード数: {merged_dict['mismatch_record_count']}")
+        print("\nフィールド別不一致数:")
+        for field, count in merged_dict['field_mismatches'].items():
+            print(f"  {field}: {count}")
+        
+        top_records = merged_dict['top_records']
+        print(f"\n=== 不一致数の上位{len(top_records)}レコード ===")
+        for i, record in enumerate(top_records):
+            print(
+                f"{i+1}. レコードID: {record['record_id']}  社員ID: {record['shain_id']}  "
+                f"社員名: {record['shain_name']}  不一致数: {record['total_mismatches']}/{record['total_items']}"
+            )
+        
+        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+        merged_path = os.path.join(args.output_dir, 'merged_summary.json')
+        with open(merged_path, 'w', encoding='utf-8') as file:
+            json.dump(merged_dict, file, ensure_ascii=False, indent=2)
+        print(f"\n統合結果: {merged_path}")
+        
+        if args.html:
+            print("\n=== HTMLレポート生成 ===")
+            html_file_path = controller.generate_html_report(
+                None, 
+                merged.before_file_name, 
+                merged.after_file_name, 
+                args.html_output, 
+                page_size=args.html_page_size, 
+                page_by=args.html_page_by, 
+                html_mode=args.html_mode, 
+                compress=args.html_compress, 
+                compression=args.compress, 
+                compression_level=args.compress_level, 
+                merged_summary=merged
+            )
+            print(f"HTMLレポート: {html_file_path}")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"予期しないエラーが発生しました: {e}")
+        sys.exit(1)
+
+
+def run_series(argv: List[str]) -> None:
+    """
+    series サブコマンド: 時系列順のスナップショットを連続する2つずつ比較し、変更履歴を出力する
+    
+    Args:
+        argv: サブコマンド以降のコマンドライン引数
+    """
+    parser = argparse.ArgumentParser(
+        prog='main.py series',
+        description='時系列順に並べたスナップショット（例: 1月→2月→3月）を連続する2つずつ比較します。'
+                    '各ファイルの読み込みとパースは1回だけ行い、区間ごとの比較結果と'
+                    '社員・給与項目ごとの変更履歴（timeline.csv）を出力します'
+    )
+    parser.add_argument(
+        'snapshot_files', 
+        nargs='+', 
+        metavar='snapshot_file', 
+        help='スナップショットのCSVファイルパス（時系列順に2つ以上）'
+    )
+    parser.add_argument(
+        '--output-dir', 
+        default='DIFF_KYUYOKOMOKU', 
+        help='出力ディレクトリ（区間ごとに <NN>_<変更前>__<変更後> を作成。デフォルト: DIFF_KYUYOKOMOKU）'
+    )
+    parser.add_argument(
+        '--output-layout', 
+        choices=OUTPUT_LAYOUTS,
+        default='per-record',
+        help='区間ごとのCSVの出力形式（デフォルト: per-record）'
+    )
+    parser.add_argument('--partitions', type=int, default=8, help='--output-layout partitioned のファイル数（デフォルト: 8）')
+    parser.add_argument(
+        '--mismatches-only', 
+        choices=MISMATCHES_ONLY_MODES,
+        help='一致したデータをCSVに出力しない（row: 全フィールド一致の行を省略 / record: 全項目一致のレコードを省略）'
+    )
+    parser.add_argument('--html', action='store_true', help='区間ごとにHTMLレポート（<区間の出力ディレクトリ>/comparison_report.html）を生成')
+    parser.add_argument(
+        '--html-page-size', 
+        type=int,
+        default=0,
+        help='不一致詳細を指定件数ごとの別ページに分割（デフォルト: 0 = 分割しない）'
+    )
+    parser.add_argument(
+        '--html-page-by', 
+        choices=PAGE_BY_MODES,
+        default='row',
+        help='--html-page-size の単位（デフォルト: row）'
+    )
+    parser.add_argument(
+        '--html-mode', 
+        choices=HTML_MODES,
+        default='table',
+        help='不一致詳細の表示形式（デフォルト: table）'
+    )
+    parser.add_argument(
+        '--html-compress', 
+        action='store_true',
+        help='--html-mode virtual で埋め込むJSONを gzip + Base64 で圧縮'
+    )
+    parser.add_argument(
+        '--snapshot-cache', 
+        type=str,
+        metavar='DIR',
+        help='スナップショットをパースした結果をDIRにキャッシュし、同じ内容のファイルは次回からパースを省略'
+    )
+    parser.add_argument(
+        '--snapshot-cache-max-mb', 
+        type=int,
+        default=2048,
+        help='--snapshot-cache の合計サイズの上限（MB、デフォルト: 2048）'
+    )
+    parser.add_argument('--compress', choices=COMPRESSIONS, help='出力するCSV・HTMLを圧縮（gzip: .gz / xz: .xz を付けて出力）')
+    parser.add_argument('--compress-level', type=int, help='--compress の圧縮レベル（0〜9、デフォルト: 6）')
+    add_rule_arguments(parser)
+    parser.add_argument('--metrics', action='store_true', help='処理段階ごとの時間・メモリ・件数を表示')
+    parser.add_argument('--metrics-json', type=str, metavar='PATH', help='処理段階ごとの計測結果をJSONファイルに出力（--metricsを含む）')
+    args = parser.parse_args(argv)
+    
+    if len(args.snapshot_files) < 2:
+        parser.error('スナップショットを2つ以上指定してください')
+    if args.partitions < 1:
+        parser.error('--partitions は1以上を指定してください')
+    if args.html_page_size < 0:
+        parser.error('--html-page-size は0以上を指定してください')
+    if args.html_mode == 'virtual' and args.html_page_size:
+        parser.error('--html-mode virtual と --html-page-size は同時に指定できません')
+    if args.compress_level is not None and not 0 <= args.compress_level <= 9:
+        parser.error('--compress-level は0〜9を指定してください')
+    
+    metrics = StageMetrics() if args.metrics or args.metrics_json else None
+    controller = ArrayDiffController(metrics)
+    options = ComparisonOptions(
+        output_layout=args.output_layout,
+        partitions=args.partitions,
+        field_rules=build_field_rules(args),
+        mismatches_only=args.mismatches_only,
+        compression=args.compress,
+        compression_level=args.compress_level,
+        snapshot_cache_dir=args.snapshot_cache,
+        snapshot_cache_max_mb=args.snapshot_cache_max_mb
+    )
+    
+    def generate_pair_report(
+        step: int, before_file: str, after_file: str, pair_dir: str, output_files: List[str]
+    ) -> None:
+        # 区間の集計結果はこの呼び出しの間だけコントローラーに残っている
+        controller.generate_html_report(
+            None, 
+            before_file, 
+            after_file, 
+            os.path.join(pair_dir, 'comparison_report.html'), 
+            page_size=args.html_page_size, 
+            page_by=args.html_page_by, 
+            html_mode=args.html_mode, 
+            compress=args.html_compress, 
+            compression=args.compress, 
+            compression_level=args.compress_level
+        )
+    
+    try:
+        pair_summaries = controller.process_series(
+            args.snapshot_files, 
+            args.output_dir, 
+            options, 
+            on_pair_complete=generate_pair_report if args.html else None
+        )
+        
+        print("\n=== 区間ごとのサマリー ===")
+        for pair in pair_summaries:
+            print(
+                f"{pair['step']}. {pair['before_file']} → {pair['after_file']}: "
+                f"レコード数 {pair['total_records']}、不一致数 {pair['total_mismatches']}"
+                f"（{pair['mismatch_rate']:.2f}%）、不一致があるレコード数 {pair['mismatch_record_count']}"
+            )
+        
+        print_metrics(metrics, args.metrics_json)
+    except FileNotFoundError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"予期しないエラーが発生しました: {e}")
+        sys.exit(1)
+
+
+def run_serve(argv: List[str]) -> None:
+    """
+    serve サブコマンド: 変更前ファイルをメモリに保持し、比較ジョブをHTTPで受け付ける
+    
+    Args:
+        argv: サブコマンド以降のコマンドライン引数
+    """
+    parser = argparse.ArgumentParser(
+        prog='main.py serve',
+        description='変更前ファイルを1回だけ読み込んでメモリに保持し、変更後ファイルとの比較ジョブを'
+                    'HTTP（POST /jobs）で受け付けます。ジョブの完了後にサマリーと出力パスをJSONで返します'
+    )
+    parser.add_argument('before_file', help='変更前のCSVファイルパス（全ジョブで共通）')
+    parser.add_argument('--host', default='127.0.0.1', help='待ち受けるホスト（デフォルト: 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8765, help='待ち受けるポート（デフォルト: 8765）')
+    parser.add_argument(
+        '--queue-size', 
+        type=int, 
+        default=8, 
+        help='実行待ちにできるジョブ数の上限（超えた場合は 503 を返す。デフォルト: 8）'
+    )
+    parser.add_argument(
+        '--output-root', 
+        default='DIFF_KYUYOKOMOKU/jobs', 
+        help='出力ディレクトリを指定しないジョブの出力先（<output-root>/job_<ジョブID>。デフォルト: DIFF_KYUYOKOMOKU/jobs）'
+    )
+    parser.add_argument(
+        '--output-layout', 
+        choices=OUTPUT_LAYOUTS,
+        default='per-record',
+        help='CSVの出力形式の既定値（デフォルト: per-record）'
+    )
+    parser.add_argument(
+        '--mismatches-only', 
+        choices=MISMATCHES_ONLY_MODES,
+        help='一致したデータをCSVに出力しない（既定値）'
+    )
+    parser.add_argument(
+        '--compress', 
+        choices=COMPRESSIONS,
+        help='出力するCSV・HTMLの圧縮形式の既定値'
+    )
+    add_rule_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    if args.queue_size < 1:
+        parser.error('--queue-size は1以上を指定してください')
+    
+    options = ComparisonOptions(
+        output_layout=args.output_layout,
+        field_rules=build_field_rules(args),
+        mismatches_only=args.mismatches_only,
+        compression=args.compress
+    )
+    
+    try:
+        server = ComparisonServer(
+            args.before_file, 
+            options, 
+            args.output_root, 
+            host=args.host, 
+            port=args.port, 
+            queue_size=args.queue_size
+        )
+        server.run()
+    except KeyboardInterrupt:
+        print("\nサーバーを停止しました。")
+    except FileNotFoundError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"予期しないエラーが発生しました: {e}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
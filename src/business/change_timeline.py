@@ -0,0 +1,132 @@
+"""
+系列比較の社員・給与項目ごとの変更履歴
+"""
+import csv
+import heapq
+import os
+import shutil
+import tempfile
+from typing import Iterable, List, Optional
+
+from ..data.compressed_file import CompressedFile
+from ..data.html_models import HtmlMismatchDetailData
+
+
+class ChangeTimeline:
+    """連続するスナップショットの比較で検出した不一致を、社員・給与項目ごとの変更履歴にまとめるクラス
+
+    比較の区間（ステップ）ごとに不一致を社員ID・給与項目コード・フィールドの順に並べて
+    一時ファイルに書き出し、最後に全ステップをマージして1つのCSVに出力する。
+    メモリに載せるのは1ステップ分の不一致だけで、履歴全体は保持しない。
+    """
+
+    FIELDNAMES = [
+        'shainId',
+        'shainName',
+        'kyuyoKomokuCode',
+        'kyuyoKomokuName',
+        'field',
+        'step',
+        'before_file',
+        'after_file',
+        'before_value',
+        'after_value',
+        'record_id',
+    ]
+
+    # 並べ替えのキーに使う列（社員ID, 給与項目コード, フィールド, ステップ）
+    _SORT_COLUMNS = (0, 2, 4, 5)
+
+    def __init__(self, output_path: str, compression_level: Optional[int] = None):
+        """
+        Args:
+            output_path: 変更履歴のCSVファイルのパス（.gz / .xz の場合は圧縮して出力）
+            compression_level: 圧縮する場合の圧縮レベル（0〜9）
+        """
+        self.output_path = output_path
+        self.compression_level = compression_level
+        self.change_count = 0
+        self._step_paths: List[str] = []
+        self._work_dir: Optional[str] = None
+
+    def add_step(
+        self,
+        step: int,
+        before_file_name: str,
+        after_file_name: str,
+        mismatch_details: Iterable[HtmlMismatchDetailData]
+    ) -> None:
+        """
+        1つの区間の不一致を変更履歴に加える
+
+        Args:
+            step: 区間の番号（1始まり、変更履歴の並び順に使う）
+            before_file_name: 区間の変更前ファイル名
+            after_file_name: 区間の変更後ファイル名
+            mismatch_details: 区間の不一致詳細
+        """
+        rows = [
+            [
+                detail.shain_id,
+                detail.shain_name,
+                detail.kyuyo_komoku_code,
+                detail.kyuyo_komoku_name,
+                detail.field_name,
+                f'{step:04d}',
+                before_file_name,
+                after_file_name,
+                detail.before_value,
+                detail.after_value,
+                detail.record_id,
+            ]
+            for detail in mismatch_details
+        ]
+        rows.sort(key=self._sort_key)
+
+        if self._work_dir is None:
+            self._work_dir = tempfile.mkdtemp(prefix='change_timeline_')
+        step_path = os.path.join(self._work_dir, f'step_{step:04d}.csv')
+        with open(step_path, 'w', newline='', encoding='utf-8') as file:
+            csv.writer(file).writerows(rows)
+        self._step_paths.append(step_path)
+        self.change_count += len(rows)
+
+    def write(self) -> str:
+        """
+        全区間の不一致をマージし、変更履歴のCSVファイルに出力する
+
+        Returns:
+            出力したファイルのパス
+        """
+        files = []
+        try:
+            for step_path in self._step_paths:
+                files.append(open(step_path, 'r', newline='', encoding='utf-8'))
+
+            with CompressedFile.open_text(
+                self.output_path, 'w', newline='', level=self.compression_level
+            ) as output:
+                writer = csv.writer(output)
+                writer.writerow(self.FIELDNAMES)
+                for row in heapq.merge(*(csv.reader(file) for file in files), key=self._sort_key):
+                    row[5] = int(row[5])
+                    writer.writerow(row)
+        except Exception as e:
+            raise Exception(f"変更履歴の書き込み中にエラーが発生しました: {e}")
+        finally:
+            for file in files:
+                file.close()
+
+        return self.output_path
+
+    def close(self) -> None:
+        """一時ファイルを削除する"""
+        if self._work_dir is not None:
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+        self._work_dir = None
+        self._step_paths = []
+
+    @classmethod
+    def _sort_key(cls, row: List[str]) -> tuple:
+        """変更履歴の並び順（社員ID, 給与項目コード, フィールド, ステップ）"""
+        return tuple(row[column] for column in cls._SORT_COLUMNS)
@@ -0,0 +1,185 @@
+"""
+フィールド別比較ルール
+"""
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+# 比較ルールの種類
+#   numeric : 数値として比較（tolerance 以内の差は一致とみなす）
+#   string  : 文字列として比較
+#   nullable: None・数値・文字列が混在する値を型に応じて比較
+#   ignore  : 比較せず常に一致とみなす
+#   sequence: 値そのものではなく、値の昇順に並べた項目の相対順序で比較する
+#             （最長増加部分列に含まれない、実際に移動した項目のみ不一致とする）
+RULE_KINDS = ('numeric', 'string', 'nullable', 'ignore', 'sequence')
+
+Comparator = Callable[[Any, Any], bool]
+
+
+@dataclass(frozen=True)
+class FieldRule:
+    """フィールドの比較ルール"""
+    field: str
+    kind: str = 'nullable'
+    tolerance: float = 0.0
+
+
+class ComparisonRules:
+    """比較ルールの定義と比較関数の生成"""
+
+    DEFAULT_RULES = (
+        FieldRule('finalValue', 'nullable'),
+        FieldRule('kyuyoKomokuCode', 'string'),
+        FieldRule('kyuyoKomokuKubun', 'string'),
+        FieldRule('kyuyoKomokuName', 'string'),
+        FieldRule('order', 'numeric'),
+        FieldRule('processValue', 'nullable'),
+    )
+
+    @staticmethod
+    def default_rules() -> List[FieldRule]:
+        """既定の比較ルールを取得"""
+        return list(ComparisonRules.DEFAULT_RULES)
+
+    @staticmethod
+    def build_rules(
+        ignore_fields: Iterable[str] = (),
+        tolerances: Optional[Dict[str, float]] = None,
+        sequence_fields: Iterable[str] = ()
+    ) -> List[FieldRule]:
+        """
+        既定の比較ルールに無視フィールド・許容誤差・順序比較を反映する
+
+        Args:
+            ignore_fields: 比較しないフィールド
+            tolerances: フィールド → 数値の許容誤差
+            sequence_fields: 相対順序で比較するフィールド（例: order）
+
+        Returns:
+            比較ルールのリスト
+        """
+        rules = {rule.field: rule for rule in ComparisonRules.default_rules()}
+
+        for field, tolerance in (tolerances or {}).items():
+            ComparisonRules._validate_field(field, rules)
+            if tolerance < 0:
+                raise ValueError(f"許容誤差は0以上を指定してください: {field}={tolerance}")
+            kind = rules[field].kind
+            if kind == 'string':
+                kind = 'nullable'
+            rules[field] = replace(rules[field], kind=kind, tolerance=tolerance)
+
+        for field in sequence_fields:
+            ComparisonRules._validate_field(field, rules)
+            rules[field] = replace(rules[field], kind='sequence')
+
+        for field in ignore_fields:
+            ComparisonRules._validate_field(field, rules)
+            rules[field] = replace(rules[field], kind='ignore')
+
+        return list(rules.values())
+
+    @staticmethod
+    def parse_tolerances(values: Iterable[str]) -> Dict[str, float]:
+        """
+        "フィールド=許容誤差" 形式の文字列を辞書に変換
+
+        Args:
+            values: "order=0.5" 形式の文字列
+
+        Returns:
+            フィールド → 許容誤差の辞書
+        """
+        tolerances = {}
+        for value in values:
+            field, separator, tolerance = value.partition('=')
+            if not separator:
+                raise ValueError(f"許容誤差は フィールド=値 の形式で指定してください: {value}")
+            try:
+                tolerances[field.strip()] = float(tolerance)
+            except ValueError:
+                raise ValueError(f"許容誤差が数値ではありません: {value}")
+        return tolerances
+
+    @staticmethod
+    def create_comparator(rule: FieldRule) -> Comparator:
+        """
+        比較ルールから比較関数を生成する
+
+        どの比較関数も想定外の型が来た場合は compare_values と同じ結果になる。
+
+        Args:
+            rule: 比較ルール
+
+        Returns:
+            (変更前の値, 変更後の値) を受け取り一致する場合Trueを返す関数
+        """
+        if rule.kind not in RULE_KINDS:
+            raise ValueError(f"不明な比較ルールです: {rule.field}={rule.kind}")
+
+        compare_values = ComparisonRules.compare_values
+
+        if rule.kind == 'ignore':
+            return lambda value1, value2: True
+
+        if rule.kind == 'sequence':
+            # 項目単位では値で比較し、ComparisonService が項目リスト全体の並びから判定し直す
+            return compare_values
+
+        if rule.kind == 'string':
+            def compare_string(value1: Any, value2: Any) -> bool:
+                if type(value1) is str and type(value2) is str:
+                    return value1 == value2
+                return compare_values(value1, value2)
+            return compare_string
+
+        number_types = (int, float)
+        tolerance = rule.tolerance
+
+        if tolerance > 0:
+            def compare_number(value1: Any, value2: Any) -> bool:
+                if type(value1) in number_types and type(value2) in number_types:
+                    return abs(float(value1) - float(value2)) <= tolerance
+                return compare_values(value1, value2)
+            return compare_number
+
+        if rule.kind == 'numeric':
+            def compare_number(value1: Any, value2: Any) -> bool:
+                if type(value1) in number_types and type(value2) in number_types:
+                    return float(value1) == float(value2)
+                return compare_values(value1, value2)
+            return compare_number
+
+        return compare_values
+
+    @staticmethod
+    def compare_values(value1: Any, value2: Any) -> bool:
+        """
+        値を比較する（型を考慮）
+
+        Args:
+            value1: 比較対象の値1
+            value2: 比較対象の値2
+
+        Returns:
+            一致する場合True
+        """
+        # Noneの場合は両方Noneかチェック
+        if value1 is None and value2 is None:
+            return True
+        if value1 is None or value2 is None:
+            return False
+
+        # 数値の場合は型を統一して比較
+        if isinstance(value1, (int, float)) and isinstance(value2, (int, float)):
+            return float(value1) == float(value2)
+
+        # 文字列の場合は文字列として比較
+        return str(value1) == str(value2)
+
+    @staticmethod
+    def _validate_field(field: str, rules: Dict[str, FieldRule]) -> None:
+        """フィールド名が比較対象に含まれるか確認"""
+        if field not in rules:
+            raise ValueError(f"不明なフィールドです: {field}（指定可能: {', '.join(rules)}）")
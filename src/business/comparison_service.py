@@ -1,22 +1,57 @@
 """
 配列差分比較サービス
 """
-from typing import List, Dict, Any, Tuple
+from bisect import bisect_left
+from operator import attrgetter
+from typing import List, Dict, Any, Tuple, Iterable, Iterator, Optional, Set
+import re
+
 from ..data.models import KyuyoRecord, KyuyoMeisaiItem, ComparisonResult
+from .comparison_rules import ComparisonRules, FieldRule
+from .stage_metrics import StageMetrics
+
+
+_CAMEL_WORD_PATTERN = re.compile('(.)([A-Z][a-z]+)')
+_CAMEL_BOUNDARY_PATTERN = re.compile('([a-z0-9])([A-Z])')
 
 
 class ComparisonService:
     """配列差分比較サービス"""
 
-    def __init__(self):
-        self.comparison_fields = [
-            'finalValue',
-            'kyuyoKomokuCode', 
-            'kyuyoKomokuKubun',
-            'kyuyoKomokuName',
-            'order',
-            'processValue'
+    def __init__(
+        self, 
+        field_rules: Optional[List[FieldRule]] = None, 
+        metrics: Optional[StageMetrics] = None
+    ):
+        """
+        Args:
+            field_rules: フィールドごとの比較ルール（省略時は ComparisonRules.DEFAULT_RULES）
+            metrics: 指定した場合はレコードごとの parse / compare の時間を計測する
+        """
+        self.metrics = metrics
+        self.field_rules = list(field_rules) if field_rules is not None else ComparisonRules.default_rules()
+        self.comparison_fields = [rule.field for rule in self.field_rules]
+        
+        # 比較処理の最内ループで使う属性取得関数・比較関数・出力キーを事前に用意する
+        self._compiled_fields = [
+            (
+                attrgetter(self._to_snake_case(rule.field)),
+                ComparisonRules.create_comparator(rule),
+                f'before_{rule.field}',
+                f'after_{rule.field}',
+                f'{rule.field}_is_match'
+            )
+            for rule in self.field_rules
+        ]
+        
+        # 相対順序で比較するフィールド（属性取得関数, 一致フラグのキー）
+        self._sequence_fields = [
+            (attrgetter(self._to_snake_case(rule.field)), f'{rule.field}_is_match')
+            for rule in self.field_rules
+            if rule.kind == 'sequence'
         ]
+        
+        self._match_keys = [match_key for _, _, _, _, match_key in self._compiled_fields]
 
     def compare_records(
         self, 
@@ -33,27 +68,109 @@ class ComparisonService:
         Returns:
             比較結果のリスト
         """
+        return list(self.iter_compare_records(before_records, after_records))
+
+    def iter_compare_records(
+        self, 
+        before_records: Iterable[KyuyoRecord], 
+        after_records: Iterable[KyuyoRecord]
+    ) -> Iterator[ComparisonResult]:
+        """
+        レコードを比較し、比較結果を1件ずつ返す
+        
+        比較したレコードはマッピングから取り除くため、入力をイテレーターで渡せば
+        パース済みの明細は比較結果が不要になった時点で解放される。
+        
+        Args:
+            before_records: 変更前のレコード
+            after_records: 変更後のレコード
+            
+        Returns:
+            比較結果のイテレーター（変更前ファイルの順）
+        """
         # docIdをキーとしてレコードをマッピング
         before_map = {record.record_id: record for record in before_records}
         after_map = {record.record_id: record for record in after_records}
         
-        results = []
-        
-        # 両方のファイルに存在するレコードを比較
-        common_ids = set(before_map.keys()) & set(after_map.keys())
+        # 両方のファイルに存在するレコードを変更前ファイルの順に比較
+        common_ids = [record_id for record_id in before_map if record_id in after_map]
         
         for record_id in common_ids:
-            before_record = before_map[record_id]
-            after_record = after_map[record_id]
+            before_record = before_map.pop(record_id)
+            after_record = after_map.pop(record_id)
             
-            comparison_result = self._compare_single_record(
-                before_record, after_record
-            )
-            results.append(comparison_result)
+            yield self.compare_single_record(before_record, after_record)
+
+    def compare_sorted_records(
+        self, 
+        before_records: Iterable[KyuyoRecord], 
+        after_records: Iterable[KyuyoRecord]
+    ) -> Iterator[ComparisonResult]:
+        """
+        record_id順にソートされたレコードをソートマージ結合で比較する
+        
+        両方の入力を1件ずつ読み進めるため、レコード数に関わらず
+        メモリ使用量は一定に保たれる。同じrecord_idが複数ある場合は
+        compare_recordsと同様に最後のレコードを使用する。
+        
+        Args:
+            before_records: record_id順に並んだ変更前のレコード
+            after_records: record_id順に並んだ変更後のレコード
+            
+        Returns:
+            比較結果のイテレーター（record_id順）
+            
+        Raises:
+            ValueError: 入力がrecord_id順にソートされていない場合
+        """
+        before_iter = self._iter_unique_sorted_records(before_records, '変更前ファイル')
+        after_iter = self._iter_unique_sorted_records(after_records, '変更後ファイル')
+        
+        before_record = next(before_iter, None)
+        after_record = next(after_iter, None)
+        
+        while before_record is not None and after_record is not None:
+            if before_record.record_id < after_record.record_id:
+                before_record = next(before_iter, None)
+            elif before_record.record_id > after_record.record_id:
+                after_record = next(after_iter, None)
+            else:
+                yield self.compare_single_record(before_record, after_record)
+                before_record = next(before_iter, None)
+                after_record = next(after_iter, None)
+
+    def _iter_unique_sorted_records(
+        self, 
+        records: Iterable[KyuyoRecord], 
+        label: str
+    ) -> Iterator[KyuyoRecord]:
+        """
+        ソート順を検証しながら、record_idごとに最後のレコードを返す
+        
+        Args:
+            records: record_id順に並んだレコード
+            label: エラーメッセージ用の入力名
+            
+        Returns:
+            record_idが重複しないレコードのイテレーター
+        """
+        pending = None
         
-        return results
+        for record in records:
+            if pending is not None:
+                if record.record_id < pending.record_id:
+                    raise ValueError(
+                        f"{label}が__id__順にソートされていません: "
+                        f"'{record.record_id}' が '{pending.record_id}' の後にあります"
+                    )
+                if record.record_id != pending.record_id:
+                    yield pending
+            pending = record
+        
+        if pending is not None:
+            yield pending
 
-    def _compare_single_record(
+    def compare_single_record(
         self, 
         before_record: KyuyoRecord, 
         after_record: KyuyoRecord
@@ -61,6 +178,8 @@ class ComparisonService:
         """
         単一レコードの比較を行う
         
+        並列比較・パイプライン実行のワーカーは対応するレコードの組をこれで1件ずつ比較する。
+        
         Args:
             before_record: 変更前のレコード
             after_record: 変更後のレコード
@@ -68,11 +187,32 @@ class ComparisonService:
         Returns:
             比較結果
         """
-        # 給与明細項目を比較
-        comparison_details = self._compare_meisai_items(
-            before_record.getsu_kyuyo_result_meisai_list,
-            after_record.getsu_kyuyo_result_meisai_list
-        )
+        if self.metrics is None:
+            return self._build_comparison_result(before_record, after_record)
+        
+        with self.metrics.measure('compare') as block:
+            result = self._build_comparison_result(before_record, after_record)
+            block.records = 1
+            block.items = len(result.comparison_details)
+        return result
+
+    def _build_comparison_result(
+        self, 
+        before_record: KyuyoRecord, 
+        after_record: KyuyoRecord
+    ) -> ComparisonResult:
+        """単一レコードの比較結果を作成する"""
+        if before_record.has_same_meisai_json(after_record):
+            # JSON文字列が完全に一致する場合は変更後のパースと項目比較を省略する
+            before_items = self._get_meisai_list(before_record)
+            after_items = before_items
+            comparison_details = self._create_identical_details(before_items)
+        else:
+            before_items = self._get_meisai_list(before_record)
+            after_items = self._get_meisai_list(after_record)
+            
+            # 給与明細項目を比較
+            comparison_details = self._compare_meisai_items(before_items, after_items)
         
         return ComparisonResult(
             record_id=before_record.record_id,
@@ -80,11 +220,54 @@ class ComparisonService:
             shain_name=before_record.shain_name,
             keisan_nengetsu=before_record.keisan_nengetsu,
             shori_nengetsu=before_record.shori_nengetsu,
-            before_items=before_record.getsu_kyuyo_result_meisai_list,
-            after_items=after_record.getsu_kyuyo_result_meisai_list,
+            before_items=before_items,
+            after_items=after_items,
             comparison_details=comparison_details
         )
 
+    def _get_meisai_list(self, record: KyuyoRecord) -> List[KyuyoMeisaiItem]:
+        """給与明細項目を取得する（計測時はJSONのパース時間を parse として記録）"""
+        if self.metrics is None:
+            return record.get_meisai_list()
+        
+        with self.metrics.measure('parse') as block:
+            items = record.get_meisai_list()
+            block.records = 1
+            block.items = len(items)
+        return items
+
+    def _create_identical_details(
+        self, 
+        items: List[KyuyoMeisaiItem]
+    ) -> List[Dict[str, Any]]:
+        """
+        変更前後で同一の項目リストから、全フィールド一致の比較詳細を作成する
+        
+        Args:
+            items: 項目リスト
+            
+        Returns:
+            比較詳細のリスト（_compare_meisai_items と同じ形式）
+        """
+        # _compare_meisai_items と同様にkyuyoKomokuCodeの重複は後勝ち
+        item_map = {item.kyuyo_komoku_code: item for item in items}
+        
+        comparison_details = []
+        
+        for item in item_map.values():
+            detail = {
+                'kyuyoKomokuCode': item.kyuyo_komoku_code,
+                'kyuyoKomokuName': item.kyuyo_komoku_name,
+            }
+            for getter, _, before_key, after_key, match_key in self._compiled_fields:
+                value = getter(item)
+                detail[before_key] = value
+                detail[after_key] = value
+                detail[match_key] = True
+            comparison_details.append(detail)
+        
+        return comparison_details
+
     def _compare_meisai_items(
         self, 
         before_items: List[KyuyoMeisaiItem], 
@@ -106,8 +289,8 @@ class ComparisonService:
         
         comparison_details = []
         
-        # 両方に存在する項目を比較
-        common_codes = set(before_map.keys()) & set(after_map.keys())
+        # 両方に存在する項目を変更前の並び順に比較
+        common_codes = [code for code in before_map if code in after_map]
         
         for code in common_codes:
             before_item = before_map[code]
@@ -116,8 +299,109 @@ class ComparisonService:
             detail = self._create_comparison_detail(before_item, after_item)
             comparison_details.append(detail)
         
+        # 順序フィールドは値の差ではなく、実際に移動した項目のみを不一致とする
+        for getter, match_key in self._sequence_fields:
+            moved_codes = self._find_moved_codes(common_codes, before_map, after_map, getter)
+            for detail in comparison_details:
+                detail[match_key] = detail['kyuyoKomokuCode'] not in moved_codes
+        
         return comparison_details
 
+    def _find_moved_codes(
+        self, 
+        common_codes: List[str], 
+        before_map: Dict[str, KyuyoMeisaiItem], 
+        after_map: Dict[str, KyuyoMeisaiItem], 
+        getter: Any
+    ) -> Set[str]:
+        """
+        変更前後の並びを比較して、移動した項目のコードを求める
+        
+        両方に存在する項目を順序フィールドの値（同じ値や数値でない場合はリスト内の位置）で
+        並べ、変更後の並びの最長増加部分列に含まれない項目を移動した項目とする。
+        項目の追加・削除による一様なずれでは相対順序が変わらないため、移動とはみなさない。
+        
+        Args:
+            common_codes: 両方に存在する項目のコード（変更前の並び順）
+            before_map: コード → 変更前の項目
+            after_map: コード → 変更後の項目
+            getter: 順序フィールドの値を取得する関数
+            
+        Returns:
+            移動した項目のコードの集合（移動の件数が最小となる組み合わせ）
+        """
+        count = len(common_codes)
+        if count < 2:
+            return set()
+        
+        after_positions = {code: position for position, code in enumerate(after_map)}
+        before_sequence = sorted(
+            range(count), 
+            key=lambda i: self._sequence_key(getter(before_map[common_codes[i]]), i)
+        )
+        after_sequence = sorted(
+            range(count), 
+            key=lambda i: self._sequence_key(
+                getter(after_map[common_codes[i]]), after_positions[common_codes[i]]
+            )
+        )
+        
+        after_ranks = [0] * count
+        for rank, i in enumerate(after_sequence):
+            after_ranks[i] = rank
+        ranks = [after_ranks[i] for i in before_sequence]
+        
+        # 相対順序が変わっていない場合（大半のレコード）は部分列を求めない
+        if ranks == list(range(count)):
+            return set()
+        
+        kept = self._longest_increasing_subsequence(ranks)
+        return {
+            common_codes[before_sequence[position]] 
+            for position in range(count) 
+            if position not in kept
+        }
+
+    @staticmethod
+    def _sequence_key(value: Any, position: int) -> Tuple[int, float, int]:
+        """順序フィールドの並び替えキー（数値でない値はリスト内の位置で後ろに並べる）"""
+        if isinstance(value, (int, float)):
+            return (0, float(value), position)
+        return (1, 0.0, position)
+
+    @staticmethod
+    def _longest_increasing_subsequence(values: List[int]) -> Set[int]:
+        """
+        最長増加部分列を求める（O(n log n)）
+        
+        Args:
+            values: 重複のない整数のリスト
+            
+        Returns:
+            最長増加部分列に含まれる要素の位置の集合
+        """
+        tail_values: List[int] = []
+        tail_positions: List[int] = []
+        previous = [-1] * len(values)
+        
+        for position, value in enumerate(values):
+            length = bisect_left(tail_values, value)
+            if length > 0:
+                previous[position] = tail_positions[length - 1]
+            if length == len(tail_values):
+                tail_values.append(value)
+                tail_positions.append(position)
+            else:
+                tail_values[length] = value
+                tail_positions[length] = position
+        
+        kept = set()
+        position = tail_positions[-1] if tail_positions else -1
+        while position >= 0:
+            kept.add(position)
+            position = previous[position]
+        return kept
+
     def _create_comparison_detail(
         self, 
         before_item: KyuyoMeisaiItem, 
@@ -138,68 +422,67 @@ class ComparisonService:
             'kyuyoKomokuName': before_item.kyuyo_komoku_name,
         }
         
-        # 各フィールドを比較
-        for field in self.comparison_fields:
-            before_value = getattr(before_item, self._to_snake_case(field))
-            after_value = getattr(after_item, self._to_snake_case(field))
-            
-            # 値を比較（型を考慮）
-            is_match = self._compare_values(before_value, after_value)
+        # 各フィールドを事前に用意した比較関数で比較
+        for getter, comparator, before_key, after_key, match_key in self._compiled_fields:
+            before_value = getter(before_item)
+            after_value = getter(after_item)
             
             # 結果を辞書に追加
-            detail[f'before_{field}'] = before_value
-            detail[f'after_{field}'] = after_value
-            detail[f'{field}_is_match'] = is_match
+            detail[before_key] = before_value
+            detail[after_key] = after_value
+            detail[match_key] = comparator(before_value, after_value)
         
         return detail
 
-    def _compare_values(self, value1: Any, value2: Any) -> bool:
+    def _to_snake_case(self, camel_case: str) -> str:
         """
-        値を比較する（型を考慮）
+        キャメルケースをスネークケースに変換
         
         Args:
-            value1: 比較対象の値1
-            value2: 比較対象の値2
+            camel_case: キャメルケースの文字列
             
         Returns:
-            一致する場合True
+            スネークケースの文字列
         """
-        # Noneの場合は両方Noneかチェック
-        if value1 is None and value2 is None:
-            return True
-        if value1 is None or value2 is None:
-            return False
-        
-        # 数値の場合は型を統一して比較
-        if isinstance(value1, (int, float)) and isinstance(value2, (int, float)):
-            return float(value1) == float(value2)
-        
-        # 文字列の場合は文字列として比較
-        return str(value1) == str(value2)
+        s1 = _CAMEL_WORD_PATTERN.sub(r'\1_\2', camel_case)
+        return _CAMEL_BOUNDARY_PATTERN.sub(r'\1_\2', s1).lower()
 
-    def _to_snake_case(self, camel_case: str) -> str:
+    def get_csv_fieldnames(self) -> List[str]:
         """
-        キャメルケースをスネークケースに変換
+        CSV出力の列名を取得
         
-        Args:
-            camel_case: キャメルケースの文字列
-            
         Returns:
-            スネークケースの文字列
+            generate_comparison_csv_data が出力する行と同じ順序の列名リスト
         """
-        import re
-        s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', camel_case)
-        return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+        fieldnames = [
+            'record_id',
+            'shainId',
+            'shainName',
+            'keisanNengetsu',
+            'shoriNengetsu',
+            'kyuyoKomokuCode',
+            'kyuyoKomokuName',
+        ]
+        
+        for field in self.comparison_fields:
+            fieldnames.append(f'before_{field}')
+            fieldnames.append(f'after_{field}')
+            fieldnames.append(f'{field}_is_match')
+        
+        return fieldnames
 
     def generate_comparison_csv_data(
         self, 
-        comparison_results: List[ComparisonResult]
+        comparison_results: List[ComparisonResult], 
+        mismatches_only: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         比較結果をCSV出力用のデータに変換
         
         Args:
             comparison_results: 比較結果のリスト
+            mismatches_only: 'row' の場合は全フィールド一致の行、
+                'record' の場合は全項目一致のレコードを出力しない
             
         Returns:
             CSV出力用の辞書リスト
@@ -207,7 +490,15 @@ class ComparisonService:
         csv_data = []
         
         for result in comparison_results:
+            if mismatches_only == 'record' and not any(
+                not self.is_all_match(detail) for detail in result.comparison_details
+            ):
+                continue
+            
             for detail in result.comparison_details:
+                if mismatches_only == 'row' and self.is_all_match(detail):
+                    continue
+                
                 row = {
                     'record_id': result.record_id,
                     'shainId': result.shain_id,
@@ -219,11 +510,26 @@ class ComparisonService:
                 }
                 
                 # 各フィールドの比較結果を追加
-                for field in self.comparison_fields:
-                    row[f'before_{field}'] = detail.get(f'before_{field}', '')
-                    row[f'after_{field}'] = detail.get(f'after_{field}', '')
-                    row[f'{field}_is_match'] = detail.get(f'{field}_is_match', False)
+                for _, _, before_key, after_key, match_key in self._compiled_fields:
+                    row[before_key] = detail.get(before_key, '')
+                    row[after_key] = detail.get(after_key, '')
+                    row[match_key] = detail.get(match_key, False)
                 
                 csv_data.append(row)
         
         return csv_data
+
+    def is_all_match(self, detail: Dict[str, Any]) -> bool:
+        """
+        比較詳細の全フィールドが一致しているか判定する
+        
+        Args:
+            detail: 比較詳細
+            
+        Returns:
+            全フィールドが一致している場合True
+        """
+        for match_key in self._match_keys:
+            if not detail.get(match_key, False):
+                return False
+        return True
@@ -1,219 +1,122 @@
 """
 HTMLレポート生成サービス
 """
-from typing import List, Dict, Any
 from datetime import datetime
-import os
 
 from ..data.html_models import (
     HtmlSummaryData, 
     HtmlRecordSummaryData, 
-    HtmlMismatchDetailData, 
     HtmlReportData
 )
-from ..data.csv_reader import CsvReader
+from ..data.sqlite_result_store import SqliteResultStore
+from .summary_aggregator import SummaryAggregator
+from .shard_summary import MergedShardSummary
 
 
 class HtmlReportService:
     """HTMLレポート生成サービス"""
     
-    def __init__(self):
-        self.csv_reader = CsvReader()
+    def generate_html_report_data_from_aggregator(
+        self, 
+        aggregator: SummaryAggregator, 
+        before_file_name: str, 
+        after_file_name: str
+    ) -> HtmlReportData:
+        """
+        集計済みの比較結果からHTMLレポート用のデータを生成
+        
+        Args:
+            aggregator: 比較処理中に集計したアグリゲーター
+            before_file_name: 変更前ファイル名
+            after_file_name: 変更後ファイル名
+            
+        Returns:
+            HTMLレポートデータ
+        """
+        return self._build_report_data(aggregator, before_file_name, after_file_name)
     
-    def generate_html_report_data(
+    def generate_html_report_data_from_store(
         self, 
-        output_files: List[str], 
+        store: SqliteResultStore, 
         before_file_name: str, 
         after_file_name: str
     ) -> HtmlReportData:
         """
-        HTMLレポート用のデータを生成
+        SQLiteに保存した比較結果からHTMLレポート用のデータを生成
         
         Args:
-            output_files: 出力ファイルパスのリスト
+            store: 接続済みの比較結果ストア
             before_file_name: 変更前ファイル名
             after_file_name: 変更後ファイル名
             
         Returns:
             HTMLレポートデータ
         """
-        # サマリーデータを生成
-        summary = self._generate_summary_data(output_files)
+        return self._build_report_data(store, before_file_name, after_file_name)
+    
+    def generate_html_report_data_from_shards(
+        self, 
+        merged: MergedShardSummary, 
+        before_file_name: str, 
+        after_file_name: str
+    ) -> HtmlReportData:
+        """
+        全シャードの部分サマリーを統合した比較結果からHTMLレポート用のデータを生成
         
-        # レコードサマリーデータを生成
-        record_summaries = self._generate_record_summary_data(output_files)
+        Args:
+            merged: 統合したサマリー
+            before_file_name: 変更前ファイル名
+            after_file_name: 変更後ファイル名
+            
+        Returns:
+            HTMLレポートデータ
+        """
+        return self._build_report_data(merged, before_file_name, after_file_name)
+    
+    def _build_report_data(
+        self, 
+        source, 
+        before_file_name: str, 
+        after_file_name: str
+    ) -> HtmlReportData:
+        """
+        get_summary / get_record_summaries / iter_mismatch_details を持つ集計元からレポートデータを生成
         
-        # 不一致詳細データを生成
-        mismatch_details = self._generate_mismatch_detail_data(output_files)
+        Args:
+            source: SummaryAggregator・SqliteResultStore・MergedShardSummary のいずれか
+            before_file_name: 変更前ファイル名
+            after_file_name: 変更後ファイル名
+            
+        Returns:
+            HTMLレポートデータ
+        """
+        summary = source.get_summary()
+        record_summaries = source.get_record_summaries()
         
         return HtmlReportData(
-            summary=summary,
-            record_summaries=record_summaries,
-            mismatch_details=mismatch_details,
+            summary=HtmlSummaryData(
+                total_records=summary['total_records'],
+                total_items=summary['total_items'],
+                total_mismatches=summary['total_mismatches'],
+                mismatch_rate=summary['mismatch_rate'],
+                field_mismatches=summary['field_mismatches'],
+                generated_at=datetime.now(),
+                mismatch_record_count=len(record_summaries)
+            ),
+            record_summaries=(
+                HtmlRecordSummaryData(
+                    record_id=record['record_id'],
+                    shain_id=record['shain_id'],
+                    shain_name=record['shain_name'],
+                    total_items=record['total_items'],
+                    total_mismatches=record['total_mismatches'],
+                    mismatch_rate=record['mismatch_rate'],
+                    field_mismatches=record['field_mismatches']
+                )
+                for record in record_summaries
+            ),
+            # 不一致詳細は件数分のリストを作らずイテレーターのまま渡す
+            mismatch_details=source.iter_mismatch_details(),
             before_file_name=before_file_name,
             after_file_name=after_file_name
         )
-    
-    def _generate_summary_data(self, output_files: List[str]) -> HtmlSummaryData:
-        """サマリーデータを生成"""
-        total_records = len(output_files)
-        total_items = 0
-        total_mismatches = 0
-        
-        # 各フィールドの不一致数をカウント
-        field_mismatches = {}
-        comparison_fields = [
-            'finalValue', 'kyuyoKomokuCode', 'kyuyoKomokuKubun',
-            'kyuyoKomokuName', 'order', 'processValue'
-        ]
-        
-        for field in comparison_fields:
-            field_mismatches[field] = 0
-        
-        # 各レコードファイルを処理
-        for output_file in output_files:
-            try:
-                csv_data = self.csv_reader.read_csv_as_dict(output_file)
-                total_items += len(csv_data)
-                
-                for record in csv_data:
-                    for field in comparison_fields:
-                        is_match_key = f"{field}_is_match"
-                        if is_match_key in record:
-                            # CSVから読み込まれた値は文字列なので、適切に変換
-                            is_match_value = record[is_match_key]
-                            if isinstance(is_match_value, str):
-                                is_match = is_match_value.lower() == 'true'
-                            else:
-                                is_match = bool(is_match_value)
-                            
-                            if not is_match:
-                                field_mismatches[field] += 1
-                                total_mismatches += 1
-            except Exception as e:
-                print(f"ファイル {output_file} の処理中にエラー: {e}")
-                continue
-        
-        return HtmlSummaryData(
-            total_records=total_records,
-            total_items=total_items,
-            total_mismatches=total_mismatches,
-            mismatch_rate=total_mismatches / total_items * 100 if total_items > 0 else 0,
-            field_mismatches=field_mismatches,
-            generated_at=datetime.now()
-        )
-    
-    def _generate_record_summary_data(self, output_files: List[str]) -> List[HtmlRecordSummaryData]:
-        """レコードサマリーデータを生成"""
-        record_summaries = []
-        
-        for output_file in output_files:
-            try:
-                csv_data = self.csv_reader.read_csv_as_dict(output_file)
-                
-                if not csv_data:
-                    continue
-                
-                record_id = csv_data[0]['record_id']
-                shain_id = csv_data[0]['shainId']
-                shain_name = csv_data[0]['shainName']
-                
-                total_items = len(csv_data)
-                total_mismatches = 0
-                
-                # 各フィールドの不一致数をカウント
-                field_mismatches = {}
-                comparison_fields = [
-                    'finalValue', 'kyuyoKomokuCode', 'kyuyoKomokuKubun',
-                    'kyuyoKomokuName', 'order', 'processValue'
-                ]
-                
-                for field in comparison_fields:
-                    field_mismatches[field] = 0
-                
-                for record in csv_data:
-                    for field in comparison_fields:
-                        is_match_key = f"{field}_is_match"
-                        if is_match_key in record:
-                            # CSVから読み込まれた値は文字列なので、適切に変換
-                            is_match_value = record[is_match_key]
-                            if isinstance(is_match_value, str):
-                                is_match = is_match_value.lower() == 'true'
-                            else:
-                                is_match = bool(is_match_value)
-                            
-                            if not is_match:
-                                field_mismatches[field] += 1
-                                total_mismatches += 1
-                
-                # 不一致があるレコードのみ追加
-                if total_mismatches > 0:
-                    record_summaries.append(HtmlRecordSummaryData(
-                        record_id=record_id,
-                        shain_id=shain_id,
-                        shain_name=shain_name,
-                        total_items=total_items,
-                        total_mismatches=total_mismatches,
-                        mismatch_rate=total_mismatches / total_items * 100 if total_items > 0 else 0,
-                        field_mismatches=field_mismatches
-                    ))
-            except Exception as e:
-                print(f"ファイル {output_file} の処理中にエラー: {e}")
-                continue
-        
-        return record_summaries
-    
-    def _generate_mismatch_detail_data(self, output_files: List[str]) -> List[HtmlMismatchDetailData]:
-        """不一致詳細データを生成"""
-        mismatch_details = []
-        
-        for output_file in output_files:
-            try:
-                csv_data = self.csv_reader.read_csv_as_dict(output_file)
-                
-                if not csv_data:
-                    continue
-                
-                record_id = csv_data[0]['record_id']
-                shain_id = csv_data[0]['shainId']
-                shain_name = csv_data[0]['shainName']
-                
-                comparison_fields = [
-                    'finalValue', 'kyuyoKomokuCode', 'kyuyoKomokuKubun',
-                    'kyuyoKomokuName', 'order', 'processValue'
-                ]
-                
-                for record in csv_data:
-                    kyuyo_komoku_code = record.get('kyuyoKomokuCode', '')
-                    kyuyo_komoku_name = record.get('kyuyoKomokuName', '')
-                    
-                    for field in comparison_fields:
-                        is_match_key = f"{field}_is_match"
-                        before_key = f"before_{field}"
-                        after_key = f"after_{field}"
-                        
-                        if is_match_key in record and before_key in record and after_key in record:
-                            # CSVから読み込まれた値は文字列なので、適切に変換
-                            is_match_value = record[is_match_key]
-                            if isinstance(is_match_value, str):
-                                is_match = is_match_value.lower() == 'true'
-                            else:
-                                is_match = bool(is_match_value)
-                            
-                            if not is_match:
-                                mismatch_details.append(HtmlMismatchDetailData(
-                                    record_id=record_id,
-                                    shain_id=shain_id,
-                                    shain_name=shain_name,
-                                    kyuyo_komoku_code=kyuyo_komoku_code,
-                                    kyuyo_komoku_name=kyuyo_komoku_name,
-                                    field_name=field,
-                                    before_value=record[before_key],
-                                    after_value=record[after_key],
-                                    is_match=is_match
-                                ))
-            except Exception as e:
-                print(f"ファイル {output_file} の処理中にエラー: {e}")
-                continue
-        
-        return mismatch_details
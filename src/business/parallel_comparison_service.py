@@ -0,0 +1,187 @@
+"""
+並列配列差分比較サービス
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple, Sequence, Optional
+
+from ..data.models import KyuyoRecord, ComparisonResult
+from ..data.record_partitioner import RecordPartitioner
+from .comparison_rules import FieldRule
+from .comparison_service import ComparisonService
+
+
+# ワーカープロセス内で使い回す比較サービス
+_worker_service = None
+
+
+def _init_worker(field_rules: Optional[List[FieldRule]]) -> None:
+    """ワーカープロセスの初期化"""
+    global _worker_service
+    _worker_service = ComparisonService(field_rules)
+
+
+def _compare_row_pairs(row_pairs: List[Tuple[Tuple[str, ...], Tuple[str, ...]]]) -> List[tuple]:
+    """
+    生のCSV行の組を比較してコンパクトな結果を返す（ワーカープロセスで実行）
+
+    Args:
+        row_pairs: (変更前の行, 変更後の行) のリスト
+
+    Returns:
+        ParallelComparisonService.pack_result 形式の結果のリスト
+    """
+    service = _worker_service
+    columns = KyuyoRecord.CSV_COLUMNS
+    results = []
+
+    for before_row, after_row in row_pairs:
+        before_record = KyuyoRecord.from_csv_row(dict(zip(columns, before_row)))
+        after_record = KyuyoRecord.from_csv_row(dict(zip(columns, after_row)))
+        result = service.compare_single_record(before_record, after_record)
+        results.append(ParallelComparisonService.pack_result(result, service.comparison_fields))
+
+    return results
+
+
+class ParallelComparisonService:
+    """並列配列差分比較サービス
+
+    record_idのハッシュでレコードをワーカー数分に分割し、
+    ProcessPoolExecutorで並列に比較する。ワーカーへは生のCSV行を渡し、
+    比較結果はタプルに詰めて返すことでプロセス間の転送量を抑える。
+    結果は逐次処理（ComparisonService.compare_records）と同じ順序で返す。
+    """
+
+    # 1回のタスクでワーカーに渡すレコード数
+    DEFAULT_BATCH_SIZE = 500
+
+    def __init__(
+        self,
+        workers: int,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        field_rules: Optional[List[FieldRule]] = None
+    ):
+        if workers < 1:
+            raise ValueError(f"ワーカー数は1以上を指定してください: {workers}")
+        if batch_size < 1:
+            raise ValueError(f"batch_sizeは1以上を指定してください: {batch_size}")
+
+        self.workers = workers
+        self.batch_size = batch_size
+        self.field_rules = field_rules
+        self.comparison_fields = ComparisonService(field_rules).comparison_fields
+
+    def compare_rows(
+        self,
+        before_rows: Sequence[Tuple[str, ...]],
+        after_rows: Sequence[Tuple[str, ...]]
+    ) -> List[ComparisonResult]:
+        """
+        生のCSV行を並列に比較する
+
+        Args:
+            before_rows: KyuyoRecord.CSV_COLUMNS 順の変更前の行
+            after_rows: KyuyoRecord.CSV_COLUMNS 順の変更後の行
+
+        Returns:
+            比較結果のリスト（before_items / after_items は転送しないため空）
+        """
+        # __id__をキーとして行をマッピング（重複時は最後の行を使用）
+        before_map = {row[0]: row for row in before_rows}
+        after_map = {row[0]: row for row in after_rows}
+
+        common_ids = [record_id for record_id in before_map if record_id in after_map]
+
+        # record_idのハッシュでパーティションに分割
+        partitions: List[List[Tuple[Tuple[str, ...], Tuple[str, ...]]]] = [[] for _ in range(self.workers)]
+        for record_id in common_ids:
+            partitions[RecordPartitioner.partition_of(record_id, self.workers)].append(
+                (before_map[record_id], after_map[record_id])
+            )
+
+        results_by_id: Dict[str, ComparisonResult] = {}
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.field_rules,)
+        ) as executor:
+            futures = [
+                executor.submit(_compare_row_pairs, partition[start:start + self.batch_size])
+                for partition in partitions
+                for start in range(0, len(partition), self.batch_size)
+            ]
+
+            for future in futures:
+                for packed in future.result():
+                    result = self.unpack_result(packed, self.comparison_fields)
+                    results_by_id[result.record_id] = result
+
+        return [results_by_id[record_id] for record_id in common_ids]
+
+    @staticmethod
+    def pack_result(result: ComparisonResult, comparison_fields: List[str]) -> tuple:
+        """
+        比較結果をプロセス間転送用のタプルに変換
+
+        Args:
+            result: 比較結果
+            comparison_fields: 比較対象フィールド
+
+        Returns:
+            (record_id, shain_id, shain_name, keisan_nengetsu, shori_nengetsu, 比較詳細のタプルのリスト)
+        """
+        details = []
+        for detail in result.comparison_details:
+            values = [detail['kyuyoKomokuCode'], detail['kyuyoKomokuName']]
+            for field in comparison_fields:
+                values.append(detail[f'before_{field}'])
+                values.append(detail[f'after_{field}'])
+                values.append(detail[f'{field}_is_match'])
+            details.append(tuple(values))
+
+        return (
+            result.record_id,
+            result.shain_id,
+            result.shain_name,
+            result.keisan_nengetsu,
+            result.shori_nengetsu,
+            details
+        )
+
+    @staticmethod
+    def unpack_result(packed: tuple, comparison_fields: List[str]) -> ComparisonResult:
+        """
+        プロセス間転送用のタプルを比較結果に戻す
+
+        Args:
+            packed: pack_result で変換したタプル
+            comparison_fields: 比較対象フィールド
+
+        Returns:
+            比較結果
+        """
+        record_id, shain_id, shain_name, keisan_nengetsu, shori_nengetsu, details = packed
+
+        comparison_details: List[Dict[str, Any]] = []
+        for values in details:
+            detail = {
+                'kyuyoKomokuCode': values[0],
+                'kyuyoKomokuName': values[1],
+            }
+            position = 2
+            for field in comparison_fields:
+                detail[f'before_{field}'] = values[position]
+                detail[f'after_{field}'] = values[position + 1]
+                detail[f'{field}_is_match'] = values[position + 2]
+                position += 3
+            comparison_details.append(detail)
+
+        return ComparisonResult(
+            record_id=record_id,
+            shain_id=shain_id,
+            shain_name=shain_name,
+            keisan_nengetsu=keisan_nengetsu,
+            shori_nengetsu=shori_nengetsu,
+            before_items=[],
+            after_items=[],
+            comparison_details=comparison_details
+        )
@@ -0,0 +1,395 @@
+"""
+パイプライン配列差分比較サービス
+"""
+import asyncio
+import concurrent.futures
+import csv
+import functools
+import heapq
+import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from ..data.csv_reader import CsvReader
+from ..data.models import KyuyoRecord
+from .comparison_rules import FieldRule
+from .comparison_service import ComparisonService
+from .summary_aggregator import SummaryAggregator
+
+
+# ワーカープロセス内で使い回す比較サービス・集計器・CSV変換器
+_worker_service = None
+_worker_aggregator = None
+_worker_buffer = None
+_worker_writer = None
+
+
+def _init_worker(field_rules: Optional[List[FieldRule]]) -> None:
+    """ワーカープロセスの初期化"""
+    global _worker_service, _worker_aggregator, _worker_buffer, _worker_writer
+    _worker_service = ComparisonService(field_rules)
+    _worker_aggregator = SummaryAggregator(_worker_service.comparison_fields)
+    _worker_buffer = io.StringIO()
+    _worker_writer = csv.DictWriter(_worker_buffer, fieldnames=_worker_service.get_csv_fieldnames())
+
+
+def _process_row_pairs(
+    row_pairs: List[Tuple[Tuple[str, ...], Tuple[str, ...]]],
+    mismatches_only: Optional[str]
+) -> List[tuple]:
+    """
+    生のCSV行の組をパース・比較し、出力するCSVの行と集計結果に変換する（ワーカープロセスで実行）
+
+    Args:
+        row_pairs: (変更前の行, 変更後の行) のリスト
+        mismatches_only: 一致したデータの出力を省略する単位
+
+    Returns:
+        PipelinedComparisonService.run の write_record に渡す形式のタプルのリスト
+    """
+    service = _worker_service
+    columns = KyuyoRecord.CSV_COLUMNS
+    outputs = []
+
+    for before_row, after_row in row_pairs:
+        before_record = KyuyoRecord.from_csv_row(dict(zip(columns, before_row)))
+        after_record = KyuyoRecord.from_csv_row(dict(zip(columns, after_row)))
+        result = service.compare_single_record(before_record, after_record)
+
+        _worker_buffer.seek(0)
+        _worker_buffer.truncate(0)
+        _worker_writer.writerows(service.generate_comparison_csv_data([result], mismatches_only))
+
+        field_mismatches, mismatch_details = _worker_aggregator.summarize_result(result)
+        outputs.append((
+            result.record_id,
+            result.shain_id,
+            result.shain_name,
+            len(result.comparison_details),
+            [field_mismatches[field] for field in service.comparison_fields],
+            mismatch_details,
+            _worker_buffer.getvalue()
+        ))
+
+    return outputs
+
+
+class DuplicateRecordError(Exception):
+    """出力済みのレコードと同じ record_id の行が後から見つかった場合の例外"""
+
+
+class PipelinedComparisonService:
+    """読み込み・パース・比較・書き込みを重ねて実行する配列差分比較サービス
+
+    各段階を上限付きのキューでつなぎ、asyncio で並行に進める:
+        読み込み: 変更前・変更後のファイルを2つのスレッドで同時に読み込み、生のCSV行を渡す
+        結合    : 両方のファイルに揃ったレコードから順に比較待ちにする
+        比較    : パース・比較・CSV行への変換・集計をワーカープロセスで並列に行う
+        書き込み: 比較結果を変更前ファイルの順に書き込みスレッドへ渡す
+
+    結果は逐次処理（ComparisonService.compare_records）と同じ順序・内容で書き込む。
+    変更前ファイルの順に書き込むため、先のレコードの変更後の行がまだ読まれていない場合は
+    その行が読まれるまで（変更後ファイルにない場合は読み込みが終わるまで）書き込みを待つ。
+    比較済みで書き込み待ちの結果は max_pending 件までとし、それ以上は
+    次に書き込むレコードを除いて比較を待たせる（パース済みのデータが溜まらないようにする）。
+    結合済みで書き込みを終えていないレコード（比較待ち・比較中・書き込み待ち）が max_pending 件に
+    達した場合は結合を止め、読み込みキューが埋まった時点で読み込みスレッドも待たせる。
+    ただし次に書き込むレコードの行が揃っていない場合は読み進めるため、
+    2つのファイルの行の順序が大きく異なる場合は、相手の行が見つかっていない生のCSV行が
+    並列比較（--workers）と同様に全件メモリに載る。
+
+    同じ record_id の行が書き込み後に見つかった場合は「最後の行を使う」という
+    逐次処理の結果と一致させられないため DuplicateRecordError を送出する。
+    """
+
+    # 1回のタスクでワーカーに渡すレコード数
+    DEFAULT_BATCH_SIZE = 100
+
+    # 読み込みスレッドが1回に渡す行数
+    READ_CHUNK_SIZE = 1000
+
+    # 読み込みスレッドから結合処理へのキューの上限（チャンク数）
+    READ_QUEUE_SIZE = 8
+
+    def __init__(
+        self,
+        workers: int,
+        field_rules: Optional[List[FieldRule]] = None,
+        mismatches_only: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_pending: Optional[int] = None
+    ):
+        """
+        Args:
+            workers: パース・比較を行うワーカープロセス数
+            field_rules: フィールドごとの比較ルール
+            mismatches_only: 一致したデータの出力を省略する単位
+            batch_size: 1回のタスクでワーカーに渡すレコード数
+            max_pending: 比較中・書き込み待ちにできるレコード数（省略時は workers × batch_size × 4）
+        """
+        if workers < 1:
+            raise ValueError(f"ワーカー数は1以上を指定してください: {workers}")
+        if batch_size < 1:
+            raise ValueError(f"batch_sizeは1以上を指定してください: {batch_size}")
+
+        self.workers = workers
+        self.field_rules = field_rules
+        self.mismatches_only = mismatches_only
+        self.batch_size = batch_size
+        self.max_pending = max_pending if max_pending is not None else workers * batch_size * 4
+        self.comparison_fields = ComparisonService(field_rules).comparison_fields
+
+    def run(
+        self,
+        before_file_path: str,
+        after_file_path: str,
+        write_record: Callable[[tuple], None]
+    ) -> int:
+        """
+        パイプラインを実行する
+
+        Args:
+            before_file_path: 変更前のCSVファイルパス
+            after_file_path: 変更後のCSVファイルパス
+            write_record: 1レコード分の結果を書き込む関数（書き込みスレッドで変更前ファイルの順に呼ばれる）
+                引数は (record_id, shain_id, shain_name, 項目数, 比較対象フィールド順の不一致数,
+                不一致詳細のタプルのリスト, ヘッダーなしのCSV形式の行)
+
+        Returns:
+            比較したレコード数
+        """
+        return asyncio.run(_Pipeline(self, write_record).run(before_file_path, after_file_path))
+
+
+class _Pipeline:
+    """PipelinedComparisonService.run の1回分の状態"""
+
+    def __init__(self, service: PipelinedComparisonService, write_record: Callable[[tuple], None]):
+        self.service = service
+        self.write_record = write_record
+
+        # 変更前ファイルの順（同じ record_id は最初の位置）の record_id
+        self.order: List[str] = []
+        self.positions: Dict[str, int] = {}
+        # record_id → 最後の行
+        self.rows: Tuple[Dict[str, Optional[tuple]], Dict[str, Optional[tuple]]] = ({}, {})
+        self.done = [False, False]
+
+        # 比較待ち: (変更前ファイルでの位置, record_id) のヒープ
+        self.ready: List[Tuple[int, str]] = []
+        self.queued: Set[str] = set()
+        # record_id → 最新の比較タスクの番号（古いタスクの結果は捨てる）
+        self.versions: Dict[str, int] = {}
+        self.results: Dict[str, tuple] = {}
+        # 比較中・書き込み待ちのレコード数
+        self.pending = 0
+        self.running: Set[asyncio.Future] = set()
+        # 書き込み済み（変更後ファイルにないため飛ばしたものを含む）の位置
+        self.written = 0
+        self.compared = 0
+
+        self.error: Optional[BaseException] = None
+        self.stopped = False
+        self.waiters: List[asyncio.Future] = []
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def run(self, before_file_path: str, after_file_path: str) -> int:
+        """読み込み・結合・比較・書き込みを並行に実行する"""
+        self.loop = asyncio.get_running_loop()
+        read_queue: asyncio.Queue = asyncio.Queue(PipelinedComparisonService.READ_QUEUE_SIZE)
+
+        with ThreadPoolExecutor(max_workers=2) as read_executor, \
+                ThreadPoolExecutor(max_workers=1) as write_executor, \
+                ProcessPoolExecutor(
+                    max_workers=self.service.workers,
+                    initializer=_init_worker,
+                    initargs=(self.service.field_rules,)
+                ) as pool:
+            tasks = [
+                self.loop.run_in_executor(read_executor, self._read_file, side, path, read_queue)
+                for side, path in enumerate((before_file_path, after_file_path))
+            ]
+            tasks += [
+                asyncio.ensure_future(self._join(read_queue)),
+                asyncio.ensure_future(self._dispatch(pool)),
+                asyncio.ensure_future(self._write(write_executor)),
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                self.stopped = True
+                for task in tasks:
+                    task.cancel()
+                for future in self.running:
+                    future.cancel()
+                raise
+
+        return self.compared
+
+    def _read_file(self, side: int, file_path: str, read_queue: asyncio.Queue) -> None:
+        """ファイルを読み込み、生の行をチャンクごとにキューへ渡す（読み込みスレッドで実行）"""
+        chunk = []
+        for row in CsvReader.iter_raw_rows(file_path):
+            if self.stopped:
+                return
+            chunk.append(row)
+            if len(chunk) >= PipelinedComparisonService.READ_CHUNK_SIZE:
+                self._put(read_queue, (side, chunk))
+                chunk = []
+        self._put(read_queue, (side, chunk))
+        self._put(read_queue, (side, None))
+
+    def _put(self, read_queue: asyncio.Queue, item: Any) -> None:
+        """キューに空きができるまで待って追加する（停止した場合は諦める）"""
+        future = asyncio.run_coroutine_threadsafe(read_queue.put(item), self.loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return
+            except concurrent.futures.TimeoutError:
+                if self.stopped:
+                    future.cancel()
+                    return
+
+    async def _join(self, read_queue: asyncio.Queue) -> None:
+        """読み込んだ行を record_id で結合し、両方のファイルに揃ったレコードを比較待ちにする"""
+        while not all(self.done):
+            # 比較待ち・比較中・書き込み待ちが上限に達している間は読み込みを止める
+            # （キューが埋まると読み込みスレッドも止まる）
+            while self._join_blocked():
+                await self._wait_for_change()
+            side, rows = await read_queue.get()
+            if rows is None:
+                self.done[side] = True
+            else:
+                other_rows = self.rows[1 - side]
+                for row in rows:
+                    record_id = row[0]
+                    if side == 0 and record_id not in self.positions:
+                        self.positions[record_id] = len(self.order)
+                        self.order.append(record_id)
+                    self.rows[side][record_id] = row
+                    if record_id in other_rows:
+                        self._mark_ready(record_id)
+            self._notify()
+
+    def _join_blocked(self) -> bool:
+        """結合済みで書き込みを終えていないレコードが上限に達しているか判定"""
+        if len(self.ready) + self.pending < self.service.max_pending:
+            return False
+        # 次に書き込むレコードの行が揃っていない場合は、読み進めないと書き込みが進まない
+        if self.written >= len(self.order):
+            return False
+        return self.order[self.written] in self.rows[1]
+
+    def _mark_ready(self, record_id: str) -> None:
+        """レコードを比較待ちにする（比較中の古い行の結果は捨てる）"""
+        if self.positions[record_id] < self.written:
+            raise DuplicateRecordError(f"書き込み済みのレコードと同じ__id__の行があります: {record_id}")
+
+        self.versions[record_id] = self.versions.get(record_id, 0) + 1
+        if self.results.pop(record_id, None) is not None:
+            self.pending -= 1
+        if record_id not in self.queued:
+            self.queued.add(record_id)
+            heapq.heappush(self.ready, (self.positions[record_id], record_id))
+
+    async def _dispatch(self, pool: ProcessPoolExecutor) -> None:
+        """比較待ちのレコードをバッチにまとめてワーカープロセスに渡す"""
+        while True:
+            if self.error is not None:
+                raise self.error
+
+            while self.ready and self._can_dispatch():
+                batch = []
+                versions = {}
+                while self.ready and len(batch) < self.service.batch_size:
+                    _, record_id = heapq.heappop(self.ready)
+                    self.queued.discard(record_id)
+                    versions[record_id] = self.versions[record_id]
+                    batch.append((self.rows[0][record_id], self.rows[1][record_id]))
+                self.pending += len(batch)
+
+                future = self.loop.run_in_executor(
+                    pool, _process_row_pairs, batch, self.service.mismatches_only
+                )
+                self.running.add(future)
+                future.add_done_callback(functools.partial(self._on_batch_done, versions))
+
+            if all(self.done) and not self.ready and not self.running:
+                return
+            await self._wait_for_change()
+
+    def _can_dispatch(self) -> bool:
+        """比較待ちの先頭からバッチを送れるか判定"""
+        next_needed = self.ready[0][0] == self.written
+        if not next_needed and not all(self.done) and len(self.ready) < self.service.batch_size:
+            # 読み込み中はバッチが揃うまで待つ
+            return False
+        # 書き込み待ちが上限に達していても、次に書き込むレコードは比較する
+        return next_needed or self.pending < self.service.max_pending
+
+    def _on_batch_done(self, versions: Dict[str, int], future: asyncio.Future) -> None:
+        """ワーカーの結果を受け取る（最新の行で比較した結果だけを残す）"""
+        self.running.discard(future)
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.error = future.exception()
+        else:
+            for output in future.result():
+                record_id = output[0]
+                if self.versions.get(record_id) == versions[record_id]:
+                    self.results[record_id] = output
+                else:
+                    self.pending -= 1
+        self._notify()
+
+    async def _write(self, write_executor: ThreadPoolExecutor) -> None:
+        """比較結果を変更前ファイルの順に書き込む"""
+        while True:
+            if self.error is not None:
+                raise self.error
+
+            if self.written < len(self.order):
+                record_id = self.order[self.written]
+                if record_id in self.rows[1]:
+                    output = self.results.pop(record_id, None)
+                    if output is not None:
+                        # 書き込み中に同じ record_id の行が見つかった場合も検出できるよう先に進める
+                        self.written += 1
+                        self._release_rows(record_id)
+                        self.pending -= 1
+                        self.compared += 1
+                        self._notify()
+                        await self.loop.run_in_executor(write_executor, self.write_record, output)
+                        continue
+                elif self.done[1]:
+                    # 変更後ファイルにないレコードは比較しない
+                    self.written += 1
+                    self._release_rows(record_id)
+                    self._notify()
+                    continue
+            elif all(self.done):
+                return
+
+            await self._wait_for_change()
+
+    def _release_rows(self, record_id: str) -> None:
+        """書き込み済みのレコードの行を解放する（record_id は重複の検出に使うため残す）"""
+        self.rows[0][record_id] = None
+        if record_id in self.rows[1]:
+            self.rows[1][record_id] = None
+
+    def _notify(self) -> None:
+        """状態の変化を待っている処理を再開する"""
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _wait_for_change(self) -> None:
+        """状態が変化するまで待つ"""
+        waiter = self.loop.create_future()
+        self.waiters.append(waiter)
+        await waiter
@@ -0,0 +1,387 @@
+"""
+シャードごとの部分サマリーの保存と統合
+"""
+import csv
+import hashlib
+import heapq
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..data.html_models import HtmlMismatchDetailData
+from .summary_aggregator import SummaryAggregator
+
+
+def top_records(records: Iterable[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+    """
+    不一致数が多い順に上位k件のレコード別サマリーを取得（不一致数が同じ場合はレコードID順）
+
+    Args:
+        records: レコード別サマリー（SummaryAggregator.get_record_summaries の形式）
+        k: 件数
+
+    Returns:
+        上位k件のレコード別サマリー
+    """
+    return heapq.nsmallest(k, records, key=lambda record: (-record['total_mismatches'], record['record_id']))
+
+
+class ShardSummary:
+    """compare --shard で比較した1つのシャードの部分サマリー
+
+    シャードの出力ディレクトリに次のファイルとして保存し、MergedShardSummary で統合する。
+        shard_summary.json: シャード番号・比較条件・全体の件数・フィールド別不一致数・不一致数の上位K件
+        shard_records.csv : 不一致があるレコードごとの件数（レコード別サマリー）
+        shard_details.csv : 不一致詳細（SummaryAggregator の形式）
+    件数はシャード間で足し合わせられ、全体の上位K件は各シャードの上位K件から求められる。
+    shard_summary.json は最後に書き込むため、途中で終了したシャードは統合できない。
+    """
+
+    FILE_NAME = 'shard_summary.json'
+    RECORDS_FILE_NAME = 'shard_records.csv'
+    DETAILS_FILE_NAME = 'shard_details.csv'
+
+    # 部分サマリーの形式を変更した場合は上げる
+    FORMAT_VERSION = 2
+
+    # 入力ファイルの識別に使う先頭・末尾のバイト数
+    SIGNATURE_SAMPLE_BYTES = 64 * 1024
+
+    DEFAULT_TOP_K = 20
+
+    def __init__(self, output_dir: str, header: Dict[str, Any]):
+        """
+        Args:
+            output_dir: シャードの出力ディレクトリ
+            header: shard_summary.json の内容
+        """
+        self.output_dir = output_dir
+        self.header = header
+
+    @property
+    def shard(self) -> Tuple[int, int]:
+        """(シャード番号, シャード数)"""
+        index, count = self.header['shard']
+        return index, count
+
+    @property
+    def comparison_fields(self) -> List[str]:
+        """比較対象フィールド"""
+        return self.header['fields']
+
+    @property
+    def inputs(self) -> List[Dict[str, Any]]:
+        """変更前・変更後ファイルの識別情報"""
+        return self.header['inputs']
+
+    @classmethod
+    def input_signature(cls, file_path: str) -> Dict[str, Any]:
+        """
+        入力ファイルの識別情報を取得（統合時に全シャードが同じ入力を比較したことを確認する）
+
+        シャードごとに別のマシンへコピーした入力でも一致するよう、パス・更新日時ではなく
+        ファイル名・サイズ・先頭と末尾のハッシュ値を使う（大きな入力を読み直さない）。
+
+        Args:
+            file_path: 入力ファイルのパス
+
+        Returns:
+            {'name': ファイル名, 'size': サイズ, 'digest': 先頭と末尾のハッシュ値}
+        """
+        size = os.path.getsize(file_path)
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as file:
+            digest.update(file.read(cls.SIGNATURE_SAMPLE_BYTES))
+            if size > cls.SIGNATURE_SAMPLE_BYTES:
+                file.seek(max(cls.SIGNATURE_SAMPLE_BYTES, size - cls.SIGNATURE_SAMPLE_BYTES))
+                digest.update(file.read())
+        return {'name': os.path.basename(file_path), 'size': size, 'digest': digest.hexdigest()}
+
+    @classmethod
+    def write(
+        cls,
+        aggregator: SummaryAggregator,
+        output_dir: str,
+        shard: Tuple[int, int],
+        config_key: str,
+        before_file_path: str,
+        after_file_path: str,
+        top_k: int = DEFAULT_TOP_K
+    ) -> 'ShardSummary':
+        """
+        比較処理で集計したサマリーを部分サマリーとして保存する
+
+        Args:
+            aggregator: シャードの比較処理で集計したアグリゲーター
+            output_dir: シャードの出力ディレクトリ
+            shard: (シャード番号, シャード数)
+            config_key: 比較条件のハッシュ値（統合時に全シャードで一致することを確認する）
+            before_file_path: 変更前のCSVファイルパス
+            after_file_path: 変更後のCSVファイルパス
+            top_k: 保存する不一致数の上位のレコード数
+
+        Returns:
+            保存した部分サマリー
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        summary = aggregator.get_summary()
+        record_summaries = aggregator.get_record_summaries()
+        fields = aggregator.comparison_fields
+
+        header = {
+            'version': cls.FORMAT_VERSION,
+            'shard': list(shard),
+            'fields': fields,
+            'config': config_key,
+            'before_file': os.path.basename(before_file_path),
+            'after_file': os.path.basename(after_file_path),
+            'inputs': [cls.input_signature(before_file_path), cls.input_signature(after_file_path)],
+            'total_records': summary['total_records'],
+            'total_items': summary['total_items'],
+            'total_mismatches': summary['total_mismatches'],
+            'field_mismatches': summary['field_mismatches'],
+            'mismatch_record_count': len(record_summaries),
+            'top_k': top_k,
+            'top_records': top_records(record_summaries, top_k),
+        }
+        shard_summary = cls(output_dir, header)
+
+        path = os.path.join(output_dir, cls.FILE_NAME)
+        temp_path = path + '.tmp'
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+
+            with open(shard_summary.records_path, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(
+                    ['record_id', 'shain_id', 'shain_name', 'total_items', 'total_mismatches']
+                    + [f'{field}_mismatches' for field in fields]
+                )
+                for record in record_summaries:
+                    writer.writerow(
+                        [
+                            record['record_id'], record['shain_id'], record['shain_name'],
+                            record['total_items'], record['total_mismatches']
+                        ]
+                        + [record['field_mismatches'][field] for field in fields]
+                    )
+
+            aggregator.write_mismatch_details(shard_summary.details_path)
+
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(header, file, ensure_ascii=False, indent=2)
+            os.replace(temp_path, path)
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise Exception(f"部分サマリーの書き込み中にエラーが発生しました: {e}")
+
+        return shard_summary
+
+    @classmethod
+    def load(cls, output_dir: str) -> 'ShardSummary':
+        """
+        シャードの出力ディレクトリから部分サマリーを読み込む
+
+        Args:
+            output_dir: シャードの出力ディレクトリ
+
+        Returns:
+            部分サマリー
+        """
+        path = os.path.join(output_dir, cls.FILE_NAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                header = json.load(file)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"部分サマリーが見つかりません: {path}")
+        except ValueError as e:
+            raise ValueError(f"部分サマリーの形式が不正です: {path}（{e}）")
+
+        if header.get('version') != cls.FORMAT_VERSION:
+            raise ValueError(f"部分サマリーの形式のバージョンが異なります: {path}")
+        return cls(output_dir, header)
+
+    @property
+    def records_path(self) -> str:
+        """レコード別サマリーのファイルのパス"""
+        return os.path.join(self.output_dir, self.RECORDS_FILE_NAME)
+
+    @property
+    def details_path(self) -> str:
+        """不一致詳細のファイルのパス"""
+        return os.path.join(self.output_dir, self.DETAILS_FILE_NAME)
+
+    def iter_record_summaries(self) -> Iterator[Dict[str, Any]]:
+        """
+        レコード別サマリーを読み込む
+
+        Returns:
+            SummaryAggregator.get_record_summaries と同じ形式の辞書のイテレーター
+        """
+        fields = self.comparison_fields
+        with open(self.records_path, 'r', newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            for row in reader:
+                total_items = int(row[3])
+                total_mismatches = int(row[4])
+                yield {
+                    'record_id': row[0],
+                    'shain_id': row[1],
+                    'shain_name': row[2],
+                    'total_items': total_items,
+                    'total_mismatches': total_mismatches,
+                    'field_mismatches': {field: int(value) for field, value in zip(fields, row[5:])},
+                    'mismatch_rate': total_mismatches / total_items * 100 if total_items > 0 else 0
+                }
+
+    def iter_mismatch_details(self) -> Iterator[HtmlMismatchDetailData]:
+        """
+        不一致詳細を1件ずつ読み出す
+
+        Returns:
+            不一致詳細データのイテレーター
+        """
+        with open(self.details_path, 'r', newline='', encoding='utf-8') as file:
+            for row in csv.reader(file):
+                yield HtmlMismatchDetailData(*row, is_match=False)
+
+
+class MergedShardSummary:
+    """全シャードの部分サマリーを統合したサマリー
+
+    get_summary / get_record_summaries / iter_mismatch_details を持つため、
+    SummaryAggregator と同様に HtmlReportService の集計元として使用できる。
+    全体の件数と上位K件は shard_summary.json だけから求め、レコード別サマリーと
+    不一致詳細はHTMLレポートの生成時にシャードの順に読み出す。
+    """
+
+    def __init__(self, shards: List[ShardSummary]):
+        """
+        Args:
+            shards: 全シャードの部分サマリー（順不同）
+
+        Raises:
+            ValueError: シャード数・比較条件・入力ファイルが一致しない場合、シャードが重複・不足している場合
+        """
+        if not shards:
+            raise ValueError("統合する部分サマリーを指定してください")
+
+        first = shards[0]
+        shard_count = first.shard[1]
+        for shard in shards:
+            if shard.shard[1] != shard_count:
+                raise ValueError(
+                    f"シャード数が一致しません: {shard.output_dir}（{shard.shard[1]}、他: {shard_count}）"
+                )
+            if shard.header['config'] != first.header['config'] or shard.comparison_fields != first.comparison_fields:
+                raise ValueError(f"比較条件が他のシャードと異なります: {shard.output_dir}")
+            if shard.inputs != first.inputs:
+                raise ValueError(
+                    f"入力ファイルが他のシャードと異なります: {shard.output_dir}"
+                    f"（{', '.join(item['name'] for item in shard.inputs)}、"
+                    f"他: {', '.join(item['name'] for item in first.inputs)}）"
+                )
+
+        by_index: Dict[int, ShardSummary] = {}
+        for shard in shards:
+            index = shard.shard[0]
+            if index in by_index:
+                raise ValueError(
+                    f"シャード {index} が重複しています: {by_index[index].output_dir}, {shard.output_dir}"
+                )
+            by_index[index] = shard
+
+        missing = [index for index in range(shard_count) if index not in by_index]
+        if missing:
+            raise ValueError(f"シャードが不足しています: {', '.join(f'{index}/{shard_count}' for index in missing)}")
+
+        self.shards = [by_index[index] for index in range(shard_count)]
+        self.comparison_fields = list(first.comparison_fields)
+        self.before_file_name = first.header['before_file']
+        self.after_file_name = first.header['after_file']
+
+    @property
+    def top_k(self) -> int:
+        """統合後に求められる上位の件数（各シャードで保存した件数の最小値）"""
+        return min(shard.header['top_k'] for shard in self.shards)
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        全体サマリーを取得
+
+        Returns:
+            SummaryAggregator.get_summary と同じ形式のサマリー情報
+        """
+        total_records = sum(shard.header['total_records'] for shard in self.shards)
+        total_items = sum(shard.header['total_items'] for shard in self.shards)
+        total_mismatches = sum(shard.header['total_mismatches'] for shard in self.shards)
+        field_mismatches = {field: 0 for field in self.comparison_fields}
+        for shard in self.shards:
+            for field, count in shard.header['field_mismatches'].items():
+                field_mismatches[field] += count
+
+        return {
+            'total_records': total_records,
+            'total_items': total_items,
+            'total_mismatches': total_mismatches,
+            'field_mismatches': field_mismatches,
+            'mismatch_rate': total_mismatches / total_items * 100 if total_items > 0 else 0
+        }
+
+    @property
+    def mismatch_record_count(self) -> int:
+        """不一致があるレコード数"""
+        return sum(shard.header['mismatch_record_count'] for shard in self.shards)
+
+    def get_top_records(self, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        不一致数が多い順に上位k件のレコード別サマリーを取得
+
+        Args:
+            k: 件数（Noneまたは top_k より大きい場合は top_k）
+
+        Returns:
+            上位k件のレコード別サマリー
+        """
+        k = self.top_k if k is None else min(k, self.top_k)
+        return top_records(
+            (record for shard in self.shards for record in shard.header['top_records']), k
+        )
+
+    def get_record_summaries(self) -> List[Dict[str, Any]]:
+        """
+        不一致があるレコードのサマリーをシャードの順に取得
+
+        Returns:
+            レコード別サマリー情報のリスト
+        """
+        return [record for shard in self.shards for record in shard.iter_record_summaries()]
+
+    def iter_mismatch_details(self) -> Iterator[HtmlMismatchDetailData]:
+        """
+        不一致詳細をシャードの順に1件ずつ読み出す
+
+        Returns:
+            不一致詳細データのイテレーター
+        """
+        for shard in self.shards:
+            yield from shard.iter_mismatch_details()
+
+    def to_dict(self, k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        統合したサマリーを辞書に変換（merged_summary.json の内容）
+
+        Args:
+            k: 上位の件数（Noneの場合は top_k）
+
+        Returns:
+            全体サマリー・不一致があるレコード数・上位k件・統合したシャード
+        """
+        summary = self.get_summary()
+        summary['mismatch_record_count'] = self.mismatch_record_count
+        summary['top_records'] = self.get_top_records(k)
+        summary['shards'] = [shard.output_dir for shard in self.shards]
+        return summary
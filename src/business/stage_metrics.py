@@ -0,0 +1,224 @@
+"""
+処理段階ごとの計測
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows では resource が使えないためメモリは計測しない
+    resource = None
+
+
+class StageMetrics:
+    """処理段階ごとの経過時間・CPU時間・ピークメモリ・処理件数を計測するクラス
+
+    start / stop で囲んだ区間の時間を段階ごとに積算する。区間は入れ子にでき、
+    内側の段階の時間は外側の段階から差し引く（例: compare の中で呼ばれた parse）。
+    ストリーミング処理のように段階が交互に進む場合も、iterate で
+    イテレーターを包むと next() にかかった時間をその段階に積算する。
+
+    メモリはプロセスのピークRSS（resource.getrusage）を区間の前後で取得し、
+    区間内で増えた分をその段階に割り当てる。tracemalloc と違い
+    計測対象の処理を遅くしない。
+    """
+
+    # 表示順（ここにない段階は後ろに追加する）
+    STAGES = ('index', 'read', 'sort', 'partition', 'parse', 'compare', 'write', 'summarize', 'merge', 'render')
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+        # [段階, 開始時刻, 開始CPU時間, 開始時ピークRSS, 内側の経過時間, 内側のCPU時間, 内側のRSS増加]
+        self._stack: List[List[Any]] = []
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def start(self, stage: str) -> None:
+        """
+        段階の計測を開始する
+
+        Args:
+            stage: 段階名
+        """
+        self._stack.append([stage, time.perf_counter(), time.process_time(), self._peak_rss(), 0.0, 0.0, 0])
+
+    def stop(self, records: int = 0, items: int = 0) -> None:
+        """
+        直前に開始した段階の計測を終了する
+
+        Args:
+            records: この区間で処理したレコード数
+            items: この区間で処理した給与項目数
+        """
+        stage, wall_start, cpu_start, rss_start, child_wall, child_cpu, child_rss = self._stack.pop()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        rss_increase = self._peak_rss() - rss_start
+
+        metrics = self._stages.get(stage)
+        if metrics is None:
+            metrics = self._stages[stage] = {
+                'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                'peak_rss_increase': 0, 'records': 0, 'items': 0
+            }
+        metrics['calls'] += 1
+        metrics['wall_seconds'] += wall - child_wall
+        metrics['cpu_seconds'] += cpu - child_cpu
+        metrics['peak_rss_increase'] += rss_increase - child_rss
+        metrics['records'] += records
+        metrics['items'] += items
+
+        if self._stack:
+            parent = self._stack[-1]
+            parent[4] += wall
+            parent[5] += cpu
+            parent[6] += rss_increase
+
+    def measure(self, stage: str, records: int = 0, items: int = 0) -> '_MeasuredBlock':
+        """
+        with 文で区間を計測する
+
+        Args:
+            stage: 段階名
+            records: この区間で処理するレコード数
+            items: この区間で処理する給与項目数
+
+        Returns:
+            コンテキストマネージャー（records / items 属性で件数を変更できる）
+        """
+        return _MeasuredBlock(self, stage, records, items)
+
+    def iterate(self, stage: str, iterable: Iterable[Any]) -> Iterator[Any]:
+        """
+        イテレーターの next() にかかった時間を段階に積算する
+
+        Args:
+            stage: 段階名
+            iterable: 計測対象のイテレーター
+
+        Returns:
+            同じ要素を返すイテレーター（1要素を1レコードとして数える）
+        """
+        iterator = iter(iterable)
+        while True:
+            self.start(stage)
+            try:
+                value = next(iterator)
+            except StopIteration:
+                self.stop()
+                return
+            except BaseException:
+                self.stop()
+                raise
+            self.stop(records=1)
+            yield value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        計測結果を辞書に変換
+
+        Returns:
+            段階ごとの計測結果と全体の経過時間・CPU時間・ピークRSS
+        """
+        stages = {}
+        for stage in self._ordered_stages():
+            metrics = self._stages[stage]
+            wall = metrics['wall_seconds']
+            stages[stage] = {
+                'calls': metrics['calls'],
+                'wall_seconds': round(wall, 6),
+                'cpu_seconds': round(metrics['cpu_seconds'], 6),
+                'peak_rss_increase_mb': self._to_mb(metrics['peak_rss_increase']),
+                'records': metrics['records'],
+                'items': metrics['items'],
+                'items_per_second': round(metrics['items'] / wall, 1) if wall > 0 and metrics['items'] else None,
+            }
+
+        return {
+            'total_wall_seconds': round(time.perf_counter() - self._wall_start, 6),
+            'total_cpu_seconds': round(time.process_time() - self._cpu_start, 6),
+            'peak_rss_mb': self._to_mb(self._peak_rss()),
+            'stages': stages,
+        }
+
+    def format_table(self) -> str:
+        """
+        計測結果を表形式の文字列に変換
+
+        Returns:
+            表示用の文字列
+        """
+        data = self.to_dict()
+        lines = [
+            f"{'段階':<10}{'回数':>10}{'経過時間(秒)':>14}{'CPU時間(秒)':>14}"
+            f"{'RSS増加(MB)':>14}{'レコード数':>12}{'項目数':>14}{'項目/秒':>14}"
+        ]
+        for stage, metrics in data['stages'].items():
+            rss = metrics['peak_rss_increase_mb']
+            throughput = metrics['items_per_second']
+            lines.append(
+                f"{stage:<10}{metrics['calls']:>10,}{metrics['wall_seconds']:>14.3f}"
+                f"{metrics['cpu_seconds']:>14.3f}{'-' if rss is None else f'{rss:,.1f}':>14}"
+                f"{metrics['records']:>12,}{metrics['items']:>14,}"
+                f"{'-' if throughput is None else f'{throughput:,.0f}':>14}"
+            )
+        peak_rss = data['peak_rss_mb']
+        lines.append(
+            f"合計経過時間: {data['total_wall_seconds']:.3f}秒 / CPU時間: {data['total_cpu_seconds']:.3f}秒"
+            + ('' if peak_rss is None else f" / ピークRSS: {peak_rss:,.1f}MB")
+        )
+        return '\n'.join(lines)
+
+    def write_json(self, output_path: str) -> None:
+        """
+        計測結果をJSONファイルに書き込む
+
+        Args:
+            output_path: 出力ファイルのパス
+        """
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+
+    def _ordered_stages(self) -> List[str]:
+        """表示順に並べた段階名を取得"""
+        known = [stage for stage in self.STAGES if stage in self._stages]
+        return known + [stage for stage in self._stages if stage not in self.STAGES]
+
+    @staticmethod
+    def _peak_rss() -> int:
+        """プロセスのピークRSSをバイト単位で取得（計測できない場合は0）"""
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux は KB、macOS はバイト単位
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    @staticmethod
+    def _to_mb(value: int) -> Optional[float]:
+        """バイト数をMBに変換（メモリを計測できない場合はNone）"""
+        if resource is None:
+            return None
+        return round(value / 1024 / 1024, 1)
+
+
+class _MeasuredBlock:
+    """StageMetrics.measure が返すコンテキストマネージャー"""
+
+    __slots__ = ('_metrics', '_stage', 'records', 'items')
+
+    def __init__(self, metrics: StageMetrics, stage: str, records: int, items: int):
+        self._metrics = metrics
+        self._stage = stage
+        self.records = records
+        self.items = items
+
+    def __enter__(self) -> '_MeasuredBlock':
+        self._metrics.start(self._stage)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._metrics.stop(self.records, self.items)
@@ -0,0 +1,304 @@
+"""
+比較結果サマリー集計サービス
+"""
+import csv
+import io
+import shutil
+import tempfile
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
+
+from ..data.csv_reader import CsvReader
+from ..data.models import ComparisonResult
+from ..data.html_models import HtmlMismatchDetailData
+
+
+class SummaryAggregator:
+    """比較結果を1パスで集計するアグリゲーター
+
+    process_comparison の実行中に ComparisonResult を1件ずつ受け取り、
+    全体・レコード別・フィールド別の不一致数と不一致詳細を集計する。
+    出力済みCSVを読み直さずにサマリー表示とHTMLレポートを生成できる。
+    比較処理を実行していない出力ディレクトリは add_output_files で読み直して集計する。
+    不一致詳細は件数に比例して増えるため、メモリには保持せず
+    一時ファイルに書き出し、iter_mismatch_details で先頭から読み出す。
+    """
+
+    def __init__(self, comparison_fields: List[str]):
+        self.comparison_fields = list(comparison_fields)
+        self._detail_spool: Optional[Any] = None
+        self._detail_writer = None
+        self.reset()
+
+    def reset(self) -> None:
+        """集計結果を初期化"""
+        self.total_records = 0
+        self.total_items = 0
+        self.total_mismatches = 0
+        self.field_mismatches = {field: 0 for field in self.comparison_fields}
+        self.record_summaries: List[Dict[str, Any]] = []
+        self.close()
+
+    def close(self) -> None:
+        """不一致詳細の一時ファイルを削除する"""
+        if self._detail_spool is not None:
+            self._detail_spool.close()
+        self._detail_spool = None
+        self._detail_writer = None
+
+    def add_result(self, result: ComparisonResult) -> None:
+        """
+        比較結果を1件集計に追加する
+
+        Args:
+            result: 比較結果
+        """
+        self._add_details(
+            result.record_id, result.shain_id, result.shain_name, result.comparison_details
+        )
+
+    def add_output_files(self, output_files: Iterable[str]) -> None:
+        """
+        出力済みのレコード別CSVを読み直して集計に追加する
+
+        読み込めないファイルはエラーを表示して読み飛ばす。
+
+        Args:
+            output_files: 出力ファイルパスのリスト
+        """
+        for output_file in output_files:
+            try:
+                self.add_output_file(output_file)
+            except Exception as e:
+                print(f"ファイル {output_file} の処理中にエラー: {e}")
+
+    def add_output_file(self, output_file_path: str) -> Dict[str, Any]:
+        """
+        出力済みのレコード別CSVを1ファイル読み直して集計に追加する
+
+        Args:
+            output_file_path: 出力ファイルパス
+
+        Returns:
+            レコード別サマリー情報（空のファイルの場合は空の辞書）
+        """
+        rows = CsvReader.read_csv_as_dict(output_file_path)
+        if not rows:
+            self.total_records += 1
+            return {}
+
+        # CSVから読み込んだ一致フラグは文字列なので変換する（列がないフィールドは一致とみなす）
+        details = []
+        for row in rows:
+            detail = dict(row)
+            for field in self.comparison_fields:
+                detail[f'{field}_is_match'] = str(row.get(f'{field}_is_match', 'True')).lower() == 'true'
+            details.append(detail)
+
+        return self._add_details(rows[0]['record_id'], rows[0]['shainId'], rows[0]['shainName'], details)
+
+    def summarize_result(self, result: ComparisonResult) -> Tuple[Dict[str, int], List[tuple]]:
+        """
+        比較結果からフィールドごとの不一致数と不一致詳細を取得する
+
+        Args:
+            result: 比較結果
+
+        Returns:
+            (フィールド → 不一致数, 不一致詳細の値のタプルのリスト)
+            不一致詳細の値はCSV出力時と同じ文字列表現
+        """
+        return self._summarize_details(
+            result.record_id, result.shain_id, result.shain_name, result.comparison_details
+        )
+
+    def _add_details(
+        self,
+        record_id: str,
+        shain_id: str,
+        shain_name: str,
+        comparison_details: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """1レコード分の比較詳細を集計に追加し、レコード別サマリーを返す"""
+        field_mismatches, mismatch_details = self._summarize_details(
+            record_id, shain_id, shain_name, comparison_details
+        )
+        return self.add_record_summary(
+            record_id,
+            shain_id,
+            shain_name,
+            len(comparison_details),
+            field_mismatches,
+            mismatch_details
+        )
+
+    def _summarize_details(
+        self,
+        record_id: str,
+        shain_id: str,
+        shain_name: str,
+        comparison_details: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, int], List[tuple]]:
+        """比較詳細からフィールドごとの不一致数と不一致詳細を取得する（summarize_result を参照）"""
+        field_mismatches = {field: 0 for field in self.comparison_fields}
+        mismatch_details = []
+
+        for detail in comparison_details:
+            for field in self.comparison_fields:
+                if detail.get(f'{field}_is_match', False):
+                    continue
+
+                field_mismatches[field] += 1
+                mismatch_details.append((
+                    record_id,
+                    shain_id,
+                    shain_name,
+                    detail.get('kyuyoKomokuCode', ''),
+                    detail.get('kyuyoKomokuName', ''),
+                    field,
+                    self._to_csv_text(detail.get(f'before_{field}')),
+                    self._to_csv_text(detail.get(f'after_{field}'))
+                ))
+
+        return field_mismatches, mismatch_details
+
+    def add_record_summary(
+        self,
+        record_id: str,
+        shain_id: str,
+        shain_name: str,
+        total_items: int,
+        field_mismatches: Dict[str, int],
+        mismatch_details: Iterable[tuple] = ()
+    ) -> Dict[str, Any]:
+        """
+        フィールドごとの不一致数と不一致詳細から1レコード分を集計に追加する
+
+        add_result のほか、前回の実行で集計したレコードを比較し直さずに
+        サマリーへ加えるために使用する。
+
+        Args:
+            record_id: レコードID
+            shain_id: 社員ID
+            shain_name: 社員名
+            total_items: 項目数
+            field_mismatches: フィールド → 不一致数
+            mismatch_details: 不一致詳細（summarize_result で取得する形式の値のタプル）
+
+        Returns:
+            レコード別サマリー情報
+        """
+        record_mismatches = sum(field_mismatches.values())
+
+        self.total_records += 1
+        self.total_items += total_items
+        self.total_mismatches += record_mismatches
+        for field, count in field_mismatches.items():
+            self.field_mismatches[field] += count
+
+        for values in mismatch_details:
+            self._spool_mismatch_detail(values)
+
+        record_summary = {
+            'record_id': record_id,
+            'shain_id': shain_id,
+            'shain_name': shain_name,
+            'total_items': total_items,
+            'total_mismatches': record_mismatches,
+            'field_mismatches': dict(field_mismatches),
+            'mismatch_rate': record_mismatches / total_items * 100 if total_items > 0 else 0
+        }
+        if record_mismatches > 0:
+            self.record_summaries.append(record_summary)
+        return record_summary
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        全体サマリーを取得
+
+        Returns:
+            サマリー情報
+        """
+        return {
+            'total_records': self.total_records,
+            'total_items': self.total_items,
+            'total_mismatches': self.total_mismatches,
+            'field_mismatches': dict(self.field_mismatches),
+            'mismatch_rate': self.total_mismatches / self.total_items * 100 if self.total_items > 0 else 0
+        }
+
+    def get_record_summaries(self) -> List[Dict[str, Any]]:
+        """
+        不一致があるレコードのサマリーを取得
+
+        Returns:
+            レコード別サマリー情報のリスト
+        """
+        return self.record_summaries
+
+    def get_mismatch_details(self) -> List[HtmlMismatchDetailData]:
+        """
+        不一致詳細を取得
+
+        Returns:
+            不一致詳細データのリスト
+        """
+        return list(self.iter_mismatch_details())
+
+    def iter_mismatch_details(self) -> Iterator[HtmlMismatchDetailData]:
+        """
+        不一致詳細を一時ファイルから1件ずつ読み出す
+
+        走査中に add_result を呼び出してはならない。
+
+        Returns:
+            不一致詳細データのイテレーター（集計順）
+        """
+        spool = self._detail_spool
+        if spool is None:
+            return
+
+        spool.flush()
+        spool.seek(0)
+        try:
+            for row in csv.reader(spool):
+                yield HtmlMismatchDetailData(*row, is_match=False)
+        finally:
+            # 続けて集計できるよう書き込み位置を末尾に戻す
+            spool.seek(0, io.SEEK_END)
+
+    def write_mismatch_details(self, output_path: str) -> None:
+        """
+        不一致詳細を一時ファイルの形式（CSV）のままファイルにコピーする
+
+        走査中に add_result を呼び出してはならない。
+
+        Args:
+            output_path: 出力ファイルのパス
+        """
+        with open(output_path, 'w', newline='', encoding='utf-8') as file:
+            spool = self._detail_spool
+            if spool is None:
+                return
+
+            spool.flush()
+            spool.seek(0)
+            try:
+                shutil.copyfileobj(spool, file)
+            finally:
+                spool.seek(0, io.SEEK_END)
+
+    def _spool_mismatch_detail(self, values: tuple) -> None:
+        """不一致詳細を一時ファイルに1行書き出す"""
+        if self._detail_spool is None:
+            self._detail_spool = tempfile.TemporaryFile(
+                mode='w+', newline='', encoding='utf-8', prefix='mismatch_details_'
+            )
+            self._detail_writer = csv.writer(self._detail_spool)
+        self._detail_writer.writerow(values)
+
+    @staticmethod
+    def _to_csv_text(value: Any) -> str:
+        """CSV出力時と同じ文字列表現に変換"""
+        if value is None:
+            return ''
+        return str(value)
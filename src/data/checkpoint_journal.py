@@ -0,0 +1,341 @@
+"""
+比較処理の途中経過のジャーナル
+"""
+import csv
+import io
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class JournalEntry:
+    """ジャーナルの1レコード分のエントリー"""
+    __slots__ = (
+        'record_id',
+        'shain_id',
+        'shain_name',
+        'total_items',
+        'field_mismatches',
+        'file_name',
+        'offset',
+        'length',
+        'details_offset',
+        'details_length'
+    )
+
+    record_id: str
+    shain_id: str
+    shain_name: str
+    total_items: int
+    # 比較対象フィールド順の不一致数
+    field_mismatches: List[int]
+    # 出力したCSVのファイル名（出力しなかった場合は空）
+    file_name: str
+    # 集約CSVの場合はファイル内の位置とバイト長（レコードごとのCSVの場合は0）
+    offset: int
+    length: int
+    # 不一致詳細ファイル内の位置とバイト長（add で設定する）
+    details_offset: int
+    details_length: int
+
+
+class CheckpointJournal:
+    """比較を終えたレコードと集計結果を出力ディレクトリに追記するジャーナル
+
+    比較処理が途中で終了した場合（メモリ不足・強制終了・ディスクの空き不足など）に、
+    --resume で完了済みのレコードを比較し直さずに続きから再開するために使用する。
+    レコードごとの集計結果（フィールドごとの不一致数）と不一致詳細を保存し、
+    再開時にサマリーへ加え直すことで、最後まで実行した場合と同じサマリーを作成する。
+
+    一定件数・一定時間ごとにチェックポイントを書き込み、ジャーナル・不一致詳細・
+    集約CSVをディスクに書き出す（fsync）。再開時はチェックポイントより後に
+    書き込んだ内容を切り捨て、チェックポイントまでのレコードを完了済みとして扱う。
+    正常に終了した場合は remove で削除する。
+
+    ファイルの形式:
+        comparison_journal.jsonl（1行ずつのJSON）
+            1行目: ヘッダー（形式のバージョン、比較条件のハッシュ値、比較対象フィールド）
+            以降  : ["r", レコードのエントリーの値...]
+                    ["c", {集約CSVのファイル名: バイト数} またはnull, 不一致詳細ファイルのバイト数]（チェックポイント）
+        comparison_journal_details.csv
+            不一致詳細（SummaryAggregator の形式）
+    """
+
+    FILE_NAME = 'comparison_journal.jsonl'
+    DETAILS_FILE_NAME = 'comparison_journal_details.csv'
+
+    # ジャーナルの形式を変更した場合は上げる
+    FORMAT_VERSION = 1
+
+    # チェックポイントを書き込む間隔（レコード数・秒数のどちらかに達したら書き込む）
+    CHECKPOINT_RECORDS = 1000
+    CHECKPOINT_SECONDS = 30.0
+
+    def __init__(self, output_dir: str, config_key: str, comparison_fields: List[str]):
+        """
+        Args:
+            output_dir: 出力ディレクトリ
+            config_key: 比較条件と入力ファイルのハッシュ値（DiffManifest.config_key で作成）
+            comparison_fields: 比較対象フィールド
+        """
+        self.output_dir = output_dir
+        self.config_key = config_key
+        self.comparison_fields = list(comparison_fields)
+        # 最後のチェックポイントまでに完了したレコード（load で読み込む）
+        self.entries: Dict[str, JournalEntry] = {}
+        # 集約CSVのファイル名 → ジャーナルに記録したレコードまでのバイト数（レコードごとのCSVの場合はNone）
+        # load 後は最後のチェックポイントでの値
+        self.output_sizes: Optional[Dict[str, int]] = None
+        self._journal_file: Optional[BinaryIO] = None
+        self._details_file: Optional[BinaryIO] = None
+        # 最後のチェックポイントまでのジャーナル・不一致詳細ファイルのバイト数
+        self._journal_size = 0
+        self._details_size = 0
+        self._details_offset = 0
+        self._pending_records = 0
+        self._last_checkpoint = time.monotonic()
+
+    @property
+    def path(self) -> str:
+        """ジャーナルファイルのパス"""
+        return os.path.join(self.output_dir, self.FILE_NAME)
+
+    @property
+    def details_path(self) -> str:
+        """不一致詳細ファイルのパス"""
+        return os.path.join(self.output_dir, self.DETAILS_FILE_NAME)
+
+    @staticmethod
+    def input_signature(*file_paths: str) -> List[tuple]:
+        """
+        入力ファイルの識別情報を取得（比較条件のハッシュ値に含め、入力が変わった場合は再開しない）
+
+        大きな入力を読み直さないよう、内容のハッシュ値ではなくパス・サイズ・更新日時を使う。
+
+        Args:
+            file_paths: 入力ファイルのパス
+
+        Returns:
+            (絶対パス, サイズ, 更新日時) のリスト
+        """
+        signature = []
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            signature.append((os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns))
+        return signature
+
+    def load(self) -> None:
+        """
+        前回のジャーナルから最後のチェックポイントまでに完了したレコードを読み込む
+
+        ジャーナルが存在しない・比較条件や入力が異なる・出力ファイルが欠けている場合はエントリーを空にする。
+        """
+        self.entries = {}
+        self.output_sizes = None
+        try:
+            with open(self.path, 'rb') as file:
+                if self._parse_line(file.readline()) != self._header():
+                    return
+
+                entries: List[JournalEntry] = []
+                committed = 0
+                position = file.tell()
+                for line in file:
+                    position += len(line)
+                    values = self._parse_line(line)
+                    if values is None:
+                        # 書き込み途中で終了した行以降は使用しない
+                        break
+                    if values[0] == 'r':
+                        entries.append(self._entry_from_values(values[1:]))
+                    elif values[0] == 'c':
+                        committed = len(entries)
+                        self.output_sizes = values[1]
+                        self._details_size = values[2]
+                        self._journal_size = position
+                    else:
+                        raise ValueError(f"ジャーナルの行の種類が不正です: {values[0]}")
+                self.entries = {entry.record_id: entry for entry in entries[:committed]}
+        except FileNotFoundError:
+            return
+        except (ValueError, IndexError, TypeError, KeyError):
+            # 形式が壊れたジャーナルは使用しない
+            self.entries = {}
+            self.output_sizes = None
+            return
+
+        if not self._outputs_intact():
+            self.entries = {}
+            self.output_sizes = None
+
+    def iter_entry_details(self) -> Iterator[Tuple[JournalEntry, List[tuple]]]:
+        """
+        load で読み込んだエントリーと不一致詳細を記録した順に返す
+
+        Returns:
+            (エントリー, 不一致詳細の値のタプルのリスト) のイテレーター
+        """
+        with open(self.details_path, 'rb') as file:
+            for entry in self.entries.values():
+                if entry.details_length == 0:
+                    yield entry, []
+                    continue
+                file.seek(entry.details_offset)
+                text = file.read(entry.details_length).decode('utf-8')
+                yield entry, [tuple(row) for row in csv.reader(io.StringIO(text, newline=''))]
+
+    def open(self) -> None:
+        """
+        ジャーナルを書き込み用に開く
+
+        load で完了済みのレコードを読み込んだ場合は最後のチェックポイントより後を切り捨てて追記し、
+        それ以外の場合は新しく作成する。
+        """
+        if not self.entries:
+            self.output_sizes = None
+        os.makedirs(self.output_dir, exist_ok=True)
+        try:
+            if self.entries:
+                self._journal_file = open(self.path, 'r+b')
+                self._journal_file.truncate(self._journal_size)
+                self._journal_file.seek(self._journal_size)
+                self._details_file = open(self.details_path, 'r+b')
+                self._details_file.truncate(self._details_size)
+                self._details_file.seek(self._details_size)
+                self._details_offset = self._details_size
+            else:
+                self._journal_file = open(self.path, 'wb')
+                self._journal_file.write(self._format_line(self._header()))
+                self._details_file = open(self.details_path, 'wb')
+                self._details_offset = 0
+        except Exception as e:
+            self.close()
+            raise Exception(f"ジャーナルの書き込み中にエラーが発生しました: {e}")
+        self._last_checkpoint = time.monotonic()
+
+    def add(self, entry: JournalEntry, mismatch_details: List[tuple]) -> None:
+        """
+        比較を終えたレコードのエントリーと不一致詳細を追記する（次のチェックポイントで確定する）
+
+        Args:
+            entry: エントリー
+            mismatch_details: 不一致詳細の値のタプルのリスト
+        """
+        entry.details_offset = self._details_offset
+        entry.details_length = 0
+        if mismatch_details:
+            buffer = io.StringIO(newline='')
+            csv.writer(buffer).writerows(mismatch_details)
+            entry.details_length = self._details_file.write(buffer.getvalue().encode('utf-8'))
+            self._details_offset += entry.details_length
+        if entry.length:
+            if self.output_sizes is None:
+                self.output_sizes = {}
+            self.output_sizes[entry.file_name] = entry.offset + entry.length
+
+        self._journal_file.write(self._format_line([
+            'r', entry.record_id, entry.shain_id, entry.shain_name, entry.total_items,
+            entry.field_mismatches, entry.file_name, entry.offset, entry.length,
+            entry.details_offset, entry.details_length
+        ]))
+        self._pending_records += 1
+
+    def is_checkpoint_due(self) -> bool:
+        """チェックポイントを書き込む間隔に達したか判定"""
+        return (
+            self._pending_records >= self.CHECKPOINT_RECORDS
+            or (self._pending_records > 0 and time.monotonic() - self._last_checkpoint >= self.CHECKPOINT_SECONDS)
+        )
+
+    def checkpoint(self) -> None:
+        """
+        チェックポイントを書き込む
+
+        集約CSVはこのメソッドを呼ぶ前にディスクへ書き出しておくこと。
+        集約CSVにはジャーナルに記録したレコードまでのバイト数を記録するため、
+        記録する前に終了したレコードの書き込みは再開時に切り捨てる。
+        """
+        self._sync(self._details_file)
+        self._journal_file.write(self._format_line(['c', self.output_sizes, self._details_offset]))
+        self._sync(self._journal_file)
+        self._pending_records = 0
+        self._last_checkpoint = time.monotonic()
+
+    def close(self) -> None:
+        """ジャーナルを閉じる（チェックポイントより後に追記した内容は次回の再開時に切り捨てる）"""
+        for file in (self._journal_file, self._details_file):
+            if file is not None:
+                file.close()
+        self._journal_file = None
+        self._details_file = None
+
+    def remove(self) -> None:
+        """ジャーナルを閉じて削除する（正常に終了した場合）"""
+        self.close()
+        for path in (self.path, self.details_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _outputs_intact(self) -> bool:
+        """完了済みのレコードの出力ファイルが残っているか判定"""
+        for file_name, size in (self.output_sizes or {}).items():
+            path = os.path.join(self.output_dir, file_name)
+            if not os.path.exists(path) or os.path.getsize(path) < size:
+                return False
+
+        file_names = {entry.file_name for entry in self.entries.values() if entry.file_name}
+        return all(
+            os.path.exists(os.path.join(self.output_dir, file_name))
+            for file_name in file_names
+        ) and os.path.exists(self.details_path) and os.path.getsize(self.details_path) >= self._details_size
+
+    def _header(self) -> Dict[str, Any]:
+        """ヘッダーの内容"""
+        return {
+            'version': self.FORMAT_VERSION,
+            'config': self.config_key,
+            'fields': self.comparison_fields,
+        }
+
+    def _entry_from_values(self, values: List[Any]) -> JournalEntry:
+        """ジャーナルの行の値をエントリーに変換"""
+        record_id, shain_id, shain_name, total_items, field_mismatches, file_name, offset, length, \
+            details_offset, details_length = values
+        if len(field_mismatches) != len(self.comparison_fields):
+            raise ValueError(f"ジャーナルの不一致数の列数が不正です: {len(field_mismatches)}")
+        return JournalEntry(
+            record_id=record_id,
+            shain_id=shain_id,
+            shain_name=shain_name,
+            total_items=total_items,
+            field_mismatches=field_mismatches,
+            file_name=file_name,
+            offset=offset,
+            length=length,
+            details_offset=details_offset,
+            details_length=details_length
+        )
+
+    @staticmethod
+    def _format_line(value: Any) -> bytes:
+        """値を1行のJSONに変換"""
+        return (json.dumps(value, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+    @staticmethod
+    def _parse_line(line: bytes) -> Optional[Any]:
+        """1行のJSONを読み込む（改行で終わっていない・読めない行はNone）"""
+        if not line.endswith(b'\n'):
+            return None
+        try:
+            return json.loads(line.decode('utf-8'))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _sync(file: BinaryIO) -> None:
+        """ファイルのバッファをディスクに書き出す"""
+        file.flush()
+        os.fsync(file.fileno())
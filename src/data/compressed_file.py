@@ -0,0 +1,227 @@
+"""
+圧縮ファイルの読み書き処理
+"""
+import gzip
+import io
+import lzma
+import os
+import zlib
+from typing import IO, Optional, Tuple
+
+
+# 出力の圧縮形式 → ファイル拡張子
+#   gzip: zlib（DEFLATE）で圧縮する。高速
+#   xz  : lzma で圧縮する。gzip より小さいが圧縮に時間がかかる
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'xz': '.xz'}
+COMPRESSIONS: Tuple[str, ...] = tuple(COMPRESSION_EXTENSIONS)
+
+
+class CompressedFile:
+    """gzip / xz 圧縮ファイルの読み書きクラス
+
+    書き込み時はファイルの拡張子（.gz / .xz）で圧縮形式を決め、
+    ファイル全体をメモリに載せずに逐次圧縮する。
+    読み込み時は拡張子に加えて先頭のマジックバイトでも判定するため、
+    拡張子のない圧縮ファイルもそのまま読める。
+    """
+
+    # 圧縮レベルの既定値（gzip は compresslevel、xz は preset として使う）
+    DEFAULT_LEVEL = 6
+
+    # ファイル先頭のマジックバイト → 圧縮形式
+    _MAGIC_NUMBERS = ((b'\x1f\x8b', 'gzip'), (b'\xfd7zXZ\x00', 'xz'))
+
+    @staticmethod
+    def compression_of(file_path: str) -> Optional[str]:
+        """
+        拡張子から圧縮形式を判定
+
+        Args:
+            file_path: ファイルのパス
+
+        Returns:
+            圧縮形式（圧縮しない場合はNone）
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        for compression, compression_extension in COMPRESSION_EXTENSIONS.items():
+            if extension == compression_extension:
+                return compression
+        return None
+
+    @staticmethod
+    def detect(file_path: str) -> Optional[str]:
+        """
+        拡張子とマジックバイトから既存ファイルの圧縮形式を判定
+
+        Args:
+            file_path: ファイルのパス
+
+        Returns:
+            圧縮形式（圧縮されていない場合はNone）
+        """
+        compression = CompressedFile.compression_of(file_path)
+        if compression is not None:
+            return compression
+
+        with open(file_path, 'rb') as file:
+            head = file.read(6)
+        for magic, compression in CompressedFile._MAGIC_NUMBERS:
+            if head.startswith(magic):
+                return compression
+        return None
+
+    @staticmethod
+    def add_extension(file_path: str, compression: Optional[str]) -> str:
+        """
+        圧縮形式の拡張子をパスに付ける
+
+        Args:
+            file_path: ファイルのパス
+            compression: 圧縮形式（Noneの場合はそのまま返す）
+
+        Returns:
+            拡張子を付けたパス（既に付いている場合はそのまま）
+        """
+        if compression is None:
+            return file_path
+        CompressedFile._validate_compression(compression)
+
+        extension = COMPRESSION_EXTENSIONS[compression]
+        if file_path.lower().endswith(extension):
+            return file_path
+        return file_path + extension
+
+    @staticmethod
+    def split_extension(file_path: str) -> Tuple[str, str]:
+        """
+        圧縮形式の拡張子を含めて拡張子を分割
+
+        Args:
+            file_path: ファイルのパス
+
+        Returns:
+            (拡張子を除いたパス, 拡張子) 例: 'report.html.gz' → ('report', '.html.gz')
+        """
+        stem, compression_extension = file_path, ''
+        if CompressedFile.compression_of(file_path) is not None:
+            stem, compression_extension = os.path.splitext(file_path)
+
+        stem, extension = os.path.splitext(stem)
+        return stem, extension + compression_extension
+
+    @staticmethod
+    def open_text(
+        file_path: str,
+        mode: str = 'r',
+        encoding: str = 'utf-8',
+        newline: Optional[str] = None,
+        level: Optional[int] = None,
+        buffering: int = -1
+    ) -> IO[str]:
+        """
+        圧縮形式に応じてテキストファイルを開く
+
+        Args:
+            file_path: ファイルのパス
+            mode: 'r'（読み込み）または 'w'（書き込み）
+            encoding: 文字コード
+            newline: open() の newline 引数
+            level: 書き込み時の圧縮レベル（0〜9、省略時は DEFAULT_LEVEL）
+            buffering: 書き込みバッファサイズ（-1の場合は既定値）
+
+        Returns:
+            テキストファイルオブジェクト
+        """
+        if mode not in ('r', 'w'):
+            raise ValueError(f"不明なモードです: {mode}")
+
+        compression = CompressedFile.detect(file_path) if mode == 'r' else CompressedFile.compression_of(file_path)
+        if compression is None:
+            return open(file_path, mode, encoding=encoding, newline=newline, buffering=buffering)
+
+        binary = CompressedFile._open_compressed(file_path, mode, compression, level)
+        if mode == 'w':
+            # 圧縮器への write 呼び出しをまとめるためバッファを挟む
+            binary = io.BufferedWriter(binary, io.DEFAULT_BUFFER_SIZE if buffering < 0 else buffering)
+        return io.TextIOWrapper(binary, encoding=encoding, newline=newline)
+
+    @staticmethod
+    def compress(data: bytes, compression: str, level: Optional[int] = None) -> bytes:
+        """
+        バイト列を単独で展開できる圧縮データに変換
+
+        gzip / xz はどちらも圧縮データを連結したファイルを1つのファイルとして展開できるため、
+        レコードごとに圧縮して追記しても全体を通常の圧縮ファイルとして読める。
+
+        Args:
+            data: 圧縮するバイト列
+            compression: 圧縮形式
+            level: 圧縮レベル（0〜9、省略時は DEFAULT_LEVEL）
+
+        Returns:
+            圧縮データ
+        """
+        CompressedFile._validate_compression(compression)
+        level = CompressedFile._validate_level(level)
+        if compression == 'gzip':
+            # ヘッダーの更新日時を0に固定し、同じ入力からは同じ出力を得る
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            return compressor.compress(data) + compressor.flush()
+        return lzma.compress(data, format=lzma.FORMAT_XZ, preset=level)
+
+    @staticmethod
+    def decompress(data: bytes, compression: str) -> bytes:
+        """
+        compress で圧縮したデータを展開
+
+        Args:
+            data: 圧縮データ
+            compression: 圧縮形式
+
+        Returns:
+            展開したバイト列
+        """
+        CompressedFile._validate_compression(compression)
+        if compression == 'gzip':
+            return gzip.decompress(data)
+        return lzma.decompress(data)
+
+    @staticmethod
+    def validate(compression: str, level: Optional[int] = None) -> None:
+        """
+        圧縮形式と圧縮レベルを検証
+
+        Args:
+            compression: 圧縮形式
+            level: 圧縮レベル（0〜9、Noneの場合は既定値）
+        """
+        CompressedFile._validate_compression(compression)
+        CompressedFile._validate_level(level)
+
+    @staticmethod
+    def _open_compressed(file_path: str, mode: str, compression: str, level: Optional[int]) -> IO[bytes]:
+        """圧縮ファイルをバイナリモードで開く"""
+        if compression == 'gzip':
+            if mode == 'r':
+                return gzip.GzipFile(file_path, 'rb')
+            return gzip.GzipFile(
+                file_path, 'wb', compresslevel=CompressedFile._validate_level(level), mtime=0
+            )
+        if mode == 'r':
+            return lzma.LZMAFile(file_path, 'rb')
+        return lzma.LZMAFile(file_path, 'wb', preset=CompressedFile._validate_level(level))
+
+    @staticmethod
+    def _validate_level(level: Optional[int]) -> int:
+        """圧縮レベルを検証して返す（Noneの場合は既定値）"""
+        if level is None:
+            return CompressedFile.DEFAULT_LEVEL
+        if not 0 <= level <= 9:
+            raise ValueError(f"圧縮レベルは0〜9を指定してください: {level}")
+        return level
+
+    @staticmethod
+    def _validate_compression(compression: str) -> None:
+        """圧縮形式を検証"""
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"不明な圧縮形式です: {compression}（指定可能: {', '.join(COMPRESSIONS)}）")
@@ -0,0 +1,216 @@
+"""
+比較結果の集約CSV書き込み処理
+"""
+import csv
+import io
+import os
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from .compressed_file import CompressedFile
+from .record_partitioner import RecordPartitioner
+
+
+class ConsolidatedCsvWriter:
+    """比較結果を1つ（またはハッシュ分割したN個）のCSVファイルにまとめて書き込むクラス
+
+    レコードごとにファイルを作成せず、開いたままのファイルへ
+    バッファ付きで追記する。レコードごとの書き込み位置は
+    record_id → (ファイル名, バイトオフセット, バイト長) のインデックスに記録し、
+    CsvReader.read_consolidated_record で1レコード分だけ読み出せる。
+
+    圧縮する場合はヘッダーとレコードごとに独立した gzip / xz の圧縮データとして追記する。
+    ファイル全体は通常の圧縮ファイルとして展開でき、インデックスの
+    オフセット・バイト長は圧縮後の位置を指すため1レコード分だけ展開して読める。
+    """
+
+    INDEX_FILE_NAME = 'record_index.csv'
+    INDEX_FIELDNAMES = ['record_id', 'file_name', 'offset', 'length']
+    DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+    def __init__(
+        self,
+        output_dir: str,
+        fieldnames: List[str],
+        partitions: int = 1,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        compression: Optional[str] = None,
+        compression_level: Optional[int] = None
+    ):
+        """
+        Args:
+            output_dir: 出力ディレクトリ
+            fieldnames: CSVの列名
+            partitions: 出力ファイル数（record_idのハッシュで分割）
+            buffer_size: ファイルへの書き込みバッファサイズ
+            compression: 圧縮形式（'gzip' / 'xz'、Noneの場合は圧縮しない）
+            compression_level: 圧縮レベル（0〜9）
+        """
+        if partitions < 1:
+            raise ValueError(f"パーティション数は1以上を指定してください: {partitions}")
+
+        self.output_dir = output_dir
+        self.fieldnames = list(fieldnames)
+        self.partitions = partitions
+        self.buffer_size = buffer_size
+        self.compression = compression
+        self.compression_level = compression_level
+        if compression is not None:
+            CompressedFile.validate(compression, compression_level)
+
+        self._files: List[Any] = []
+        self._offsets: List[int] = []
+        self._index: List[tuple] = []
+
+        # 行のエンコードは1つのDictWriterを使い回す
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, fieldnames=self.fieldnames)
+
+    @property
+    def output_files(self) -> List[str]:
+        """出力するCSVファイルのパスのリスト"""
+        return [os.path.join(self.output_dir, self._file_name(i)) for i in range(self.partitions)]
+
+    @property
+    def index_path(self) -> str:
+        """インデックスファイルのパス"""
+        return os.path.join(self.output_dir, self.INDEX_FILE_NAME)
+
+    def open(
+        self,
+        resume_sizes: Optional[Dict[str, int]] = None,
+        resume_index: Optional[List[tuple]] = None
+    ) -> None:
+        """
+        出力ファイルを開いてヘッダーを書き込む
+
+        resume_sizes を指定した場合は、含まれるファイルをそのサイズに切り詰めて追記する
+        （途中で終了した比較処理の再開用。含まれないファイルは新しく作成する）。
+
+        Args:
+            resume_sizes: ファイル名 → 書き込み済みのバイト数
+            resume_index: 書き込み済みのレコードのインデックス（record_id, ファイル名, オフセット, バイト長）
+        """
+        Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+
+        header = self._encode(self._format_rows(None))
+        try:
+            for path in self.output_files:
+                size = (resume_sizes or {}).get(os.path.basename(path))
+                if size is None:
+                    file = open(path, 'wb', buffering=self.buffer_size)
+                    file.write(header)
+                    self._offsets.append(len(header))
+                else:
+                    file = open(path, 'r+b', buffering=self.buffer_size)
+                    file.truncate(size)
+                    file.seek(size)
+                    self._offsets.append(size)
+                self._files.append(file)
+        except Exception as e:
+            self.close()
+            raise Exception(f"CSVファイルの書き込み中にエラーが発生しました: {e}")
+
+        if resume_index is not None:
+            self._index = list(resume_index)
+
+    def sync(self) -> None:
+        """書き込んだ内容をディスクに書き出す"""
+        try:
+            for file in self._files:
+                file.flush()
+                os.fsync(file.fileno())
+        except Exception as e:
+            raise Exception(f"CSVファイルの書き込み中にエラーが発生しました: {e}")
+
+    def write_record(self, record_id: str, rows: List[Dict[str, Any]]) -> Optional[tuple]:
+        """
+        1レコード分の比較結果を書き込む
+
+        Args:
+            record_id: レコードID
+            rows: CSV出力用の辞書リスト
+
+        Returns:
+            インデックスのエントリー（record_id, ファイル名, オフセット, バイト長）。書き込まなかった場合はNone
+        """
+        if not rows:
+            return None
+        return self.write_record_text(record_id, self._format_rows(rows))
+
+    def write_record_text(self, record_id: str, text: str) -> Optional[tuple]:
+        """
+        CSV形式に変換済みの1レコード分の行（ヘッダーなし）を書き込む
+
+        Args:
+            record_id: レコードID
+            text: CSV形式の行
+
+        Returns:
+            インデックスのエントリー（record_id, ファイル名, オフセット, バイト長）。書き込まなかった場合はNone
+        """
+        if not text:
+            return None
+
+        partition = RecordPartitioner.partition_of(record_id, self.partitions) if self.partitions > 1 else 0
+        data = self._encode(text)
+
+        try:
+            self._files[partition].write(data)
+        except Exception as e:
+            raise Exception(f"CSVファイルの書き込み中にエラーが発生しました: {e}")
+
+        entry = (record_id, self._file_name(partition), self._offsets[partition], len(data))
+        self._index.append(entry)
+        self._offsets[partition] += len(data)
+        return entry
+
+    def close(self) -> None:
+        """出力ファイルを閉じてインデックスを書き込む"""
+        files, self._files = self._files, []
+        for file in files:
+            file.close()
+
+        if not files:
+            return
+
+        try:
+            with open(self.index_path, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(self.INDEX_FIELDNAMES)
+                writer.writerows(self._index)
+        except Exception as e:
+            raise Exception(f"CSVファイルの書き込み中にエラーが発生しました: {e}")
+
+    def __enter__(self) -> 'ConsolidatedCsvWriter':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _format_rows(self, rows: Optional[List[Dict[str, Any]]]) -> str:
+        """行（Noneの場合はヘッダー）をCSV形式の文字列に変換"""
+        self._buffer.seek(0)
+        self._buffer.truncate(0)
+
+        if rows is None:
+            self._writer.writeheader()
+        else:
+            self._writer.writerows(rows)
+        return self._buffer.getvalue()
+
+    def _encode(self, text: str) -> bytes:
+        """CSV形式の文字列をUTF-8のバイト列に変換（圧縮する場合は圧縮データ）"""
+        data = text.encode('utf-8')
+        if self.compression is not None:
+            return CompressedFile.compress(data, self.compression, self.compression_level)
+        return data
+
+    def _file_name(self, partition: int) -> str:
+        """パーティションのファイル名を取得"""
+        if self.partitions == 1:
+            file_name = 'comparison_results.csv'
+        else:
+            file_name = f'comparison_results_{partition:03d}.csv'
+        return CompressedFile.add_extension(file_name, self.compression)
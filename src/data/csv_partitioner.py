@@ -0,0 +1,179 @@
+"""
+CSVファイルのハッシュ分割処理
+"""
+import csv
+import math
+import os
+import shutil
+import tempfile
+from typing import Iterator, List, Optional, Tuple
+
+from .compressed_file import CompressedFile
+from .csv_reader import CsvReader
+from .models import KyuyoRecord
+from .record_partitioner import RecordPartitioner
+
+
+class CsvPartitioner:
+    """変更前・変更後のCSVファイルを__id__のハッシュでパーティションに分割するクラス
+
+    同じ__id__の行は両方のファイルで同じ番号のパーティションに入るため、
+    パーティションの組ごとに比較すればファイル全体を比較したのと同じ結果になる。
+    各パーティション内の行は入力ファイルでの出現順を保持する。
+
+    パーティションの組の推定メモリ使用量（ファイルサイズ × MEMORY_FACTOR）が
+    メモリ上限を超える場合は、CRC32 の値の上位の桁を使ってその組をさらに分割する。
+    同じ__id__の行が大量にあるなど、それ以上分割できない組は上限を超えたまま返す。
+    """
+
+    # パーティションのファイルサイズに対する、読み込んだレコードのメモリ使用量の倍率
+    MEMORY_FACTOR = 2.0
+
+    # 1回の分割で作成する最大パーティション数（同時に開くファイル数）
+    MAX_FANOUT = 256
+
+    # パーティションの大きさのばらつきで再分割が起きにくいよう、パーティション数に持たせる余裕
+    FANOUT_HEADROOM = 1.25
+
+    # CRC32 の値の範囲（分割に使う桁が残っていない場合はそれ以上分割しない）
+    _HASH_RANGE = 1 << 32
+
+    def __init__(self, memory_budget_bytes: int, temp_dir: Optional[str] = None):
+        """
+        Args:
+            memory_budget_bytes: 1つのパーティションの組を比較するときのメモリ上限（バイト）
+            temp_dir: 一時ファイルを作成するディレクトリ（Noneの場合はシステムの一時ディレクトリ）
+        """
+        if memory_budget_bytes <= 0:
+            raise ValueError(f"メモリ上限は1以上を指定してください: {memory_budget_bytes}")
+
+        self.memory_budget_bytes = memory_budget_bytes
+        self.temp_dir = temp_dir
+        # 分割したパーティション数（再分割を含む）
+        self.partition_count = 0
+        # メモリ上限を超えたまま返したパーティションの組の数
+        self.oversized_count = 0
+
+    def iter_partition_pairs(self, before_path: str, after_path: str) -> Iterator[Tuple[str, str]]:
+        """
+        メモリ上限に収まるパーティションの組を順に返す
+
+        返したパーティションのファイルは、次の組を要求した時点（最後の組は終了時）に削除する。
+        入力が圧縮されておらず全体がメモリ上限に収まる場合は、分割せずに入力ファイルをそのまま返す。
+
+        Args:
+            before_path: 変更前のCSVファイルのパス
+            after_path: 変更後のCSVファイルのパス
+
+        Returns:
+            (変更前のパーティションのパス, 変更後のパーティションのパス) のイテレーター
+        """
+        try:
+            sizes = [os.path.getsize(before_path), os.path.getsize(after_path)]
+            compressed = any(CompressedFile.detect(path) is not None for path in (before_path, after_path))
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"ファイルが見つかりません: {e.filename}")
+
+        estimated = sum(sizes) * self.MEMORY_FACTOR
+        if not compressed and estimated <= self.memory_budget_bytes:
+            yield before_path, after_path
+            return
+
+        work_dir = tempfile.mkdtemp(prefix='csv_partition_', dir=self.temp_dir)
+        try:
+            yield from self._split_pair(before_path, after_path, work_dir, 1, self._fanout(estimated))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _split_pair(
+        self,
+        before_path: str,
+        after_path: str,
+        work_dir: str,
+        divisor: int,
+        fanout: int
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        パーティションの組を分割し、メモリ上限を超える組は再帰的に分割して返す
+
+        Args:
+            before_path: 変更前のCSVファイルのパス
+            after_path: 変更後のCSVファイルのパス
+            work_dir: パーティションのファイルを作成するディレクトリ
+            divisor: CRC32 の値をこの値で割ってからパーティション番号を求める（使用済みの桁を除く）
+            fanout: パーティション数
+        """
+        before_parts = self._write_partitions(before_path, work_dir, 'before', divisor, fanout)
+        after_parts = self._write_partitions(after_path, work_dir, 'after', divisor, fanout)
+        self.partition_count += fanout
+
+        next_divisor = divisor * fanout
+        for number in range(fanout):
+            (before_part, before_rows), (after_part, after_rows) = before_parts[number], after_parts[number]
+            try:
+                # 片方が空のパーティションには両方に存在するレコードがない
+                if before_rows == 0 or after_rows == 0:
+                    continue
+
+                estimated = (os.path.getsize(before_part) + os.path.getsize(after_part)) * self.MEMORY_FACTOR
+                if estimated <= self.memory_budget_bytes or next_divisor >= self._HASH_RANGE:
+                    if estimated > self.memory_budget_bytes:
+                        self.oversized_count += 1
+                    yield before_part, after_part
+                    continue
+
+                sub_dir = os.path.join(work_dir, f'{number:03d}')
+                os.mkdir(sub_dir)
+                try:
+                    fanout_limit = max(2, self._HASH_RANGE // next_divisor)
+                    yield from self._split_pair(
+                        before_part, after_part, sub_dir, next_divisor,
+                        min(self._fanout(estimated), fanout_limit)
+                    )
+                finally:
+                    shutil.rmtree(sub_dir, ignore_errors=True)
+            finally:
+                for path in (before_part, after_part):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    def _write_partitions(
+        self,
+        input_path: str,
+        work_dir: str,
+        prefix: str,
+        divisor: int,
+        fanout: int
+    ) -> List[Tuple[str, int]]:
+        """
+        入力ファイルの行をパーティションのファイルに振り分ける
+
+        明細JSONはパースせず、レコードの構築に使用する列だけを書き出す。
+
+        Returns:
+            パーティションごとの (ファイルのパス, 行数) のリスト
+        """
+        paths = [os.path.join(work_dir, f'{prefix}_{number:03d}.csv') for number in range(fanout)]
+        row_counts = [0] * fanout
+        files = []
+        try:
+            for path in paths:
+                files.append(open(path, 'w', newline='', encoding='utf-8'))
+            writers = [csv.writer(file) for file in files]
+            for writer in writers:
+                writer.writerow(KyuyoRecord.CSV_COLUMNS)
+
+            for row in CsvReader.iter_raw_rows(input_path):
+                number = RecordPartitioner.partition_of(row[0], fanout, divisor)
+                writers[number].writerow(row)
+                row_counts[number] += 1
+        finally:
+            for file in files:
+                file.close()
+
+        return list(zip(paths, row_counts))
+
+    def _fanout(self, estimated_bytes: float) -> int:
+        """推定メモリ使用量をメモリ上限に収めるためのパーティション数を計算"""
+        partitions = math.ceil(estimated_bytes * self.FANOUT_HEADROOM / self.memory_budget_bytes)
+        return max(2, min(self.MAX_FANOUT, partitions))
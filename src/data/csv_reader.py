@@ -2,13 +2,20 @@
 CSVファイル読み込み処理
 """
 import csv
-from typing import List, Dict, Any
+import io
+import os
+from typing import List, Dict, Any, Iterator, Sequence, Tuple, Optional
 from pathlib import Path
 from .models import KyuyoRecord
+from .consolidated_csv_writer import ConsolidatedCsvWriter
+from .compressed_file import CompressedFile
 
 
 class CsvReader:
-    """CSVファイル読み込みクラス"""
+    """CSVファイル読み込みクラス
+
+    gzip / xz で圧縮されたCSVファイルは展開せずにそのまま読み込む。
+    """
 
     @staticmethod
     def read_csv(file_path: str) -> List[KyuyoRecord]:
@@ -24,7 +31,7 @@ class CsvReader:
         records = []
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
+            with CompressedFile.open_text(file_path) as file:
                 reader = csv.DictReader(file)
                 for row in reader:
                     record = KyuyoRecord.from_csv_row(row)
@@ -36,6 +43,85 @@ class CsvReader:
         
         return records
 
+    @staticmethod
+    def iter_csv(file_path: str) -> Iterator[KyuyoRecord]:
+        """
+        CSVファイルを1行ずつ読み込んでKyuyoRecordを順に返す
+        
+        ファイル全体をメモリに読み込まないため、大量データでも
+        メモリ使用量は1レコード分に抑えられる。
+        
+        Args:
+            file_path: CSVファイルのパス
+            
+        Returns:
+            KyuyoRecordのイテレーター
+        """
+        try:
+            with CompressedFile.open_text(file_path) as file:
+                reader = csv.DictReader(file)
+                for row in reader:
+                    yield KyuyoRecord.from_csv_row(row)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
+        except Exception as e:
+            raise Exception(f"CSVファイルの読み込み中にエラーが発生しました: {e}")
+
+    @staticmethod
+    def read_raw_rows(
+        file_path: str, 
+        columns: Sequence[str] = KyuyoRecord.CSV_COLUMNS
+    ) -> List[Tuple[str, ...]]:
+        """
+        CSVファイルの指定列だけを文字列のタプルとして読み込む
+        
+        JSONのパースやデータモデルの構築は行わないため、
+        別プロセスへ受け渡す生データの読み込みに使用する。
+        存在しない列は空文字として扱う。
+        
+        Args:
+            file_path: CSVファイルのパス
+            columns: 読み込む列名
+            
+        Returns:
+            列の値のタプルのリスト
+        """
+        return list(CsvReader.iter_raw_rows(file_path, columns))
+
+    @staticmethod
+    def iter_raw_rows(
+        file_path: str, 
+        columns: Sequence[str] = KyuyoRecord.CSV_COLUMNS
+    ) -> Iterator[Tuple[str, ...]]:
+        """
+        CSVファイルの指定列だけを文字列のタプルとして1行ずつ返す
+        
+        Args:
+            file_path: CSVファイルのパス
+            columns: 読み込む列名
+            
+        Returns:
+            列の値のタプルのイテレーター
+        """
+        try:
+            with CompressedFile.open_text(file_path) as file:
+                reader = csv.reader(file)
+                header = next(reader, [])
+                positions = [header.index(column) if column in header else None for column in columns]
+                
+                for row in reader:
+                    # DictReaderと同様に空行は読み飛ばす
+                    if not row:
+                        continue
+                    yield tuple(
+                        row[position] if position is not None and position < len(row) else ''
+                        for position in positions
+                    )
+        except FileNotFoundError:
+            raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
+        except Exception as e:
+            raise Exception(f"CSVファイルの読み込み中にエラーが発生しました: {e}")
+
     @staticmethod
     def read_csv_as_dict(file_path: str) -> List[Dict[str, Any]]:
         """
@@ -50,7 +136,7 @@ class CsvReader:
         records = []
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
+            with CompressedFile.open_text(file_path) as file:
                 reader = csv.DictReader(file)
                 for row in reader:
                     records.append(row)
@@ -60,3 +146,73 @@ class CsvReader:
             raise Exception(f"CSVファイルの読み込み中にエラーが発生しました: {e}")
         
         return records
+
+    @staticmethod
+    def load_record_index(output_dir: str) -> Dict[str, Tuple[str, int, int]]:
+        """
+        集約CSV出力のレコードインデックスを読み込む
+        
+        Args:
+            output_dir: 集約CSVの出力ディレクトリ
+            
+        Returns:
+            record_id → (ファイル名, バイトオフセット, バイト長) の辞書
+        """
+        index_path = os.path.join(output_dir, ConsolidatedCsvWriter.INDEX_FILE_NAME)
+        index = {}
+        
+        try:
+            with open(index_path, 'r', newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    index[row['record_id']] = (row['file_name'], int(row['offset']), int(row['length']))
+        except FileNotFoundError:
+            raise FileNotFoundError(f"ファイルが見つかりません: {index_path}")
+        
+        return index
+
+    @staticmethod
+    def read_consolidated_record(
+        output_dir: str, 
+        record_id: str, 
+        index: Optional[Dict[str, Tuple[str, int, int]]] = None
+    ) -> List[Dict[str, str]]:
+        """
+        集約CSV出力から1レコード分の比較結果だけを読み込む
+        
+        Args:
+            output_dir: 集約CSVの出力ディレクトリ
+            record_id: レコードID
+            index: load_record_index で読み込んだインデックス（省略時は読み込む）
+            
+        Returns:
+            辞書のリスト（レコードが存在しない場合は空）
+        """
+        if index is None:
+            index = CsvReader.load_record_index(output_dir)
+        
+        entry = index.get(record_id)
+        if entry is None:
+            return []
+        
+        file_name, offset, length = entry
+        file_path = os.path.join(output_dir, file_name)
+        
+        compression = CompressedFile.compression_of(file_name)
+        
+        try:
+            if compression is None:
+                with open(file_path, 'rb') as file:
+                    header = next(csv.reader([file.readline().decode('utf-8')]))
+                    file.seek(offset)
+                    data = file.read(length).decode('utf-8')
+            else:
+                # 圧縮時はヘッダーとレコードごとに独立した圧縮データとして書き込まれている
+                with CompressedFile.open_text(file_path) as file:
+                    header = next(csv.reader([file.readline()]))
+                with open(file_path, 'rb') as file:
+                    file.seek(offset)
+                    data = CompressedFile.decompress(file.read(length), compression).decode('utf-8')
+        except FileNotFoundError:
+            raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
+        
+        return list(csv.DictReader(io.StringIO(data, newline=''), fieldnames=header))
@@ -0,0 +1,373 @@
+"""
+入力CSVのレコード位置インデックス
+"""
+import bisect
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .compressed_file import CompressedFile
+from .models import KyuyoRecord
+
+
+class CsvRecordIndex:
+    """入力CSVの record_id / shainId → (バイトオフセット, バイト長) のインデックス
+
+    入力CSVと同じディレクトリに「<CSVファイル名>.idx」として保存し、
+    1件を調べるときはCSV全体を読まずに該当する行だけを mmap から切り出してパースする。
+
+    インデックスファイルの形式:
+        1行目: MAGIC
+        2行目: JSONヘッダー（元ファイルのサイズ・更新日時・内容のハッシュ値、キーの幅、件数）
+        以降  : キーの昇順に並べた固定長エントリー（record_id の表、shainId の表の順）
+                エントリーは キー（UTF-8、key_width バイトまで \\0 で埋める）+ オフセット + バイト長
+    キーで二分探索するため、インデックス全体を読み込まずに検索できる。
+
+    元ファイルのサイズが変わった場合はインデックスを無効とする。
+    サイズが同じで更新日時だけが変わった場合は内容のハッシュ値を計算し直して判定する。
+    """
+
+    INDEX_EXTENSION = '.idx'
+    MAGIC = b'KYUYO-CSV-INDEX 1\n'
+
+    # オフセット・バイト長（ビッグエンディアンの64ビット整数）
+    _POSITION = struct.Struct('>QQ')
+
+    # ハッシュ値を計算するときの読み込みサイズ
+    _HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, csv_path: str):
+        """
+        Args:
+            csv_path: 入力CSVファイルのパス
+        """
+        self.csv_path = csv_path
+        self.index_path = csv_path + self.INDEX_EXTENSION
+        self._header: Dict[str, Any] = {}
+        self._fieldnames: List[str] = []
+        self._index_file = None
+        self._index_map: Optional[mmap.mmap] = None
+        self._csv_file = None
+        self._csv_map: Optional[mmap.mmap] = None
+        self._data_offset = 0
+
+    @classmethod
+    def open(cls, csv_path: str, build: bool = True) -> 'CsvRecordIndex':
+        """
+        インデックスを開く（存在しない・無効な場合は作成し直す）
+
+        Args:
+            csv_path: 入力CSVファイルのパス
+            build: Falseの場合はインデックスを作成せず、無効なら ValueError を送出する
+
+        Returns:
+            開いたインデックス
+        """
+        index = cls(csv_path)
+        if not index.is_valid():
+            if not build:
+                raise ValueError(f"インデックスが存在しないか無効です: {index.index_path}")
+            index.build()
+        index.load()
+        return index
+
+    def is_valid(self) -> bool:
+        """
+        インデックスが存在し、元ファイルと一致しているか判定
+
+        Returns:
+            有効な場合True
+        """
+        if not os.path.exists(self.csv_path):
+            raise FileNotFoundError(f"ファイルが見つかりません: {self.csv_path}")
+
+        header = self._read_header()
+        if header is None:
+            return False
+
+        stat = os.stat(self.csv_path)
+        if header['source_size'] != stat.st_size:
+            return False
+        if header['source_mtime_ns'] == stat.st_mtime_ns:
+            return True
+        return header['source_hash'] == self._hash_file(self.csv_path)
+
+    def build(self) -> None:
+        """元ファイルを1回走査してインデックスを作成する"""
+        if CompressedFile.detect(self.csv_path) is not None:
+            raise ValueError(f"圧縮ファイルにはインデックスを作成できません: {self.csv_path}")
+
+        stat = os.stat(self.csv_path)
+        digest = hashlib.blake2b(digest_size=16)
+        record_positions: Dict[bytes, Tuple[int, int]] = {}
+        shain_positions: List[Tuple[bytes, int, int]] = []
+        header_line = b''
+
+        with open(self.csv_path, 'rb') as file:
+            for start, row_bytes in self._iter_rows(file, digest):
+                if not header_line:
+                    header_line = row_bytes
+                    fieldnames = self._parse_row(row_bytes)
+                    id_position = self._column_position(fieldnames, '__id__')
+                    shain_position = self._column_position(fieldnames, 'shainId')
+                    continue
+
+                values = self._parse_row(row_bytes)
+                if not values:
+                    continue
+                length = len(row_bytes)
+                # 比較処理と同じく、同じ record_id の行は最後の行を使う
+                record_positions[self._column_value(values, id_position)] = (start, length)
+                shain_positions.append((self._column_value(values, shain_position), start, length))
+
+        record_entries = sorted((key, start, length) for key, (start, length) in record_positions.items())
+        shain_positions.sort()
+        key_width = max(
+            [len(key) for key, _, _ in record_entries] + [len(key) for key, _, _ in shain_positions] + [1]
+        )
+
+        header = {
+            'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns,
+            'source_hash': digest.hexdigest(),
+            'header_length': len(header_line),
+            'key_width': key_width,
+            'record_count': len(record_entries),
+            'shain_count': len(shain_positions),
+        }
+
+        self.close()
+        temp_path = self.index_path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(self.MAGIC)
+                file.write(json.dumps(header).encode('utf-8') + b'\n')
+                for entries in (record_entries, shain_positions):
+                    for key, start, length in entries:
+                        file.write(key.ljust(key_width, b'\0'))
+                        file.write(self._POSITION.pack(start, length))
+            os.replace(temp_path, self.index_path)
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise Exception(f"インデックスの書き込み中にエラーが発生しました: {e}")
+
+        self._header = header
+
+    @property
+    def record_count(self) -> int:
+        """インデックスに登録されたレコード数"""
+        return self._header.get('record_count', 0)
+
+    def find_record(self, record_id: str) -> Optional[Tuple[int, int]]:
+        """
+        record_id の行の位置を取得
+
+        Args:
+            record_id: レコードID（__id__）
+
+        Returns:
+            (バイトオフセット, バイト長)（存在しない場合はNone）
+        """
+        positions = self._find(record_id, 0, self._header['record_count'])
+        return positions[0] if positions else None
+
+    def find_shain(self, shain_id: str) -> List[Tuple[int, int]]:
+        """
+        shainId の行の位置を取得
+
+        Args:
+            shain_id: 社員ID
+
+        Returns:
+            (バイトオフセット, バイト長) のリスト（ファイル内の出現順）
+        """
+        start = self._header['record_count']
+        return sorted(self._find(shain_id, start, start + self._header['shain_count']))
+
+    def read_row(self, position: Tuple[int, int]) -> Dict[str, str]:
+        """
+        指定位置の行を読み込んで列名 → 値の辞書に変換
+
+        Args:
+            position: (バイトオフセット, バイト長)
+
+        Returns:
+            列名 → 値の辞書
+        """
+        offset, length = position
+        values = self._parse_row(self._csv_map[offset:offset + length])
+        return dict(zip(self._fieldnames, values))
+
+    def get_record(self, record_id: str) -> Optional[KyuyoRecord]:
+        """
+        record_id のレコードを読み込む
+
+        Args:
+            record_id: レコードID（__id__）
+
+        Returns:
+            レコード（存在しない場合はNone）
+        """
+        position = self.find_record(record_id)
+        if position is None:
+            return None
+        return KyuyoRecord.from_csv_row(self.read_row(position))
+
+    def get_records_by_shain_id(self, shain_id: str) -> List[KyuyoRecord]:
+        """
+        shainId のレコードを読み込む
+
+        Args:
+            shain_id: 社員ID
+
+        Returns:
+            レコードのリスト（ファイル内の出現順）
+        """
+        return [KyuyoRecord.from_csv_row(self.read_row(position)) for position in self.find_shain(shain_id)]
+
+    def close(self) -> None:
+        """mmap とファイルを閉じる"""
+        for name in ('_index_map', '_index_file', '_csv_map', '_csv_file'):
+            resource = getattr(self, name)
+            if resource is not None:
+                resource.close()
+                setattr(self, name, None)
+
+    def __enter__(self) -> 'CsvRecordIndex':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def load(self) -> None:
+        """作成済みのインデックスと元ファイルを mmap で開く"""
+        self._header = self._read_header()
+        try:
+            self._index_file = open(self.index_path, 'rb')
+            self._index_map = self._map(self._index_file)
+            self._data_offset = len(self.MAGIC) + self._index_map[len(self.MAGIC):].find(b'\n') + 1
+
+            self._csv_file = open(self.csv_path, 'rb')
+            self._csv_map = self._map(self._csv_file)
+            header_line = self._csv_map[:self._header['header_length']] if self._csv_map is not None else b''
+            self._fieldnames = self._parse_row(header_line)
+        except Exception:
+            self.close()
+            raise
+
+    def _find(self, key: str, low: int, high: int) -> List[Tuple[int, int]]:
+        """エントリー番号 low〜high の範囲でキーに一致するエントリーの位置を二分探索する"""
+        key_width = self._header['key_width']
+        encoded = key.encode('utf-8')
+        if len(encoded) > key_width or self._index_map is None:
+            return []
+        padded = encoded.ljust(key_width, b'\0')
+
+        entry_size = key_width + self._POSITION.size
+        index_map = self._index_map
+        data_offset = self._data_offset
+
+        def key_at(number: int) -> bytes:
+            start = data_offset + number * entry_size
+            return index_map[start:start + key_width]
+
+        # 3.10 より前の bisect は key 引数を持たないため、キーだけを並べた仮想的なリストで探索する
+        number = bisect.bisect_left(_EntryKeys(key_at, high), padded, low, high)
+        positions = []
+        while number < high and key_at(number) == padded:
+            start = data_offset + number * entry_size + key_width
+            positions.append(self._POSITION.unpack(index_map[start:start + self._POSITION.size]))
+            number += 1
+        return positions
+
+    def _read_header(self) -> Optional[Dict[str, Any]]:
+        """インデックスファイルのヘッダーを読み込む（存在しない・形式が違う場合はNone）"""
+        try:
+            with open(self.index_path, 'rb') as file:
+                if file.read(len(self.MAGIC)) != self.MAGIC:
+                    return None
+                return json.loads(file.readline().decode('utf-8'))
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _iter_rows(file, digest) -> Iterator[Tuple[int, bytes]]:
+        """
+        CSVの1行（引用符内の改行を含む）ごとに (バイトオフセット, 行のバイト列) を返す
+
+        二重引用符の数が偶数になった時点で行が終わったとみなす
+        （値の中の引用符は "" とエスケープされるため個数の偶奇は変わらない）。
+        """
+        offset = 0
+        start = 0
+        pending: List[bytes] = []
+        quotes = 0
+        for line in file:
+            digest.update(line)
+            if not pending:
+                start = offset
+            offset += len(line)
+            pending.append(line)
+            quotes += line.count(b'"')
+            if quotes % 2 == 0:
+                yield start, b''.join(pending) if len(pending) > 1 else line
+                pending = []
+                quotes = 0
+        if pending:
+            yield start, b''.join(pending)
+
+    @staticmethod
+    def _parse_row(row_bytes: bytes) -> List[str]:
+        """行のバイト列を値のリストに変換（空行の場合は空のリスト）"""
+        return next(csv.reader([row_bytes.decode('utf-8')]), [])
+
+    @staticmethod
+    def _column_position(fieldnames: Sequence[str], column: str) -> Optional[int]:
+        """列の位置を取得（存在しない場合はNone）"""
+        return fieldnames.index(column) if column in fieldnames else None
+
+    @staticmethod
+    def _column_value(values: Sequence[str], position: Optional[int]) -> bytes:
+        """列の値をUTF-8のバイト列で取得（存在しない列は空）"""
+        if position is None or position >= len(values):
+            return b''
+        return values[position].encode('utf-8')
+
+    @staticmethod
+    def _map(file) -> Optional[mmap.mmap]:
+        """ファイルを読み込み専用で mmap する（空ファイルは mmap できないためNone）"""
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def _hash_file(cls, file_path: str) -> str:
+        """ファイル内容のハッシュ値を計算"""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(cls._HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+class _EntryKeys:
+    """インデックスのエントリーをキーの列として bisect に渡すためのラッパー"""
+
+    __slots__ = ('_key_at', '_length')
+
+    def __init__(self, key_at, length: int):
+        self._key_at = key_at
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, number: int) -> bytes:
+        return self._key_at(number)
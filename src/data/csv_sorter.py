@@ -0,0 +1,129 @@
+"""
+CSVファイル外部ソート処理
+"""
+import csv
+import heapq
+import os
+import tempfile
+from typing import List, Dict, Sequence, Tuple
+
+from .compressed_file import CompressedFile
+
+
+class CsvSorter:
+    """CSVファイル外部ソートクラス
+
+    メモリに収まらないCSVファイルを、一定行数ごとにソート済みの
+    一時ファイル（ラン）へ分割し、最後にマージしてソートする。
+    """
+
+    DEFAULT_CHUNK_SIZE = 10000
+
+    @staticmethod
+    def sort_csv(
+        input_path: str,
+        output_path: str,
+        key_columns: Sequence[str] = ('__id__',),
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        temp_dir: str = None
+    ) -> None:
+        """
+        CSVファイルを指定列の順にソートして出力する
+
+        同じキーの行は入力ファイルでの出現順を保持する（安定ソート）。
+
+        Args:
+            input_path: 入力CSVファイルのパス
+            output_path: 出力CSVファイルのパス
+            key_columns: ソートキーとする列名
+            chunk_size: 1つのランに含める最大行数
+            temp_dir: 一時ファイルを作成するディレクトリ
+        """
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_sizeは1以上を指定してください: {chunk_size}")
+
+        key_columns = tuple(key_columns)
+
+        with tempfile.TemporaryDirectory(prefix='csv_sort_', dir=temp_dir) as work_dir:
+            try:
+                fieldnames, run_paths = CsvSorter._write_sorted_runs(
+                    input_path, key_columns, chunk_size, work_dir
+                )
+            except FileNotFoundError:
+                raise FileNotFoundError(f"ファイルが見つかりません: {input_path}")
+
+            CsvSorter._merge_runs(run_paths, fieldnames, key_columns, output_path)
+
+    @staticmethod
+    def _write_sorted_runs(
+        input_path: str,
+        key_columns: Tuple[str, ...],
+        chunk_size: int,
+        work_dir: str
+    ) -> Tuple[List[str], List[str]]:
+        """入力をソート済みのランに分割して書き出す"""
+        run_paths = []
+
+        with CompressedFile.open_text(input_path, newline='') as file:
+            reader = csv.DictReader(file)
+            fieldnames = list(reader.fieldnames or [])
+
+            chunk: List[Dict[str, str]] = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    run_paths.append(CsvSorter._write_run(chunk, fieldnames, key_columns, work_dir, len(run_paths)))
+                    chunk = []
+            if chunk:
+                run_paths.append(CsvSorter._write_run(chunk, fieldnames, key_columns, work_dir, len(run_paths)))
+
+        return fieldnames, run_paths
+
+    @staticmethod
+    def _write_run(
+        rows: List[Dict[str, str]],
+        fieldnames: List[str],
+        key_columns: Tuple[str, ...],
+        work_dir: str,
+        run_number: int
+    ) -> str:
+        """1つのランをソートして書き出す"""
+        rows.sort(key=lambda row: CsvSorter._sort_key(row, key_columns))
+
+        run_path = os.path.join(work_dir, f"run_{run_number:06d}.csv")
+        with open(run_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+        return run_path
+
+    @staticmethod
+    def _merge_runs(
+        run_paths: List[str],
+        fieldnames: List[str],
+        key_columns: Tuple[str, ...],
+        output_path: str
+    ) -> None:
+        """ソート済みのランをマージして出力する"""
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        run_files = [open(path, 'r', newline='', encoding='utf-8') for path in run_paths]
+        try:
+            readers = [csv.DictReader(file) for file in run_files]
+            with open(output_path, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=fieldnames)
+                writer.writeheader()
+                for row in heapq.merge(*readers, key=lambda row: CsvSorter._sort_key(row, key_columns)):
+                    writer.writerow(row)
+        finally:
+            for file in run_files:
+                file.close()
+
+    @staticmethod
+    def _sort_key(row: Dict[str, str], key_columns: Tuple[str, ...]) -> Tuple[str, ...]:
+        """行からソートキーを取得"""
+        return tuple(row.get(column) or '' for column in key_columns)
+
@@ -2,17 +2,23 @@
 CSVファイル書き込み処理
 """
 import csv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 
+from .compressed_file import CompressedFile
+
 
 class CsvWriter:
-    """CSVファイル書き込みクラス"""
+    """CSVファイル書き込みクラス
+
+    出力パスの拡張子が .gz / .xz の場合は gzip / xz で逐次圧縮して書き込む。
+    """
 
     @staticmethod
     def write_comparison_results(
         results: List[Dict[str, Any]], 
-        output_path: str
+        output_path: str, 
+        compression_level: Optional[int] = None
     ) -> None:
         """
         比較結果をCSVファイルに書き込む
@@ -20,6 +26,7 @@ class CsvWriter:
         Args:
             results: 比較結果の辞書リスト
             output_path: 出力ファイルのパス
+            compression_level: 圧縮する場合の圧縮レベル（0〜9）
         """
         if not results:
             return
@@ -29,7 +36,9 @@ class CsvWriter:
         output_dir.mkdir(parents=True, exist_ok=True)
 
         try:
-            with open(output_path, 'w', newline='', encoding='utf-8') as file:
+            with CompressedFile.open_text(
+                output_path, 'w', newline='', level=compression_level
+            ) as file:
                 # ヘッダーを取得
                 fieldnames = results[0].keys()
                 writer = csv.DictWriter(file, fieldnames=fieldnames)
@@ -46,7 +55,8 @@ class CsvWriter:
     @staticmethod
     def write_kyuyo_records(
         records: List[Dict[str, Any]], 
-        output_path: str
+        output_path: str, 
+        compression_level: Optional[int] = None
     ) -> None:
         """
         給与レコードをCSVファイルに書き込む
@@ -54,6 +64,7 @@ class CsvWriter:
         Args:
             records: 給与レコードの辞書リスト
             output_path: 出力ファイルのパス
+            compression_level: 圧縮する場合の圧縮レベル（0〜9）
         """
         if not records:
             return
@@ -63,7 +74,9 @@ class CsvWriter:
         output_dir.mkdir(parents=True, exist_ok=True)
 
         try:
-            with open(output_path, 'w', newline='', encoding='utf-8') as file:
+            with CompressedFile.open_text(
+                output_path, 'w', newline='', level=compression_level
+            ) as file:
                 # ヘッダーを取得
                 fieldnames = records[0].keys()
                 writer = csv.DictWriter(file, fieldnames=fieldnames)
@@ -76,3 +89,32 @@ class CsvWriter:
                     writer.writerow(record)
         except Exception as e:
             raise Exception(f"CSVファイルの書き込み中にエラーが発生しました: {e}")
+
+    @staticmethod
+    def write_csv_text(
+        text: str, 
+        output_path: str, 
+        compression_level: Optional[int] = None
+    ) -> None:
+        """
+        CSV形式に変換済みの文字列（ヘッダーを含む）をファイルに書き込む
+        
+        Args:
+            text: CSV形式の文字列
+            output_path: 出力ファイルのパス
+            compression_level: 圧縮する場合の圧縮レベル（0〜9）
+        """
+        if not text:
+            return
+
+        # 出力ディレクトリを作成
+        output_dir = Path(output_path).parent
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        try:
+            with CompressedFile.open_text(
+                output_path, 'w', newline='', level=compression_level
+            ) as file:
+                file.write(text)
+        except Exception as e:
+            raise Exception(f"CSVファイルの書き込み中にエラーが発生しました: {e}")
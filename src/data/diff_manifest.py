@@ -0,0 +1,291 @@
+"""
+差分の再計算用マニフェスト
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from .models import KyuyoRecord
+
+
+@dataclass
+class ManifestEntry:
+    """マニフェストの1レコード分のエントリー"""
+    __slots__ = (
+        'record_id',
+        'before_fingerprint',
+        'after_fingerprint',
+        'shain_id',
+        'shain_name',
+        'total_items',
+        'field_mismatches',
+        'file_name',
+        'details_offset',
+        'details_length'
+    )
+
+    record_id: str
+    before_fingerprint: str
+    after_fingerprint: str
+    shain_id: str
+    shain_name: str
+    total_items: int
+    # 比較対象フィールド順の不一致数
+    field_mismatches: List[int]
+    # 出力したCSVのファイル名（出力しなかった場合は空）
+    file_name: str
+    # 不一致詳細ファイル内の位置とバイト長（add で設定する）
+    details_offset: int
+    details_length: int
+
+
+class DiffManifest:
+    """出力ディレクトリに保存する、レコードごとの入力のフィンガープリントと集計結果
+
+    再実行時に変更前・変更後の両方のフィンガープリントが前回と同じレコードは
+    比較と出力を省略し、保存しておいた集計結果をサマリーに加える。
+    HTMLレポート用の不一致詳細は出力したCSVを読み直さずに済むよう
+    不一致詳細ファイルにまとめて保存し、エントリーにはその位置だけを持つ。
+
+    ファイルの形式:
+        diff_manifest.csv
+            1行目: "# " + JSONヘッダー（形式のバージョン、世代、比較条件のハッシュ値、比較対象フィールド）
+            2行目: 列名
+            以降  : レコードごとのエントリー
+        diff_manifest_details.csv
+            1行目: 世代
+            以降  : 不一致詳細（SummaryAggregator の形式）
+    比較条件（比較ルール・出力形式など）が前回と異なる場合や、
+    2つのファイルの世代が一致しない場合（書き込み途中で中断した場合）はマニフェストを使用しない。
+    """
+
+    FILE_NAME = 'diff_manifest.csv'
+    DETAILS_FILE_NAME = 'diff_manifest_details.csv'
+
+    # マニフェストの形式を変更した場合は上げる
+    FORMAT_VERSION = 1
+
+    def __init__(self, output_dir: str, config_key: str, comparison_fields: List[str]):
+        """
+        Args:
+            output_dir: 出力ディレクトリ
+            config_key: 比較条件のハッシュ値（config_key で作成）
+            comparison_fields: 比較対象フィールド
+        """
+        self.output_dir = output_dir
+        self.config_key = config_key
+        self.comparison_fields = list(comparison_fields)
+        self.entries: Dict[str, ManifestEntry] = {}
+        self.generation = os.urandom(8).hex()
+        self._details_file: Optional[BinaryIO] = None
+        self._details_offset = 0
+
+    @property
+    def path(self) -> str:
+        """マニフェストファイルのパス"""
+        return os.path.join(self.output_dir, self.FILE_NAME)
+
+    @property
+    def details_path(self) -> str:
+        """不一致詳細ファイルのパス"""
+        return os.path.join(self.output_dir, self.DETAILS_FILE_NAME)
+
+    @classmethod
+    def load(cls, output_dir: str, config_key: str, comparison_fields: List[str]) -> 'DiffManifest':
+        """
+        前回のマニフェストを読み込む
+
+        不一致詳細ファイルは read_details で読めるよう開いたままにする（close で閉じる）。
+
+        Args:
+            output_dir: 出力ディレクトリ
+            config_key: 今回の比較条件のハッシュ値
+            comparison_fields: 比較対象フィールド
+
+        Returns:
+            マニフェスト（存在しない・比較条件が異なる場合はエントリーが空）
+        """
+        manifest = cls(output_dir, config_key, comparison_fields)
+        try:
+            with open(manifest.path, 'r', newline='', encoding='utf-8') as file:
+                header = manifest._parse_header(file.readline())
+                if header is None:
+                    return manifest
+                manifest.generation = header.pop('generation', None)
+                if header != manifest._header():
+                    return manifest
+                reader = csv.reader(file)
+                next(reader, None)
+                for row in reader:
+                    entry = manifest._entry_from_row(row)
+                    manifest.entries[entry.record_id] = entry
+
+            manifest._details_file = open(manifest.details_path, 'rb')
+            if manifest._details_file.readline().decode('ascii').strip() != manifest.generation:
+                manifest.close()
+                manifest.entries = {}
+        except FileNotFoundError:
+            manifest.entries = {}
+        except (ValueError, IndexError):
+            # 形式が壊れたマニフェストは使用しない
+            manifest.close()
+            manifest.entries = {}
+        return manifest
+
+    def read_details(self, entry: ManifestEntry) -> List[tuple]:
+        """
+        load で読み込んだエントリーの不一致詳細を読み込む
+
+        Args:
+            entry: エントリー
+
+        Returns:
+            不一致詳細の値のタプルのリスト
+        """
+        if entry.details_length == 0:
+            return []
+        self._details_file.seek(entry.details_offset)
+        text = self._details_file.read(entry.details_length).decode('utf-8')
+        return [tuple(row) for row in csv.reader(io.StringIO(text, newline=''))]
+
+    def add(self, entry: ManifestEntry, mismatch_details: List[tuple]) -> None:
+        """
+        今回のエントリーと不一致詳細を追加する（不一致詳細は一時ファイルに書き込む）
+
+        Args:
+            entry: エントリー
+            mismatch_details: 不一致詳細の値のタプルのリスト
+        """
+        if self._details_file is None:
+            self._open_details()
+
+        entry.details_offset = self._details_offset
+        entry.details_length = 0
+        if mismatch_details:
+            buffer = io.StringIO(newline='')
+            csv.writer(buffer).writerows(mismatch_details)
+            entry.details_length = self._details_file.write(buffer.getvalue().encode('utf-8'))
+            self._details_offset += entry.details_length
+        self.entries[entry.record_id] = entry
+
+    def save(self) -> None:
+        """
+        add したエントリーを書き込む（前回のマニフェストを置き換える）
+        """
+        temp_path = self.path + '.tmp'
+        try:
+            if self._details_file is None:
+                self._open_details()
+            self.close()
+
+            with open(temp_path, 'w', newline='', encoding='utf-8') as file:
+                header = self._header()
+                header['generation'] = self.generation
+                file.write('# ' + json.dumps(header) + '\n')
+                writer = csv.writer(file)
+                writer.writerow(
+                    ['record_id', 'before_fingerprint', 'after_fingerprint', 'shain_id', 'shain_name', 'total_items']
+                    + [f'{field}_mismatches' for field in self.comparison_fields]
+                    + ['file_name', 'details_offset', 'details_length']
+                )
+                for entry in self.entries.values():
+                    writer.writerow(
+                        [
+                            entry.record_id, entry.before_fingerprint, entry.after_fingerprint,
+                            entry.shain_id, entry.shain_name, entry.total_items
+                        ]
+                        + entry.field_mismatches
+                        + [entry.file_name, entry.details_offset, entry.details_length]
+                    )
+
+            # 不一致詳細を先に置き換える（途中で中断した場合は世代が一致せず使用されない）
+            os.replace(self.details_path + '.tmp', self.details_path)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            for path in (temp_path, self.details_path + '.tmp'):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise Exception(f"マニフェストの書き込み中にエラーが発生しました: {e}")
+
+    def close(self) -> None:
+        """不一致詳細ファイルを閉じる"""
+        if self._details_file is not None:
+            self._details_file.close()
+            self._details_file = None
+
+    @staticmethod
+    def fingerprint(record: KyuyoRecord) -> str:
+        """
+        レコードのフィンガープリントを計算
+
+        出力に含まれる列と明細JSONのハッシュ値から計算するため、明細JSONはパースしない。
+
+        Args:
+            record: レコード
+
+        Returns:
+            16進数のフィンガープリント
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for value in (record.record_id, record.shain_id, record.shain_name,
+                      record.keisan_nengetsu, record.shori_nengetsu):
+            digest.update(value.encode('utf-8'))
+            digest.update(b'\0')
+        digest.update(record.get_meisai_digest() or b'')
+        return digest.hexdigest()
+
+    @staticmethod
+    def config_key(**config: Any) -> str:
+        """
+        比較条件のハッシュ値を計算
+
+        Args:
+            config: 出力内容に影響する比較条件（値は repr で比較できること）
+
+        Returns:
+            16進数のハッシュ値
+        """
+        text = repr(sorted(config.items()))
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _open_details(self) -> None:
+        """今回の不一致詳細の一時ファイルを開き、世代を書き込む"""
+        self._details_file = open(self.details_path + '.tmp', 'wb')
+        self._details_offset = self._details_file.write(f'{self.generation}\n'.encode('ascii'))
+
+    def _header(self) -> Dict[str, Any]:
+        """JSONヘッダーの内容（世代を除く）"""
+        return {
+            'version': self.FORMAT_VERSION,
+            'config': self.config_key,
+            'fields': self.comparison_fields,
+        }
+
+    @staticmethod
+    def _parse_header(line: str) -> Optional[Dict[str, Any]]:
+        """JSONヘッダーの行を読み込む（形式が違う場合はNone）"""
+        if not line.startswith('# '):
+            return None
+        return json.loads(line[2:])
+
+    def _entry_from_row(self, row: List[str]) -> ManifestEntry:
+        """CSVの行をエントリーに変換"""
+        field_count = len(self.comparison_fields)
+        if len(row) != 9 + field_count:
+            raise ValueError(f"マニフェストの列数が不正です: {len(row)}")
+        return ManifestEntry(
+            record_id=row[0],
+            before_fingerprint=row[1],
+            after_fingerprint=row[2],
+            shain_id=row[3],
+            shain_name=row[4],
+            total_items=int(row[5]),
+            field_mismatches=[int(value) for value in row[6:6 + field_count]],
+            file_name=row[6 + field_count],
+            details_offset=int(row[7 + field_count]),
+            details_length=int(row[8 + field_count])
+        )
@@ -2,7 +2,7 @@
 HTML出力用のデータモデル
 """
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from typing import Iterable, Dict, Any, Optional
 from datetime import datetime
 
 
@@ -15,6 +15,8 @@ class HtmlSummaryData:
     mismatch_rate: float
     field_mismatches: Dict[str, int]
     generated_at: datetime
+    # 不一致があるレコード数（record_summaries がイテレーターの場合に表示する件数）
+    mismatch_record_count: Optional[int] = None
 
 
 @dataclass
@@ -32,6 +34,19 @@ class HtmlRecordSummaryData:
 @dataclass
 class HtmlMismatchDetailData:
     """HTML不一致詳細データ"""
+    # 不一致の件数分生成されるため __dict__ を持たせない
+    __slots__ = (
+        'record_id',
+        'shain_id',
+        'shain_name',
+        'kyuyo_komoku_code',
+        'kyuyo_komoku_name',
+        'field_name',
+        'before_value',
+        'after_value',
+        'is_match'
+    )
+
     record_id: str
     shain_id: str
     shain_name: str
@@ -45,9 +60,13 @@ class HtmlMismatchDetailData:
 
 @dataclass
 class HtmlReportData:
-    """HTMLレポート全体データ"""
+    """HTMLレポート全体データ
+
+    record_summaries / mismatch_details はリストのほか、
+    HTML書き込み時に1回だけ走査されるイテレーターでもよい。
+    """
     summary: HtmlSummaryData
-    record_summaries: List[HtmlRecordSummaryData]
-    mismatch_details: List[HtmlMismatchDetailData]
+    record_summaries: Iterable[HtmlRecordSummaryData]
+    mismatch_details: Iterable[HtmlMismatchDetailData]
     before_file_name: str
     after_file_name: str
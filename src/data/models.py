@@ -1,14 +1,36 @@
 """
 データモデル定義
+
+大量に生成される KyuyoMeisaiItem / KyuyoRecord / ComparisonResult は
+__slots__ を定義してインスタンスごとの __dict__ を持たないようにしている。
+__slots__ と衝突するため、これらのクラスのフィールドには既定値を設定しないこと。
 """
 from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
+import hashlib
 import json
+import sys
+
+
+def _intern(value: Any) -> Any:
+    """社員間で繰り返し現れる文字列を共有するためにインターンする"""
+    if type(value) is str:
+        return sys.intern(value)
+    return value
 
 
 @dataclass
 class KyuyoMeisaiItem:
     """給与明細項目"""
+    __slots__ = (
+        'final_value',
+        'kyuyo_komoku_code',
+        'kyuyo_komoku_kubun',
+        'kyuyo_komoku_name',
+        'order',
+        'process_value'
+    )
+
     final_value: Any
     kyuyo_komoku_code: str
     kyuyo_komoku_kubun: str
@@ -21,13 +43,37 @@ class KyuyoMeisaiItem:
         """辞書からインスタンスを作成"""
         return cls(
             final_value=data.get('finalValue'),
-            kyuyo_komoku_code=data.get('kyuyoKomokuCode', ''),
-            kyuyo_komoku_kubun=data.get('kyuyoKomokuKubun', ''),
-            kyuyo_komoku_name=data.get('kyuyoKomokuName', ''),
+            kyuyo_komoku_code=_intern(data.get('kyuyoKomokuCode', '')),
+            kyuyo_komoku_kubun=_intern(data.get('kyuyoKomokuKubun', '')),
+            kyuyo_komoku_name=_intern(data.get('kyuyoKomokuName', '')),
             order=data.get('order', 0),
             process_value=data.get('processValue')
         )
 
+    @classmethod
+    def from_tuple(cls, values: tuple) -> 'KyuyoMeisaiItem':
+        """to_tuple で変換したタプルからインスタンスを作成"""
+        final_value, kyuyo_komoku_code, kyuyo_komoku_kubun, kyuyo_komoku_name, order, process_value = values
+        return cls(
+            final_value,
+            _intern(kyuyo_komoku_code),
+            _intern(kyuyo_komoku_kubun),
+            _intern(kyuyo_komoku_name),
+            order,
+            process_value
+        )
+
+    def to_tuple(self) -> tuple:
+        """__slots__ の順に値を並べたタプルに変換（marshal などでの保存用）"""
+        return (
+            self.final_value,
+            self.kyuyo_komoku_code,
+            self.kyuyo_komoku_kubun,
+            self.kyuyo_komoku_name,
+            self.order,
+            self.process_value
+        )
+
     def to_dict(self) -> Dict[str, Any]:
         """辞書に変換"""
         return {
@@ -40,40 +86,157 @@ class KyuyoMeisaiItem:
         }
 
 
-@dataclass
+@dataclass(init=False)
 class KyuyoRecord:
-    """給与レコード"""
+    """給与レコード
+
+    getsu_kyuyo_result_meisai_list は最初に参照した時点でJSONをパースし、
+    結果を内部に保持するプロパティ。
+    """
+    __slots__ = (
+        'record_id',
+        'shain_id',
+        'shain_name',
+        'keisan_nengetsu',
+        'shori_nengetsu',
+        '_meisai_list',
+        'meisai_list_json',
+        'meisai_list_digest'
+    )
+
+    # 入力CSVのうちレコードの構築に使用する列（先頭は__id__）
+    CSV_COLUMNS = (
+        '__id__',
+        'shainId',
+        'shainName',
+        'keisanNengetsu',
+        'shoriNengetsu',
+        'getsuKyuyoResultMeisaiList'
+    )
+
     record_id: str
     shain_id: str
     shain_name: str
     keisan_nengetsu: str
     shori_nengetsu: str
-    getsu_kyuyo_result_meisai_list: List[KyuyoMeisaiItem]
+    # パース済みの給与明細項目（未パースの場合はNone）
+    _meisai_list: Optional[List[KyuyoMeisaiItem]]
+    # CSVのgetsuKyuyoResultMeisaiList列の文字列（パース後はメモリ節約のためNone）
+    meisai_list_json: Optional[str]
+    # meisai_list_json のハッシュ値（パース時に計算し、JSON文字列の代わりに保持）
+    meisai_list_digest: Optional[bytes]
+
+    def __init__(
+        self,
+        record_id: str,
+        shain_id: str,
+        shain_name: str,
+        keisan_nengetsu: str,
+        shori_nengetsu: str,
+        getsu_kyuyo_result_meisai_list: Optional[List[KyuyoMeisaiItem]] = None,
+        meisai_list_json: Optional[str] = None,
+        meisai_list_digest: Optional[bytes] = None
+    ):
+        """
+        Args:
+            getsu_kyuyo_result_meisai_list: パース済みの給与明細項目（Noneの場合は meisai_list_json を参照時にパース）
+            meisai_list_json: getsuKyuyoResultMeisaiList列のJSON文字列
+            meisai_list_digest: meisai_list_json のハッシュ値（不明な場合はNone）
+        """
+        self.record_id = record_id
+        self.shain_id = shain_id
+        self.shain_name = shain_name
+        self.keisan_nengetsu = keisan_nengetsu
+        self.shori_nengetsu = shori_nengetsu
+        self._meisai_list = getsu_kyuyo_result_meisai_list
+        self.meisai_list_json = meisai_list_json
+        self.meisai_list_digest = meisai_list_digest
 
     @classmethod
     def from_csv_row(cls, row: Dict[str, str]) -> 'KyuyoRecord':
-        """CSV行からインスタンスを作成"""
-        # getsuKyuyoResultMeisaiListをJSONとしてパース
-        meisai_list_json = row.get('getsuKyuyoResultMeisaiList', '[]')
-        try:
-            meisai_list_data = json.loads(meisai_list_json)
-            meisai_list = [KyuyoMeisaiItem.from_dict(item) for item in meisai_list_data]
-        except (json.JSONDecodeError, TypeError):
-            meisai_list = []
-
+        """
+        CSV行からインスタンスを作成
+        
+        getsuKyuyoResultMeisaiListのJSONはここではパースせず、
+        getsu_kyuyo_result_meisai_list が最初に参照された時点でパースする。
+        """
         return cls(
             record_id=row.get('__id__', ''),
             shain_id=row.get('shainId', ''),
             shain_name=row.get('shainName', ''),
-            keisan_nengetsu=row.get('keisanNengetsu', ''),
-            shori_nengetsu=row.get('shoriNengetsu', ''),
-            getsu_kyuyo_result_meisai_list=meisai_list
+            keisan_nengetsu=_intern(row.get('keisanNengetsu', '')),
+            shori_nengetsu=_intern(row.get('shoriNengetsu', '')),
+            meisai_list_json=row.get('getsuKyuyoResultMeisaiList', '[]')
         )
 
+    @property
+    def getsu_kyuyo_result_meisai_list(self) -> List[KyuyoMeisaiItem]:
+        """
+        給与明細項目のリスト（未パースの場合はJSONをパースして保持）
+        
+        パース後はJSON文字列を破棄し、一致判定用にハッシュ値だけを残す。
+        """
+        if self._meisai_list is None:
+            self._meisai_list = self.parse_meisai_list(self.meisai_list_json)
+            if self.meisai_list_json is not None:
+                self.meisai_list_digest = self.get_meisai_digest()
+                self.meisai_list_json = None
+        return self._meisai_list
+
+    @getsu_kyuyo_result_meisai_list.setter
+    def getsu_kyuyo_result_meisai_list(self, items: List[KyuyoMeisaiItem]) -> None:
+        self._meisai_list = items
+
+    def get_meisai_list(self) -> List[KyuyoMeisaiItem]:
+        """給与明細項目のリストを取得（getsu_kyuyo_result_meisai_list と同じ）"""
+        return self.getsu_kyuyo_result_meisai_list
+
+    def get_meisai_digest(self) -> Optional[bytes]:
+        """getsuKyuyoResultMeisaiListのJSON文字列のハッシュ値を取得（不明な場合はNone）"""
+        if self.meisai_list_digest is None and self.meisai_list_json is not None:
+            self.meisai_list_digest = hashlib.blake2b(
+                self.meisai_list_json.encode('utf-8'), digest_size=16
+            ).digest()
+        return self.meisai_list_digest
+
+    def has_same_meisai_json(self, other: 'KyuyoRecord') -> bool:
+        """
+        getsuKyuyoResultMeisaiListのJSON文字列が完全に一致するか判定
+        
+        JSONをパースせずに比較するため、一致する場合は両方のパースを省略できる。
+        両方のJSON文字列が残っていれば文字列を、どちらかがパース済みであれば
+        ハッシュ値を比較する。
+        """
+        if self.meisai_list_json is not None and other.meisai_list_json is not None:
+            return self.meisai_list_json == other.meisai_list_json
+        
+        digest = self.get_meisai_digest()
+        return digest is not None and digest == other.get_meisai_digest()
+
+    @staticmethod
+    def parse_meisai_list(meisai_list_json: Optional[str]) -> List[KyuyoMeisaiItem]:
+        """getsuKyuyoResultMeisaiListのJSONをパース"""
+        try:
+            meisai_list_data = json.loads(meisai_list_json)
+            return [KyuyoMeisaiItem.from_dict(item) for item in meisai_list_data]
+        except (json.JSONDecodeError, TypeError):
+            return []
+
 
 @dataclass
 class ComparisonResult:
     """比較結果"""
+    __slots__ = (
+        'record_id',
+        'shain_id',
+        'shain_name',
+        'keisan_nengetsu',
+        'shori_nengetsu',
+        'before_items',
+        'after_items',
+        'comparison_details'
+    )
+
     record_id: str
     shain_id: str
     shain_name: str
@@ -0,0 +1,26 @@
+"""
+レコードのパーティション分割
+"""
+import zlib
+
+
+class RecordPartitioner:
+    """record_idのハッシュでパーティション番号を決めるクラス"""
+
+    @staticmethod
+    def partition_of(record_id: str, partitions: int, divisor: int = 1) -> int:
+        """
+        record_idが属するパーティション番号を取得
+
+        プロセスや実行ごとに値が変わる hash() ではなく CRC32 を使用する。
+
+        Args:
+            record_id: レコードID
+            partitions: パーティション数
+            divisor: CRC32 の値をこの値で割ってからパーティション番号を求める
+                （分割済みのパーティションを、前回の分割に使っていない桁でさらに分割する場合に指定）
+
+        Returns:
+            パーティション番号
+        """
+        return zlib.crc32(record_id.encode('utf-8')) // divisor % partitions
@@ -0,0 +1,210 @@
+"""
+パース済みスナップショットのキャッシュ
+"""
+import hashlib
+import marshal
+import os
+import struct
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from .models import KyuyoMeisaiItem, KyuyoRecord
+
+
+class SnapshotCache:
+    """入力CSVをパースしたレコードをファイル内容のハッシュ値をキーに保存するキャッシュ
+
+    同じ変更前ファイルを何度も比較する場合に、2回目以降は
+    CSVの読み込み・明細JSONのパース・KyuyoMeisaiItem の構築を省略する。
+
+    キャッシュはキャッシュディレクトリに「<内容のハッシュ値>.snapshot」として
+    marshal 形式で保存する。レコード・明細項目はタプルに変換し、
+    全件を1つのリストに変換しないよう CHUNK_SIZE 件ずつ「バイト長 + marshal のバイト列」として書き込む
+    （marshal.load でファイルから直接読むと小さな読み込みが大量に発生するため、
+    チャンク単位で読み込んでから marshal.loads で復元する）。
+    合計サイズが max_bytes を超えた場合は最後に使用した日時が古いものから削除する。
+    marshal の形式は Python のバージョンに依存するため、異なるバージョンで
+    作成したキャッシュは使用しない。
+    """
+
+    FILE_EXTENSION = '.snapshot'
+
+    # キャッシュの形式を変更した場合は上げる
+    FORMAT_VERSION = 1
+
+    DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+    # 1回の marshal.dump で書き込むレコード数
+    CHUNK_SIZE = 1000
+
+    # チャンクのバイト長（ビッグエンディアンの64ビット整数）
+    _CHUNK_LENGTH = struct.Struct('>Q')
+
+    # ハッシュ値を計算するときの読み込みサイズ
+    _HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir: キャッシュディレクトリ
+            max_bytes: キャッシュの合計サイズの上限（バイト）
+        """
+        if max_bytes < 0:
+            raise ValueError(f"キャッシュの上限は0以上を指定してください: {max_bytes}")
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._version = (self.FORMAT_VERSION, sys.version_info[0], sys.version_info[1])
+        # ファイルのパス → (サイズ, 更新日時, 内容のハッシュ値)（同じファイルを何度もハッシュしない）
+        self._content_hashes: Dict[str, Tuple[int, int, str]] = {}
+
+    def load(self, file_path: str) -> Optional[List[KyuyoRecord]]:
+        """
+        ファイルのパース済みレコードをキャッシュから読み込む
+
+        Args:
+            file_path: 入力CSVファイルのパス
+
+        Returns:
+            レコードのリスト（キャッシュがない場合はNone）
+        """
+        cache_path = self._cache_path(self.content_hash(file_path))
+        records = []
+        try:
+            with open(cache_path, 'rb') as file:
+                if self._read_chunk(file) != self._version:
+                    return None
+                while True:
+                    chunk = self._read_chunk(file)
+                    if chunk is None:
+                        break
+                    for values in chunk:
+                        record_id, shain_id, shain_name, keisan_nengetsu, shori_nengetsu, digest, items = values
+                        records.append(KyuyoRecord(
+                            record_id, shain_id, shain_name, keisan_nengetsu, shori_nengetsu,
+                            [KyuyoMeisaiItem.from_tuple(item) for item in items], None, digest
+                        ))
+        except FileNotFoundError:
+            return None
+        except (EOFError, ValueError, TypeError):
+            # 形式が壊れたキャッシュは使用しない
+            return None
+
+        # 最後に使用した日時を更新（LRUの判定に使用）
+        os.utime(cache_path)
+        return records
+
+    def store(self, file_path: str, records: List[KyuyoRecord]) -> str:
+        """
+        パース済みレコードをキャッシュに保存する
+
+        明細JSONが未パースのレコードはここでパースする。
+
+        Args:
+            file_path: 入力CSVファイルのパス
+            records: file_path を読み込んだレコードのリスト
+
+        Returns:
+            キャッシュファイルのパス
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self._cache_path(self.content_hash(file_path))
+
+        # 書き込み途中のファイルを読まないよう、一時ファイルに書き込んでから置き換える
+        file_descriptor, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                self._write_chunk(file, self._version)
+                for start in range(0, len(records), self.CHUNK_SIZE):
+                    self._write_chunk(file, [
+                        (
+                            record.record_id, record.shain_id, record.shain_name,
+                            record.keisan_nengetsu, record.shori_nengetsu, record.get_meisai_digest(),
+                            [item.to_tuple() for item in record.get_meisai_list()]
+                        )
+                        for record in records[start:start + self.CHUNK_SIZE]
+                    ])
+            os.replace(temp_path, cache_path)
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise Exception(f"キャッシュの書き込み中にエラーが発生しました: {e}")
+
+        self.evict()
+        return cache_path
+
+    def evict(self) -> None:
+        """合計サイズが上限を超えている間、最後に使用した日時が古いキャッシュから削除する"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.FILE_EXTENSION):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def content_hash(self, file_path: str) -> str:
+        """
+        ファイル内容のハッシュ値を計算（サイズ・更新日時が変わっていなければ前回の値を使う）
+
+        Args:
+            file_path: ファイルのパス
+
+        Returns:
+            16進数のハッシュ値
+        """
+        try:
+            stat = os.stat(file_path)
+            key = os.path.abspath(file_path)
+            cached = self._content_hashes.get(key)
+            if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+                return cached[2]
+
+            digest = hashlib.blake2b(digest_size=16)
+            with open(file_path, 'rb') as file:
+                for chunk in iter(lambda: file.read(self._HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"ファイルが見つかりません: {file_path}")
+
+        self._content_hashes[key] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        return self._content_hashes[key][2]
+
+    @classmethod
+    def _write_chunk(cls, file, value) -> None:
+        """値を marshal 形式に変換し、バイト長を付けて書き込む"""
+        data = marshal.dumps(value)
+        file.write(cls._CHUNK_LENGTH.pack(len(data)))
+        file.write(data)
+
+    @classmethod
+    def _read_chunk(cls, file):
+        """_write_chunk で書き込んだ値を読み込む（ファイルの終端ではNone）"""
+        header = file.read(cls._CHUNK_LENGTH.size)
+        if not header:
+            return None
+        if len(header) < cls._CHUNK_LENGTH.size:
+            raise EOFError("キャッシュファイルが途中で終わっています")
+        length, = cls._CHUNK_LENGTH.unpack(header)
+        data = file.read(length)
+        if len(data) < length:
+            raise EOFError("キャッシュファイルが途中で終わっています")
+        return marshal.loads(data)
+
+    def _cache_path(self, content_hash: str) -> str:
+        """キャッシュファイルのパスを取得"""
+        return os.path.join(self.cache_dir, content_hash + self.FILE_EXTENSION)
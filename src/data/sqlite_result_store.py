@@ -0,0 +1,321 @@
+"""
+比較結果のSQLite保存処理
+"""
+import sqlite3
+from pathlib import Path
+from typing import Iterator, List, Dict, Any, Optional
+
+from .models import ComparisonResult
+from .html_models import HtmlMismatchDetailData
+
+
+class SqliteResultStore:
+    """比較結果をSQLiteデータベースに保存・検索するクラス
+
+    records（レコード）、items（給与明細項目）、field_mismatches（フィールド不一致）の
+    3テーブルに比較結果を保存する。書き込みは1トランザクション内でまとめて行い、
+    インデックスは全件投入後に作成する。
+    """
+
+    # executemany でまとめて投入する行数
+    BATCH_SIZE = 10000
+
+    def __init__(self, db_path: str, comparison_fields: List[str]):
+        for field in comparison_fields:
+            if not field.isidentifier():
+                raise ValueError(f"フィールド名に使用できない文字が含まれています: {field}")
+
+        self.db_path = db_path
+        self.comparison_fields = list(comparison_fields)
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pending: Dict[str, List[tuple]] = {'records': [], 'items': [], 'field_mismatches': []}
+
+    def open(self, reset: bool = True) -> None:
+        """
+        データベースに接続する
+
+        Args:
+            reset: Trueの場合は既存のテーブルを削除して作り直す（書き込み用）
+        """
+        if reset:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        elif not Path(self.db_path).exists():
+            raise FileNotFoundError(f"ファイルが見つかりません: {self.db_path}")
+
+        self._connection = sqlite3.connect(self.db_path)
+
+        if reset:
+            self._connection.execute('PRAGMA journal_mode = OFF')
+            self._connection.execute('PRAGMA synchronous = OFF')
+            self._create_tables()
+            self._connection.execute('BEGIN')
+
+    def add_result(self, result: ComparisonResult) -> None:
+        """
+        比較結果を1件追加する
+
+        Args:
+            result: 比較結果
+        """
+        record_mismatches = 0
+
+        for detail in result.comparison_details:
+            code = detail.get('kyuyoKomokuCode', '')
+            name = detail.get('kyuyoKomokuName', '')
+            item_values = [result.record_id, result.shain_id, code, name]
+            item_mismatches = 0
+
+            for field in self.comparison_fields:
+                before_value = self._to_text(detail.get(f'before_{field}'))
+                after_value = self._to_text(detail.get(f'after_{field}'))
+                is_match = bool(detail.get(f'{field}_is_match', False))
+                item_values.extend([before_value, after_value, int(is_match)])
+
+                if not is_match:
+                    item_mismatches += 1
+                    self._pending['field_mismatches'].append((
+                        result.record_id, result.shain_id, result.shain_name,
+                        code, name, field, before_value, after_value
+                    ))
+
+            item_values.append(item_mismatches)
+            self._pending['items'].append(tuple(item_values))
+            record_mismatches += item_mismatches
+
+        self._pending['records'].append((
+            result.record_id, result.shain_id, result.shain_name,
+            result.keisan_nengetsu, result.shori_nengetsu,
+            len(result.comparison_details), record_mismatches
+        ))
+
+        if len(self._pending['items']) >= self.BATCH_SIZE:
+            self._flush()
+
+    def close(self, commit: bool = True) -> None:
+        """
+        未投入の行を書き込み、インデックスを作成してコミットする
+
+        Args:
+            commit: Falseの場合は書き込み中の内容を破棄する
+        """
+        if self._connection is None:
+            return
+
+        try:
+            if self._connection.in_transaction:
+                if commit:
+                    self._flush()
+                    self._create_indexes()
+                    self._connection.commit()
+                else:
+                    self._connection.rollback()
+        finally:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> 'SqliteResultStore':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close(commit=exc_type is None)
+
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        全体サマリーを取得
+
+        Returns:
+            サマリー情報
+        """
+        total_records, total_items, total_mismatches = self._connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(total_items), 0), COALESCE(SUM(total_mismatches), 0) FROM records'
+        ).fetchone()
+
+        field_mismatches = {field: 0 for field in self.comparison_fields}
+        for field, count in self._connection.execute(
+            'SELECT field_name, COUNT(*) FROM field_mismatches GROUP BY field_name'
+        ):
+            field_mismatches[field] = count
+
+        return {
+            'total_records': total_records,
+            'total_items': total_items,
+            'total_mismatches': total_mismatches,
+            'field_mismatches': field_mismatches,
+            'mismatch_rate': total_mismatches / total_items * 100 if total_items > 0 else 0
+        }
+
+    def get_record_summaries(self) -> List[Dict[str, Any]]:
+        """
+        不一致があるレコードのサマリーを取得
+
+        Returns:
+            レコード別サマリー情報のリスト（出力順）
+        """
+        field_counts: Dict[str, Dict[str, int]] = {}
+        for record_id, field, count in self._connection.execute(
+            'SELECT record_id, field_name, COUNT(*) FROM field_mismatches GROUP BY record_id, field_name'
+        ):
+            field_counts.setdefault(record_id, {})[field] = count
+
+        record_summaries = []
+        for record_id, shain_id, shain_name, total_items, total_mismatches in self._connection.execute(
+            'SELECT record_id, shain_id, shain_name, total_items, total_mismatches '
+            'FROM records WHERE total_mismatches > 0 ORDER BY rowid'
+        ):
+            field_mismatches = {field: 0 for field in self.comparison_fields}
+            field_mismatches.update(field_counts.get(record_id, {}))
+            record_summaries.append({
+                'record_id': record_id,
+                'shain_id': shain_id,
+                'shain_name': shain_name,
+                'total_items': total_items,
+                'total_mismatches': total_mismatches,
+                'field_mismatches': field_mismatches,
+                'mismatch_rate': total_mismatches / total_items * 100 if total_items > 0 else 0
+            })
+
+        return record_summaries
+
+    def get_mismatch_details(self) -> List[HtmlMismatchDetailData]:
+        """
+        不一致詳細を取得
+
+        Returns:
+            不一致詳細データのリスト（出力順）
+        """
+        return list(self.iter_mismatch_details())
+
+    def iter_mismatch_details(self) -> Iterator[HtmlMismatchDetailData]:
+        """
+        不一致詳細をカーソルから1件ずつ取得
+
+        Returns:
+            不一致詳細データのイテレーター（出力順）
+        """
+        for row in self._connection.execute(
+            'SELECT record_id, shain_id, shain_name, kyuyo_komoku_code, kyuyo_komoku_name, '
+            'field_name, before_value, after_value FROM field_mismatches ORDER BY rowid'
+        ):
+            yield HtmlMismatchDetailData(
+                record_id=row[0],
+                shain_id=row[1],
+                shain_name=row[2],
+                kyuyo_komoku_code=row[3],
+                kyuyo_komoku_name=row[4],
+                field_name=row[5],
+                before_value=row[6],
+                after_value=row[7],
+                is_match=False
+            )
+
+    def find_mismatched_records(
+        self,
+        kyuyo_komoku_code: str,
+        field_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        指定した給与項目で不一致があるレコードを検索する
+
+        Args:
+            kyuyo_komoku_code: 給与項目コード
+            field_name: フィールド名（指定しない場合は全フィールド）
+
+        Returns:
+            record_id, shain_id, shain_name, mismatch_count の辞書リスト
+        """
+        query = (
+            'SELECT record_id, shain_id, shain_name, COUNT(*) FROM field_mismatches '
+            'WHERE kyuyo_komoku_code = ?'
+        )
+        parameters: List[Any] = [kyuyo_komoku_code]
+        if field_name is not None:
+            query += ' AND field_name = ?'
+            parameters.append(field_name)
+        query += ' GROUP BY record_id, shain_id, shain_name ORDER BY MIN(rowid)'
+
+        return [
+            {'record_id': row[0], 'shain_id': row[1], 'shain_name': row[2], 'mismatch_count': row[3]}
+            for row in self._connection.execute(query, parameters)
+        ]
+
+    def _create_tables(self) -> None:
+        """テーブルを作り直す"""
+        field_columns = ', '.join(
+            f'before_{field} TEXT, after_{field} TEXT, {field}_is_match INTEGER'
+            for field in self.comparison_fields
+        )
+
+        self._connection.executescript(f"""
+            DROP TABLE IF EXISTS records;
+            DROP TABLE IF EXISTS items;
+            DROP TABLE IF EXISTS field_mismatches;
+
+            CREATE TABLE records (
+                record_id TEXT PRIMARY KEY,
+                shain_id TEXT,
+                shain_name TEXT,
+                keisan_nengetsu TEXT,
+                shori_nengetsu TEXT,
+                total_items INTEGER,
+                total_mismatches INTEGER
+            );
+
+            CREATE TABLE items (
+                record_id TEXT,
+                shain_id TEXT,
+                kyuyo_komoku_code TEXT,
+                kyuyo_komoku_name TEXT,
+                {field_columns},
+                mismatch_count INTEGER
+            );
+
+            CREATE TABLE field_mismatches (
+                record_id TEXT,
+                shain_id TEXT,
+                shain_name TEXT,
+                kyuyo_komoku_code TEXT,
+                kyuyo_komoku_name TEXT,
+                field_name TEXT,
+                before_value TEXT,
+                after_value TEXT
+            );
+        """)
+
+    def _create_indexes(self) -> None:
+        """検索用のインデックスを作成する"""
+        for statement in (
+            'CREATE INDEX IF NOT EXISTS idx_records_shain_id ON records (shain_id)',
+            'CREATE INDEX IF NOT EXISTS idx_items_record_id ON items (record_id)',
+            'CREATE INDEX IF NOT EXISTS idx_items_shain_id ON items (shain_id)',
+            'CREATE INDEX IF NOT EXISTS idx_items_code ON items (kyuyo_komoku_code)',
+            'CREATE INDEX IF NOT EXISTS idx_mismatches_record_id ON field_mismatches (record_id)',
+            'CREATE INDEX IF NOT EXISTS idx_mismatches_shain_id ON field_mismatches (shain_id)',
+            'CREATE INDEX IF NOT EXISTS idx_mismatches_code_field ON field_mismatches (kyuyo_komoku_code, field_name)',
+            'CREATE INDEX IF NOT EXISTS idx_mismatches_field ON field_mismatches (field_name)',
+        ):
+            self._connection.execute(statement)
+
+    def _flush(self) -> None:
+        """溜まっている行をまとめて投入する"""
+        item_placeholders = ', '.join(['?'] * (5 + 3 * len(self.comparison_fields)))
+
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?)', self._pending['records']
+        )
+        self._connection.executemany(
+            f'INSERT INTO items VALUES ({item_placeholders})', self._pending['items']
+        )
+        self._connection.executemany(
+            'INSERT INTO field_mismatches VALUES (?, ?, ?, ?, ?, ?, ?, ?)', self._pending['field_mismatches']
+        )
+
+        for rows in self._pending.values():
+            rows.clear()
+
+    @staticmethod
+    def _to_text(value: Any) -> str:
+        """CSV出力時と同じ文字列表現に変換"""
+        if value is None:
+            return ''
+        return str(value)
@@ -1,35 +1,67 @@
 """
 配列差分比較コントローラー
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Tuple, Set, Callable
+from contextlib import nullcontext
 from pathlib import Path
+import json
 import os
+import tempfile
 import time
 from datetime import datetime
 
 from ..data.csv_reader import CsvReader
 from ..data.csv_writer import CsvWriter
-from ..data.models import KyuyoRecord
+from ..data.consolidated_csv_writer import ConsolidatedCsvWriter
+from ..data.compressed_file import CompressedFile
+from ..data.sqlite_result_store import SqliteResultStore
+from ..data.csv_sorter import CsvSorter
+from ..data.csv_partitioner import CsvPartitioner
+from ..data.csv_record_index import CsvRecordIndex
+from ..data.snapshot_cache import SnapshotCache
+from ..data.diff_manifest import DiffManifest, ManifestEntry
+from ..data.checkpoint_journal import CheckpointJournal, JournalEntry
+from ..data.record_partitioner import RecordPartitioner
+from ..data.models import KyuyoRecord, ComparisonResult
 from ..business.comparison_service import ComparisonService
+from ..business.parallel_comparison_service import ParallelComparisonService
+from ..business.pipelined_comparison_service import PipelinedComparisonService, DuplicateRecordError
 from ..business.html_report_service import HtmlReportService
+from ..business.summary_aggregator import SummaryAggregator
+from ..business.shard_summary import ShardSummary, MergedShardSummary
+from ..business.change_timeline import ChangeTimeline
+from ..business.stage_metrics import StageMetrics
+from .comparison_options import ComparisonOptions, OUTPUT_LAYOUTS, MISMATCHES_ONLY_MODES
 from .html_generator import HtmlGenerator
+from .virtual_html_generator import VirtualTableHtmlGenerator
 
 
 class ArrayDiffController:
     """配列差分比較コントローラー"""
 
-    def __init__(self):
+    def __init__(self, metrics: Optional[StageMetrics] = None):
+        """
+        Args:
+            metrics: 指定した場合は処理段階ごとの時間・メモリ・件数を計測する
+        """
+        self.metrics = metrics
         self.csv_reader = CsvReader()
         self.csv_writer = CsvWriter()
         self.comparison_service = ComparisonService()
         self.html_report_service = HtmlReportService()
         self.html_generator = HtmlGenerator()
+        self.summary_aggregator = SummaryAggregator(
+            self.comparison_service.comparison_fields
+        )
+        # load_baseline で読み込んだ変更前ファイル（パス, サイズ, 更新日時, レコード）
+        self._baseline: Optional[Tuple[str, int, int, List[KyuyoRecord]]] = None
 
     def process_comparison(
         self, 
         before_file_path: str, 
         after_file_path: str, 
-        output_dir: str = "DIFF_KYUYOKOMOKU"
+        output_dir: str = "DIFF_KYUYOKOMOKU",
+        options: Optional[ComparisonOptions] = None
     ) -> List[str]:
         """
         配列差分比較を実行する
@@ -38,61 +70,1314 @@ class ArrayDiffController:
             before_file_path: 変更前のCSVファイルパス
             after_file_path: 変更後のCSVファイルパス
             output_dir: 出力ディレクトリ
+            options: 比較処理のオプション
             
         Returns:
             出力ファイルのパスのリスト
         """
+        options = options or ComparisonOptions()
+        
         try:
             # ファイルの存在確認
             self._validate_input_files(before_file_path, after_file_path)
             
-            # CSVファイルを読み込み
-            print("CSVファイルを読み込み中...")
-            before_records = self.csv_reader.read_csv(before_file_path)
-            after_records = self.csv_reader.read_csv(after_file_path)
+            if options.workers > 1 and (options.stream or options.external_sort):
+                raise ValueError("並列比較はストリーミング比較と併用できません")
+            if options.snapshot_cache_dir is not None and (
+                options.stream or options.external_sort or options.workers > 1
+            ):
+                raise ValueError("スナップショットキャッシュはストリーミング比較・並列比較と併用できません")
+            if options.external_join and (
+                options.stream or options.external_sort or options.workers > 1 or options.pipeline
+                or options.incremental or options.snapshot_cache_dir is not None
+            ):
+                raise ValueError(
+                    "ハッシュ分割比較はストリーミング比較・並列比較・パイプライン実行・"
+                    "差分の再計算・スナップショットキャッシュと併用できません"
+                )
+            if (options.checkpoint or options.resume) and (
+                options.sqlite_path or options.incremental or options.pipeline
+            ):
+                raise ValueError(
+                    "途中経過の記録・途中からの再開はSQLiteへの保存・差分の再計算・パイプライン実行と併用できません"
+                )
+            if options.shard is not None:
+                index, count = options.shard
+                if count < 1 or not 0 <= index < count:
+                    raise ValueError(f"シャードの指定が不正です: {index}/{count}")
+                if options.top_k < 1:
+                    raise ValueError(f"上位の件数は1以上を指定してください: {options.top_k}")
+                if options.incremental or options.pipeline:
+                    raise ValueError("シャード単位の比較は差分の再計算・パイプライン実行と併用できません")
+            if options.output_layout not in OUTPUT_LAYOUTS:
+                raise ValueError(f"不明な出力形式です: {options.output_layout}")
+            if options.mismatches_only is not None and options.mismatches_only not in MISMATCHES_ONLY_MODES:
+                raise ValueError(f"不明な不一致のみ出力の単位です: {options.mismatches_only}")
+            if options.compression is not None:
+                CompressedFile.validate(options.compression, options.compression_level)
+            if options.incremental and (
+                options.stream or options.external_sort or options.workers > 1 or options.sqlite_path
+            ):
+                raise ValueError("差分の再計算はストリーミング比較・並列比較・SQLiteへの保存と併用できません")
+            if options.incremental and options.output_layout != 'per-record':
+                raise ValueError("差分の再計算は出力形式 per-record でのみ使用できます")
+            if options.pipeline and (
+                options.stream or options.external_sort or options.sqlite_path 
+                or options.incremental or options.snapshot_cache_dir is not None
+            ):
+                raise ValueError(
+                    "パイプライン実行はストリーミング比較・SQLiteへの保存・差分の再計算・"
+                    "スナップショットキャッシュと併用できません"
+                )
+            
+            # 比較ルールを反映した比較関数をここで1回だけ生成する
+            self.comparison_service = ComparisonService(options.field_rules, self.metrics)
+            
+            if options.incremental:
+                output_files = self._process_incremental(
+                    before_file_path, after_file_path, output_dir, options
+                )
+                print("配列差分比較が完了しました。")
+                return output_files
+            
+            if options.pipeline:
+                try:
+                    output_files = self._process_pipelined(
+                        before_file_path, after_file_path, output_dir, options
+                    )
+                    print("配列差分比較が完了しました。")
+                    return output_files
+                except DuplicateRecordError as e:
+                    # 出力済みのレコードが重複していた場合は逐次処理でやり直す
+                    print(f"{e}（通常の比較でやり直します）")
+            
+            # サマリーは出力と同時に集計する
+            self.summary_aggregator.reset()
+            collectors = [self.summary_aggregator]
+            
+            # 途中経過のジャーナル（指定した場合だけ記録する）
+            journal = None
+            completed_ids = None
+            if options.checkpoint or options.resume:
+                journal = self._open_checkpoint_journal(
+                    before_file_path, after_file_path, output_dir, options
+                )
+                completed_ids = set(journal.entries)
+            
+            if options.stream or options.external_sort:
+                comparison_results = self._stream_comparison_results(
+                    before_file_path, after_file_path, options, completed_ids
+                )
+                total_results = None
+            elif options.external_join:
+                comparison_results = self._join_comparison_results(
+                    before_file_path, after_file_path, options, completed_ids
+                )
+                total_results = None
+            else:
+                comparison_results = self._load_comparison_results(
+                    before_file_path, after_file_path, options, completed_ids
+                )
+                total_results = len(comparison_results)
+            
+            result_store = None
+            if options.sqlite_path:
+                result_store = SqliteResultStore(
+                    options.sqlite_path, self.comparison_service.comparison_fields
+                )
+                result_store.open()
+                collectors.append(result_store)
+            
+            try:
+                if options.output_layout == 'per-record':
+                    output_files = self._write_per_record_results(
+                        comparison_results, output_dir, total_results, options, collectors, journal
+                    )
+                else:
+                    output_files = self._write_consolidated_results(
+                        comparison_results, output_dir, total_results, options, collectors, journal
+                    )
+            except Exception:
+                if result_store is not None:
+                    result_store.close(commit=False)
+                raise
+            finally:
+                if journal is not None:
+                    journal.close()
+            
+            if journal is not None:
+                journal.remove()
+            
+            if result_store is not None:
+                result_store.close()
+                print(f"比較結果データベース: {options.sqlite_path}")
+            
+            if total_results is None:
+                print(f"比較結果数: {self.summary_aggregator.total_records}")
             
-            print(f"変更前レコード数: {len(before_records)}")
-            print(f"変更後レコード数: {len(after_records)}")
+            if options.shard is not None:
+                self._write_shard_summary(before_file_path, after_file_path, output_dir, options)
             
-            # 比較処理を実行
-            print("配列差分比較を実行中...")
-            comparison_results = self.comparison_service.compare_records(
-                before_records, after_records
+            print("配列差分比較が完了しました。")
+            return output_files
+            
+        except Exception as e:
+            print(f"エラーが発生しました: {e}")
+            raise
+
+    def process_series(
+        self, 
+        snapshot_paths: List[str], 
+        output_dir: str = "DIFF_KYUYOKOMOKU", 
+        options: Optional[ComparisonOptions] = None, 
+        on_pair_complete: Optional[Callable[[int, str, str, str, List[str]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        時系列順のスナップショットを連続する2つずつ比較し、区間ごとの差分と変更履歴を出力する
+        
+        各スナップショットの読み込みと明細JSONのパースは1回だけ行い、
+        ある区間の変更後のレコードを次の区間の変更前としてそのまま使う。
+        メモリに保持するスナップショットは比較中の2つだけ。
+        
+        出力ディレクトリには次を出力する。
+            <NN>_<変更前>__<変更後>/: 区間ごとの比較結果（出力形式は options に従う）
+            timeline.csv            : 社員・給与項目ごとの変更履歴（全区間の不一致）
+            series_summary.json     : 区間ごとのサマリー
+        
+        Args:
+            snapshot_paths: スナップショットのCSVファイルパス（時系列順、2つ以上）
+            output_dir: 出力ディレクトリ
+            options: 比較処理のオプション（出力形式・比較ルール・圧縮・スナップショットキャッシュのみ使用）
+            on_pair_complete: 区間の比較が終わるたびに (区間の番号, 変更前ファイルパス, 変更後ファイルパス, 
+                区間の出力ディレクトリ, 出力ファイルのリスト) で呼び出す関数。
+                呼び出し中は summary_aggregator がその区間の集計結果を保持している
+            
+        Returns:
+            区間ごとのサマリーのリスト
+        """
+        options = options or ComparisonOptions()
+        
+        try:
+            if len(snapshot_paths) < 2:
+                raise ValueError("系列比較にはスナップショットを2つ以上指定してください")
+            if (
+                options.stream or options.external_sort or options.external_join or options.workers > 1 
+                or options.pipeline or options.incremental or options.resume or options.sqlite_path 
+                or options.shard is not None
+            ):
+                raise ValueError(
+                    "系列比較はストリーミング比較・ハッシュ分割比較・並列比較・パイプライン実行・"
+                    "差分の再計算・途中からの再開・SQLiteへの保存・シャード単位の比較と併用できません"
+                )
+            if options.output_layout not in OUTPUT_LAYOUTS:
+                raise ValueError(f"不明な出力形式です: {options.output_layout}")
+            if options.mismatches_only is not None and options.mismatches_only not in MISMATCHES_ONLY_MODES:
+                raise ValueError(f"不明な不一致のみ出力の単位です: {options.mismatches_only}")
+            if options.compression is not None:
+                CompressedFile.validate(options.compression, options.compression_level)
+            for snapshot_path in snapshot_paths:
+                if not os.path.exists(snapshot_path):
+                    raise FileNotFoundError(f"スナップショットファイルが見つかりません: {snapshot_path}")
+            
+            self.comparison_service = ComparisonService(options.field_rules, self.metrics)
+            snapshot_cache = self._create_snapshot_cache(options)
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            
+            timeline = ChangeTimeline(
+                CompressedFile.add_extension(os.path.join(output_dir, 'timeline.csv'), options.compression), 
+                options.compression_level
             )
+            pair_summaries = []
+            try:
+                before_path = snapshot_paths[0]
+                before_records = self._read_snapshot(before_path, snapshot_cache)
+                
+                for step, after_path in enumerate(snapshot_paths[1:], 1):
+                    after_records = self._read_snapshot(after_path, snapshot_cache)
+                    
+                    pair_dir = os.path.join(output_dir, self._series_pair_dir_name(step, before_path, after_path))
+                    print(f"\n[{step}/{len(snapshot_paths) - 1}] {before_path} → {after_path}")
+                    
+                    self.summary_aggregator.reset()
+                    # 比較したレコードのパース結果はレコードに残り、次の区間の変更前として再利用される
+                    comparison_results = self.comparison_service.iter_compare_records(
+                        before_records, after_records
+                    )
+                    if options.output_layout == 'per-record':
+                        output_files = self._write_per_record_results(
+                            comparison_results, pair_dir, None, options, [self.summary_aggregator]
+                        )
+                    else:
+                        output_files = self._write_consolidated_results(
+                            comparison_results, pair_dir, None, options, [self.summary_aggregator]
+                        )
+                    
+                    before_file_name = os.path.basename(before_path)
+                    after_file_name = os.path.basename(after_path)
+                    with self._measure('summarize'):
+                        timeline.add_step(
+                            step, before_file_name, after_file_name, 
+                            self.summary_aggregator.iter_mismatch_details()
+                        )
+                    
+                    summary = self.summary_aggregator.get_summary()
+                    summary['mismatch_record_count'] = len(self.summary_aggregator.get_record_summaries())
+                    pair_summaries.append(dict(
+                        step=step, 
+                        before_file=before_file_name, 
+                        after_file=after_file_name, 
+                        output_dir=pair_dir, 
+                        **summary
+                    ))
+                    print(
+                        f"比較結果数: {summary['total_records']}  不一致数: {summary['total_mismatches']}"
+                        f"（不一致率: {summary['mismatch_rate']:.2f}%）"
+                    )
+                    
+                    if on_pair_complete is not None:
+                        on_pair_complete(step, before_path, after_path, pair_dir, output_files)
+                    
+                    # 変更前のスナップショットを解放し、変更後を次の区間の変更前にする
+                    before_path, before_records = after_path, after_records
+                
+                del before_records
+                with self._measure('write', items=timeline.change_count):
+                    timeline_path = timeline.write()
+            finally:
+                timeline.close()
             
-            print(f"比較結果数: {len(comparison_results)}")
+            summary_path = os.path.join(output_dir, 'series_summary.json')
+            with open(summary_path, 'w', encoding='utf-8') as file:
+                json.dump(
+                    {'snapshots': [os.path.basename(path) for path in snapshot_paths], 'pairs': pair_summaries}, 
+                    file, ensure_ascii=False, indent=2
+                )
             
-            # レコードごとにCSVファイルを出力
-            output_files = []
-            total_results = len(comparison_results)
-            start_time = time.time()
+            print(f"\n変更履歴: {timeline_path}（変更数: {timeline.change_count}）")
+            print(f"系列サマリー: {summary_path}")
+            print("系列比較が完了しました。")
+            return pair_summaries
             
+        except Exception as e:
+            print(f"エラーが発生しました: {e}")
+            raise
+
+    def _read_snapshot(
+        self, 
+        file_path: str, 
+        snapshot_cache: Optional[SnapshotCache]
+    ) -> List[KyuyoRecord]:
+        """系列比較のスナップショットを1つ読み込む"""
+        print(f"CSVファイルを読み込み中...: {file_path}")
+        with self._measure('read') as block:
+            records = self._read_records(file_path, snapshot_cache)
+            if block is not None:
+                block.records = len(records)
+        print(f"レコード数: {len(records)}")
+        return records
+
+    @staticmethod
+    def _series_pair_dir_name(step: int, before_file_path: str, after_file_path: str) -> str:
+        """系列比較の区間の出力ディレクトリ名（<NN>_<変更前>__<変更後>）"""
+        before_stem = CompressedFile.split_extension(os.path.basename(before_file_path))[0]
+        after_stem = CompressedFile.split_extension(os.path.basename(after_file_path))[0]
+        return f"{step:02d}_{before_stem}__{after_stem}"
+
+    def compare_indexed_records(
+        self, 
+        before_file_path: str, 
+        after_file_path: str, 
+        record_id: Optional[str] = None, 
+        shain_id: Optional[str] = None, 
+        options: Optional[ComparisonOptions] = None
+    ) -> List[ComparisonResult]:
+        """
+        入力CSVのインデックスを使い、指定したレコードの行だけを読み込んで比較する
+        
+        インデックスが存在しない・元ファイルと一致しない場合は作成し直す。
+        
+        Args:
+            before_file_path: 変更前のCSVファイルパス
+            after_file_path: 変更後のCSVファイルパス
+            record_id: 比較するレコードID（shain_id とどちらか一方を指定）
+            shain_id: 比較する社員ID（該当する全レコードを比較）
+            options: 比較処理のオプション（比較ルールのみ使用）
+            
+        Returns:
+            比較結果のリスト（両方のファイルに存在するレコードのみ）
+        """
+        options = options or ComparisonOptions()
+        if (record_id is None) == (shain_id is None):
+            raise ValueError("record_id と shain_id のどちらか一方を指定してください")
+        
+        self._validate_input_files(before_file_path, after_file_path)
+        self.comparison_service = ComparisonService(options.field_rules, self.metrics)
+        
+        records = []
+        with self._measure('read') as block:
+            for file_path in (before_file_path, after_file_path):
+                with self.open_record_index(file_path) as index:
+                    if record_id is not None:
+                        record = index.get_record(record_id)
+                        records.append([record] if record is not None else [])
+                    else:
+                        records.append(index.get_records_by_shain_id(shain_id))
+            if block is not None:
+                block.records = len(records[0]) + len(records[1])
+        
+        return self.comparison_service.compare_records(records[0], records[1])
+
+    def open_record_index(self, file_path: str, rebuild: bool = False) -> CsvRecordIndex:
+        """
+        入力CSVのインデックスを開く（存在しない・無効な場合は作成する）
+        
+        Args:
+            file_path: 入力CSVファイルのパス
+            rebuild: Trueの場合は有効なインデックスがあっても作成し直す
+            
+        Returns:
+            開いたインデックス（使用後は close すること）
+        """
+        index = CsvRecordIndex(file_path)
+        if rebuild or not index.is_valid():
+            print(f"インデックスを作成中...: {index.index_path}")
+            with self._measure('index'):
+                index.build()
+        index.load()
+        return index
+
+    def _write_per_record_results(
+        self, 
+        comparison_results: Iterable[ComparisonResult], 
+        output_dir: str, 
+        total_results: Optional[int], 
+        options: ComparisonOptions, 
+        collectors: List[Any],
+        journal: Optional[CheckpointJournal] = None
+    ) -> List[str]:
+        """
+        レコードごとにCSVファイルを出力
+        
+        項目が0件のレコードと、不一致のみ出力で出力する行がないレコードはファイルを作成しない。
+        
+        Args:
+            comparison_results: 比較結果
+            output_dir: 出力ディレクトリ
+            total_results: 比較結果の総件数（不明な場合はNone）
+            options: 比較処理のオプション
+            collectors: 比較結果を渡す集計先（add_result を持つオブジェクト）
+            journal: 途中経過のジャーナル（指定した場合は集計結果を記録する）
+            
+        Returns:
+            出力ファイルのパスのリスト（再開した場合は前回までに出力したファイルを含む）
+        """
+        # 出力ディレクトリはレコードごとではなく最初に1回だけ作成
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        
+        output_files = []
+        if journal is not None:
+            output_files = [
+                os.path.join(output_dir, entry.file_name) 
+                for entry in journal.entries.values() if entry.file_name
+            ]
+        start_time = time.time()
+        
+        try:
             for i, result in enumerate(comparison_results):
-                # CSV出力用データを生成
-                csv_data = self.comparison_service.generate_comparison_csv_data([result])
+                with self._measure('write', 1, len(result.comparison_details)):
+                    # CSVファイルに出力
+                    file_name = self._write_record_result(result, output_dir, options)
+                    if file_name:
+                        output_files.append(os.path.join(output_dir, file_name))
                 
-                # 出力ファイルパスを生成
-                output_file_path = self._generate_output_file_path_for_record(
-                    output_dir, result.record_id
-                )
+                if journal is None:
+                    self._collect_result(result, collectors)
+                else:
+                    self._collect_journaled_result(result, journal, file_name)
+                    if journal.is_checkpoint_due():
+                        journal.checkpoint()
                 
-                # CSVファイルに出力
-                self.csv_writer.write_comparison_results(csv_data, output_file_path)
-                output_files.append(output_file_path)
+                # 進捗表示
+                self._print_progress(i + 1, total_results, start_time)
+        except BaseException:
+            if journal is not None:
+                self._checkpoint_on_error(journal)
+            raise
+        
+        return output_files
+
+    def _write_consolidated_results(
+        self, 
+        comparison_results: Iterable[ComparisonResult], 
+        output_dir: str, 
+        total_results: Optional[int], 
+        options: ComparisonOptions, 
+        collectors: List[Any],
+        journal: Optional[CheckpointJournal] = None
+    ) -> List[str]:
+        """
+        比較結果を1つ（またはハッシュ分割したN個）のCSVファイルにまとめて出力
+        
+        ジャーナルに前回までに完了したレコードがある場合は、出力ファイルを
+        最後のチェックポイントの位置に切り詰めて追記する。
+        
+        Args:
+            comparison_results: 比較結果
+            output_dir: 出力ディレクトリ
+            total_results: 比較結果の総件数（不明な場合はNone）
+            options: 比較処理のオプション
+            collectors: 比較結果を渡す集計先（add_result を持つオブジェクト）
+            journal: 途中経過のジャーナル（指定した場合は集計結果と書き込み位置を記録する）
+            
+        Returns:
+            出力ファイルのパスのリスト
+        """
+        partitions = options.partitions if options.output_layout == 'partitioned' else 1
+        writer = ConsolidatedCsvWriter(
+            output_dir, self.comparison_service.get_csv_fieldnames(), partitions, 
+            compression=options.compression, compression_level=options.compression_level
+        )
+        start_time = time.time()
+        
+        if journal is not None and journal.entries:
+            writer.open(journal.output_sizes, [
+                (entry.record_id, entry.file_name, entry.offset, entry.length)
+                for entry in journal.entries.values() if entry.length
+            ])
+        else:
+            writer.open()
+        
+        try:
+            for i, result in enumerate(comparison_results):
+                with self._measure('write', 1, len(result.comparison_details)):
+                    csv_data = self.comparison_service.generate_comparison_csv_data(
+                        [result], options.mismatches_only
+                    )
+                    location = writer.write_record(result.record_id, csv_data)
+                
+                if journal is None:
+                    self._collect_result(result, collectors)
+                else:
+                    self._collect_journaled_result(result, journal, '', location)
+                    if journal.is_checkpoint_due():
+                        writer.sync()
+                        journal.checkpoint()
                 
                 # 進捗表示
-                current_time = time.time()
-                elapsed_time = current_time - start_time
-                progress_percentage = ((i + 1) / total_results) * 100
+                self._print_progress(i + 1, total_results, start_time)
+        except BaseException:
+            if journal is not None:
+                self._checkpoint_on_error(journal, writer)
+            raise
+        finally:
+            writer.close()
+        
+        print(f"レコードインデックス: {writer.index_path}")
+        return writer.output_files
+
+    def _load_comparison_results(
+        self, 
+        before_file_path: str, 
+        after_file_path: str, 
+        options: ComparisonOptions, 
+        completed_ids: Optional[Set[str]] = None
+    ) -> List[ComparisonResult]:
+        """
+        両ファイルを全件読み込んで比較する
+        
+        Args:
+            before_file_path: 変更前のCSVファイルパス
+            after_file_path: 変更後のCSVファイルパス
+            options: 比較処理のオプション
+            completed_ids: 比較しないレコードID（途中から再開する場合の完了済みのレコード）
+            
+        Returns:
+            比較結果のリスト
+        """
+        if options.workers > 1:
+            return self._load_comparison_results_parallel(
+                before_file_path, after_file_path, options, completed_ids
+            )
+        
+        snapshot_cache = self._create_snapshot_cache(options)
+        
+        # CSVファイルを読み込み
+        print("CSVファイルを読み込み中...")
+        with self._measure('read') as block:
+            before_records = self._read_records(before_file_path, snapshot_cache, options.shard)
+            after_records = self._read_records(after_file_path, snapshot_cache, options.shard)
+            if block is not None:
+                block.records = len(before_records) + len(after_records)
+        
+        shard_label = self._shard_label(options.shard)
+        print(f"変更前レコード数{shard_label}: {len(before_records)}")
+        print(f"変更後レコード数{shard_label}: {len(after_records)}")
+        
+        if completed_ids:
+            before_records = list(self._skip_completed(before_records, completed_ids))
+        
+        # 比較処理を実行
+        print("配列差分比較を実行中...")
+        comparison_results = self.comparison_service.compare_records(
+            before_records, after_records
+        )
+        
+        print(f"比較結果数: {len(comparison_results)}")
+        return comparison_results
+
+    def _process_incremental(
+        self, 
+        before_file_path: str, 
+        after_file_path: str, 
+        output_dir: str, 
+        options: ComparisonOptions
+    ) -> List[str]:
+        """
+        前回の出力のマニフェストと入力のフィンガープリントを比べ、変わったレコードだけを比較・出力する
+        
+        変更前・変更後のフィンガープリントがどちらも前回と同じレコードは比較せず、
+        マニフェストに保存した集計結果と不一致詳細をサマリーに加える。
+        両方のファイルに存在しなくなったレコードの出力ファイルは削除する。
+        
+        Args:
+            before_file_path: 変更前のCSVファイルパス
+            after_file_path: 変更後のCSVファイルパス
+            output_dir: 出力ディレクトリ（前回と同じディレクトリ）
+            options: 比較処理のオプション
+            
+        Returns:
+            出力ファイルのパスのリスト（前回出力し今回も有効なファイルを含む）
+        """
+        comparison_fields = self.comparison_service.comparison_fields
+        config_key = DiffManifest.config_key(
+            fields=comparison_fields, 
+            field_rules=options.field_rules, 
+            mismatches_only=options.mismatches_only, 
+            compression=options.compression, 
+            compression_level=options.compression_level
+        )
+        previous = DiffManifest.load(output_dir, config_key, comparison_fields)
+        
+        snapshot_cache = self._create_snapshot_cache(options)
+        print("CSVファイルを読み込み中...")
+        with self._measure('read') as block:
+            before_records = self._read_records(before_file_path, snapshot_cache)
+            after_records = self._read_records(after_file_path, snapshot_cache)
+            if block is not None:
+                block.records = len(before_records) + len(after_records)
+        
+        # 比較処理と同じく、同じ record_id のレコードは最後のレコードを使う
+        before_map = {record.record_id: record for record in before_records}
+        after_map = {record.record_id: record for record in after_records}
+        common_ids = [record_id for record_id in before_map if record_id in after_map]
+        del before_records, after_records
+        
+        print(f"前回のマニフェストのレコード数: {len(previous.entries)}")
+        print("変更されたレコードを比較中...")
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        self.summary_aggregator.reset()
+        
+        manifest = DiffManifest(output_dir, config_key, comparison_fields)
+        output_files = []
+        reused = 0
+        start_time = time.time()
+        
+        for i, record_id in enumerate(common_ids):
+            before_record = before_map[record_id]
+            after_record = after_map[record_id]
+            before_fingerprint = DiffManifest.fingerprint(before_record)
+            after_fingerprint = DiffManifest.fingerprint(after_record)
+            
+            entry = previous.entries.get(record_id)
+            if (
+                entry is not None 
+                and entry.before_fingerprint == before_fingerprint 
+                and entry.after_fingerprint == after_fingerprint
+                and (not entry.file_name or os.path.exists(os.path.join(output_dir, entry.file_name)))
+            ):
+                # 入力が変わっていないレコードは前回の集計結果を使う
+                with self._measure('summarize', 1, entry.total_items):
+                    mismatch_details = previous.read_details(entry)
+                    self.summary_aggregator.add_record_summary(
+                        entry.record_id, 
+                        entry.shain_id, 
+                        entry.shain_name, 
+                        entry.total_items, 
+                        dict(zip(comparison_fields, entry.field_mismatches)), 
+                        mismatch_details
+                    )
+                reused += 1
+            else:
+                result = self.comparison_service.compare_records([before_record], [after_record])[0]
+                with self._measure('write', 1, len(result.comparison_details)):
+                    file_name = self._write_record_result(result, output_dir, options)
+                    if not file_name:
+                        # 前回は出力していた（比較条件が変わった場合を含む）ファイルを削除
+                        self._remove_output_file(output_dir, os.path.basename(CompressedFile.add_extension(
+                            self._generate_output_file_path_for_record(output_dir, record_id), 
+                            options.compression
+                        )))
+                with self._measure('summarize', 1, len(result.comparison_details)):
+                    field_mismatches, mismatch_details = self.summary_aggregator.summarize_result(result)
+                    self.summary_aggregator.add_record_summary(
+                        result.record_id, 
+                        result.shain_id, 
+                        result.shain_name, 
+                        len(result.comparison_details), 
+                        field_mismatches, 
+                        mismatch_details
+                    )
+                entry = ManifestEntry(
+                    record_id=record_id,
+                    before_fingerprint=before_fingerprint,
+                    after_fingerprint=after_fingerprint,
+                    shain_id=result.shain_id,
+                    shain_name=result.shain_name,
+                    total_items=len(result.comparison_details),
+                    field_mismatches=[field_mismatches[field] for field in comparison_fields],
+                    file_name=file_name,
+                    details_offset=0,
+                    details_length=0
+                )
+            
+            manifest.add(entry, mismatch_details)
+            if entry.file_name:
+                output_files.append(os.path.join(output_dir, entry.file_name))
+            
+            self._print_progress(i + 1, len(common_ids), start_time)
+        
+        # 両方のファイルに存在しなくなったレコードの出力を削除
+        removed = 0
+        for record_id, entry in previous.entries.items():
+            if record_id not in after_map or record_id not in before_map:
+                if entry.file_name:
+                    self._remove_output_file(output_dir, entry.file_name)
+                removed += 1
+        
+        previous.close()
+        manifest.save()
+        
+        print(f"比較結果数: {len(common_ids)}")
+        print(f"再計算したレコード数: {len(common_ids) - reused}（変更なし: {reused}、削除: {removed}）")
+        return output_files
+
+    def _process_pipelined(
+        self, 
+        before_file_path: str, 
+        after_file_path: str, 
+        output_dir: str, 
+        options: ComparisonOptions
+    ) -> List[str]:
+        """
+        読み込み・パース・比較・書き込みを重ねて実行する
+        
+        パース・比較・CSV形式への変換はワーカープロセスで行い、
+        このプロセスではファイルへの書き込みとサマリーの集計だけを行う。
+        
+        Args:
+            before_file_path: 変更前のCSVファイルパス
+            after_file_path: 変更後のCSVファイルパス
+            output_dir: 出力ディレクトリ
+            options: 比較処理のオプション
+            
+        Returns:
+            出力ファイルのパスのリスト
+        """
+        service = PipelinedComparisonService(
+            max(1, options.workers), options.field_rules, options.mismatches_only
+        )
+        comparison_fields = self.comparison_service.comparison_fields
+        fieldnames = self.comparison_service.get_csv_fieldnames()
+        
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        self.summary_aggregator.reset()
+        output_files = []
+        start_time = time.time()
+        
+        consolidated_writer = None
+        if options.output_layout != 'per-record':
+            partitions = options.partitions if options.output_layout == 'partitioned' else 1
+            consolidated_writer = ConsolidatedCsvWriter(
+                output_dir, fieldnames, partitions, 
+                compression=options.compression, compression_level=options.compression_level
+            )
+        header = ','.join(fieldnames) + '\r\n'
+        
+        def write_record(output: tuple) -> None:
+            record_id, shain_id, shain_name, total_items, field_mismatches, mismatch_details, text = output
+            if consolidated_writer is not None:
+                consolidated_writer.write_record_text(record_id, text)
+            elif text:
+                # 項目が0件のレコード・出力する行がないレコードは逐次処理と同じくファイルを作成しない
+                output_file_path = CompressedFile.add_extension(
+                    self._generate_output_file_path_for_record(output_dir, record_id), 
+                    options.compression
+                )
+                self.csv_writer.write_csv_text(header + text, output_file_path, options.compression_level)
+                output_files.append(output_file_path)
+            
+            self.summary_aggregator.add_record_summary(
+                record_id, shain_id, shain_name, total_items, 
+                dict(zip(comparison_fields, field_mismatches)), mismatch_details
+            )
+            self._print_progress(self.summary_aggregator.total_records, None, start_time)
+        
+        print(f"パイプライン実行中...（ワーカー数: {service.workers}）")
+        # 各段階は並行に進むため、全体を1つの段階として計測する
+        with self._measure('pipeline') as block:
+            if consolidated_writer is not None:
+                with consolidated_writer:
+                    compared = service.run(before_file_path, after_file_path, write_record)
+                output_files = consolidated_writer.output_files
+                print(f"レコードインデックス: {consolidated_writer.index_path}")
+            else:
+                compared = service.run(before_file_path, after_file_path, write_record)
+            if block is not None:
+                block.records = compared
+                block.items = self.summary_aggregator.total_items
+        
+        print(f"比較結果数: {compared}")
+        return output_files
+
+    def _write_record_result(
+        self, 
+        result: ComparisonResult, 
+        output_dir: str, 
+        options: ComparisonOptions
+    ) -> str:
+        """
+        1レコード分の比較結果をレコードごとのCSVファイルに出力
+        
+        Args:
+            result: 比較結果
+            output_dir: 出力ディレクトリ
+            options: 比較処理のオプション
+            
+        Returns:
+            出力したファイル名（項目が0件のレコードや、不一致のみ出力で出力する行がない場合は
+            ファイルを作成しないため空）
+        """
+        csv_data = self.comparison_service.generate_comparison_csv_data(
+            [result], options.mismatches_only
+        )
+        if not csv_data:
+            return ''
+        
+        output_file_path = CompressedFile.add_extension(
+            self._generate_output_file_path_for_record(output_dir, result.record_id), 
+            options.compression
+        )
+        self.csv_writer.write_comparison_results(
+            csv_data, output_file_path, options.compression_level
+        )
+        return os.path.basename(output_file_path)
+
+    @staticmethod
+    def _remove_output_file(output_dir: str, file_name: str) -> None:
+        """前回出力したファイルを削除（存在しない場合は何もしない）"""
+        try:
+            os.remove(os.path.join(output_dir, file_name))
+        except FileNotFoundError:
+            pass
+
+    def load_baseline(self, file_path: str) -> List[KyuyoRecord]:
+        """
+        変更前ファイルを明細JSONまでパースしてメモリに保持する
+        
+        以降の比較処理（全件読み込み・差分の再計算）で同じファイルを指定した場合は
+        読み込みとパースを省略し、保持したレコードを使う。
+        ファイルのサイズ・更新日時が変わった場合は次の比較処理で読み込み直す。
+        
+        Args:
+            file_path: 変更前のCSVファイルパス
+            
+        Returns:
+            レコードのリスト
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"変更前ファイルが見つかりません: {file_path}")
+        
+        stat = os.stat(file_path)
+        with self._measure('read') as block:
+            records = self.csv_reader.read_csv(file_path)
+            if block is not None:
+                block.records = len(records)
+        with self._measure('parse', len(records)) as block:
+            for record in records:
+                record.get_meisai_list()
+            if block is not None:
+                block.items = sum(len(record.get_meisai_list()) for record in records)
+        
+        self._baseline = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, records)
+        return records
+
+    def _get_baseline_records(self, file_path: str) -> Optional[List[KyuyoRecord]]:
+        """
+        file_path が load_baseline で読み込んだファイルの場合は保持しているレコードを取得
+        
+        Args:
+            file_path: CSVファイルのパス
+            
+        Returns:
+            レコードのリスト（別のファイルの場合はNone）
+        """
+        if self._baseline is None or os.path.abspath(file_path) != self._baseline[0]:
+            return None
+        
+        stat = os.stat(file_path)
+        if (stat.st_size, stat.st_mtime_ns) != self._baseline[1:3]:
+            print(f"変更前ファイルが更新されたため読み込み直します: {file_path}")
+            return self.load_baseline(file_path)
+        return self._baseline[3]
+
+    def _create_snapshot_cache(self, options: ComparisonOptions) -> Optional[SnapshotCache]:
+        """オプションで指定された場合はスナップショットキャッシュを作成"""
+        if options.snapshot_cache_dir is None:
+            return None
+        return SnapshotCache(
+            options.snapshot_cache_dir, options.snapshot_cache_max_mb * 1024 * 1024
+        )
+
+    def _read_records(
+        self, 
+        file_path: str, 
+        snapshot_cache: Optional[SnapshotCache], 
+        shard: Optional[Tuple[int, int]] = None
+    ) -> List[KyuyoRecord]:
+        """
+        CSVファイルを全件読み込む（load_baseline で読み込んだファイルや
+        キャッシュを指定した場合はパース済みのレコードを再利用する）
+        
+        Args:
+            file_path: CSVファイルのパス
+            snapshot_cache: パース済みスナップショットのキャッシュ（Noneの場合は使用しない）
+            shard: 指定した場合はこのシャード（シャード番号, シャード数）のレコードだけを返す
+            
+        Returns:
+            レコードのリスト
+        """
+        records = self._get_baseline_records(file_path)
+        if records is not None:
+            return list(self._select_shard(records, shard)) if shard is not None else records
+        
+        if snapshot_cache is None:
+            if shard is not None:
+                # 他のシャードのレコードはメモリに保持しない
+                return list(self._select_shard(self.csv_reader.iter_csv(file_path), shard))
+            return self.csv_reader.read_csv(file_path)
+        
+        records = snapshot_cache.load(file_path)
+        if records is not None:
+            print(f"パース済みのキャッシュから読み込みました: {file_path}")
+        else:
+            # キャッシュには全シャードで共有できるよう全件を保存する
+            records = self.csv_reader.read_csv(file_path)
+            snapshot_cache.store(file_path, records)
+        return list(self._select_shard(records, shard)) if shard is not None else records
+
+    def _load_comparison_results_parallel(
+        self, 
+        before_file_path: str, 
+        after_file_path: str, 
+        options: ComparisonOptions, 
+        completed_ids: Optional[Set[str]] = None
+    ) -> List[ComparisonResult]:
+        """
+        両ファイルを生の行として読み込み、複数プロセスで並列に比較する
+        
+        Args:
+            before_file_path: 変更前のCSVファイルパス
+            after_file_path: 変更後のCSVファイルパス
+            options: 比較処理のオプション
+            completed_ids: 比較しないレコードID（途中から再開する場合の完了済みのレコード）
+            
+        Returns:
+            比較結果のリスト
+        """
+        print("CSVファイルを読み込み中...")
+        with self._measure('read') as block:
+            before_rows = self.csv_reader.read_raw_rows(before_file_path)
+            after_rows = self.csv_reader.read_raw_rows(after_file_path)
+            if block is not None:
+                block.records = len(before_rows) + len(after_rows)
+        
+        if options.shard is not None:
+            # 生の行の先頭は__id__
+            index, count = options.shard
+            before_rows = [row for row in before_rows if RecordPartitioner.partition_of(row[0], count) == index]
+            after_rows = [row for row in after_rows if RecordPartitioner.partition_of(row[0], count) == index]
+        
+        shard_label = self._shard_label(options.shard)
+        print(f"変更前レコード数{shard_label}: {len(before_rows)}")
+        print(f"変更後レコード数{shard_label}: {len(after_rows)}")
+        
+        if completed_ids:
+            # 生の行の先頭は__id__
+            before_rows = [row for row in before_rows if row[0] not in completed_ids]
+        
+        print(f"配列差分比較を実行中...（ワーカー数: {options.workers}）")
+        parallel_service = ParallelComparisonService(
+            options.workers, field_rules=options.field_rules
+        )
+        # パースと比較はワーカープロセスで行うため、まとめて compare として計測する
+        with self._measure('compare') as block:
+            comparison_results = parallel_service.compare_rows(before_rows, after_rows)
+            if block is not None:
+                block.records = len(comparison_results)
+                block.items = sum(len(result.comparison_details) for result in comparison_results)
+        
+        print(f"比較結果数: {len(comparison_results)}")
+        return comparison_results
+
+    def _stream_comparison_results(
+        self, 
+        before_file_path: str, 
+        after_file_path: str, 
+        options: ComparisonOptions, 
+        completed_ids: Optional[Set[str]] = None
+    ) -> Iterator[ComparisonResult]:
+        """
+        両ファイルを1件ずつ読み進めてソートマージ結合で比較する
+        
+        Args:
+            before_file_path: 変更前のCSVファイルパス（__id__順）
+            after_file_path: 変更後のCSVファイルパス（__id__順）
+            options: 比較処理のオプション
+            completed_ids: 比較しないレコードID（途中から再開する場合の完了済みのレコード）
+            
+        Returns:
+            比較結果のイテレーター
+        """
+        if not options.external_sort:
+            print("ストリーミング比較を実行中...")
+            yield from self.comparison_service.compare_sorted_records(
+                self._skip_completed(self._select_shard(
+                    self._iterate('read', self.csv_reader.iter_csv(before_file_path)), options.shard
+                ), completed_ids),
+                self._select_shard(
+                    self._iterate('read', self.csv_reader.iter_csv(after_file_path)), options.shard
+                )
+            )
+            return
+        
+        with tempfile.TemporaryDirectory(prefix='array_diff_sort_') as sort_dir:
+            print("入力ファイルを__id__順に外部ソート中...")
+            sorted_before_path = os.path.join(sort_dir, 'before.csv')
+            sorted_after_path = os.path.join(sort_dir, 'after.csv')
+            with self._measure('sort'):
+                CsvSorter.sort_csv(
+                    before_file_path, sorted_before_path, 
+                    chunk_size=options.sort_chunk_size, temp_dir=sort_dir
+                )
+                CsvSorter.sort_csv(
+                    after_file_path, sorted_after_path, 
+                    chunk_size=options.sort_chunk_size, temp_dir=sort_dir
+                )
+            
+            print("ストリーミング比較を実行中...")
+            yield from self.comparison_service.compare_sorted_records(
+                self._skip_completed(self._select_shard(
+                    self._iterate('read', self.csv_reader.iter_csv(sorted_before_path)), options.shard
+                ), completed_ids),
+                self._select_shard(
+                    self._iterate('read', self.csv_reader.iter_csv(sorted_after_path)), options.shard
+                )
+            )
+
+    def _join_comparison_results(
+        self, 
+        before_file_path: str, 
+        after_file_path: str, 
+        options: ComparisonOptions, 
+        completed_ids: Optional[Set[str]] = None
+    ) -> Iterator[ComparisonResult]:
+        """
+        両ファイルを__id__のハッシュで一時ファイルに分割し、パーティションの組ごとに比較する
+        
+        メモリに載せるのは1つのパーティションの組だけで、比較を終えた組の一時ファイルは削除する。
+        比較結果はパーティションの順に、パーティション内では変更前ファイルの順に返す。
+        
+        Args:
+            before_file_path: 変更前のCSVファイルパス
+            after_file_path: 変更後のCSVファイルパス
+            options: 比較処理のオプション
+            completed_ids: 比較しないレコードID（途中から再開する場合の完了済みのレコード）
+            
+        Returns:
+            比較結果のイテレーター
+        """
+        partitioner = CsvPartitioner(options.memory_budget_mb * 1024 * 1024)
+        partition_pairs = partitioner.iter_partition_pairs(before_file_path, after_file_path)
+        
+        print(f"入力ファイルを__id__のハッシュで分割して比較中...（メモリ上限: {options.memory_budget_mb}MB）")
+        try:
+            while True:
+                with self._measure('partition'):
+                    pair = next(partition_pairs, None)
+                if pair is None:
+                    break
                 
-                print(f"出力進捗: {i + 1}/{total_results} ({progress_percentage:.1f}%) - 経過時間: {elapsed_time:.1f}秒")
+                before_part_path, after_part_path = pair
+                yield from self.comparison_service.iter_compare_records(
+                    self._skip_completed(self._select_shard(
+                        self._iterate('read', self.csv_reader.iter_csv(before_part_path)), options.shard
+                    ), completed_ids),
+                    self._select_shard(
+                        self._iterate('read', self.csv_reader.iter_csv(after_part_path)), options.shard
+                    )
+                )
+        finally:
+            # 途中で中断した場合も一時ファイルを削除する
+            partition_pairs.close()
+        
+        if partitioner.partition_count:
+            print(f"パーティション数: {partitioner.partition_count}")
+        if partitioner.oversized_count:
+            print(
+                f"警告: {partitioner.oversized_count}個のパーティションは"
+                f"同じ__id__の行が多いためメモリ上限を超えています"
+            )
+
+    def _collect_result(self, result: ComparisonResult, collectors: List[Any]) -> None:
+        """比較結果を集計先に渡す"""
+        with self._measure('summarize', 1, len(result.comparison_details)):
+            for collector in collectors:
+                collector.add_result(result)
+
+    def _open_checkpoint_journal(
+        self, 
+        before_file_path: str, 
+        after_file_path: str, 
+        output_dir: str, 
+        options: ComparisonOptions
+    ) -> CheckpointJournal:
+        """
+        途中経過のジャーナルを開く
+        
+        --resume の場合は前回のジャーナルを読み込み、完了済みのレコードの集計結果をサマリーに加える。
+        比較条件・入力ファイルが前回と異なる場合は最初から比較する。
+        
+        Args:
+            before_file_path: 変更前のCSVファイルパス
+            after_file_path: 変更後のCSVファイルパス
+            output_dir: 出力ディレクトリ
+            options: 比較処理のオプション
             
-            print("配列差分比較が完了しました。")
-            return output_files
+        Returns:
+            書き込み用に開いたジャーナル
+        """
+        comparison_fields = self.comparison_service.comparison_fields
+        config_key = DiffManifest.config_key(
+            fields=comparison_fields, 
+            field_rules=options.field_rules, 
+            mismatches_only=options.mismatches_only, 
+            compression=options.compression, 
+            compression_level=options.compression_level, 
+            output_layout=options.output_layout, 
+            partitions=options.partitions if options.output_layout == 'partitioned' else 1, 
+            shard=options.shard, 
+            inputs=CheckpointJournal.input_signature(before_file_path, after_file_path)
+        )
+        journal = CheckpointJournal(output_dir, config_key, comparison_fields)
+        
+        if options.resume:
+            journal.load()
+            if journal.entries:
+                print(f"前回の途中経過から再開します（完了済みのレコード数: {len(journal.entries)}）")
+                with self._measure('summarize'):
+                    for entry, mismatch_details in journal.iter_entry_details():
+                        self.summary_aggregator.add_record_summary(
+                            entry.record_id, 
+                            entry.shain_id, 
+                            entry.shain_name, 
+                            entry.total_items, 
+                            dict(zip(comparison_fields, entry.field_mismatches)), 
+                            mismatch_details
+                        )
+            else:
+                print("再開できる途中経過がないため、最初から比較します")
+        
+        journal.open()
+        return journal
+
+    def _collect_journaled_result(
+        self, 
+        result: ComparisonResult, 
+        journal: CheckpointJournal, 
+        file_name: str, 
+        location: Optional[tuple] = None
+    ) -> None:
+        """
+        比較結果をサマリーに集計し、集計結果をジャーナルに記録する
+        
+        Args:
+            result: 比較結果
+            journal: 途中経過のジャーナル
+            file_name: レコードごとのCSVのファイル名（出力しなかった場合・集約CSVの場合は空）
+            location: 集約CSVのインデックスのエントリー（record_id, ファイル名, オフセット, バイト長）
+        """
+        with self._measure('summarize', 1, len(result.comparison_details)):
+            field_mismatches, mismatch_details = self.summary_aggregator.summarize_result(result)
+            self.summary_aggregator.add_record_summary(
+                result.record_id, 
+                result.shain_id, 
+                result.shain_name, 
+                len(result.comparison_details), 
+                field_mismatches, 
+                mismatch_details
+            )
+            if location is not None:
+                _, file_name, offset, length = location
+            else:
+                offset, length = 0, 0
+            journal.add(JournalEntry(
+                record_id=result.record_id,
+                shain_id=result.shain_id,
+                shain_name=result.shain_name,
+                total_items=len(result.comparison_details),
+                field_mismatches=[field_mismatches[field] for field in self.comparison_service.comparison_fields],
+                file_name=file_name,
+                offset=offset,
+                length=length,
+                details_offset=0,
+                details_length=0
+            ), mismatch_details)
+
+    @staticmethod
+    def _checkpoint_on_error(
+        journal: CheckpointJournal, 
+        writer: Optional[ConsolidatedCsvWriter] = None
+    ) -> None:
+        """エラーで終了する前に、完了済みのレコードまでのチェックポイントを書き込む"""
+        try:
+            if writer is not None:
+                writer.sync()
+            journal.checkpoint()
+        except Exception:
+            # ディスクの空き不足などで書き込めない場合は前回のチェックポイントから再開する
+            pass
+
+    @staticmethod
+    def _skip_completed(
+        records: Iterable[KyuyoRecord], 
+        completed_ids: Optional[Set[str]]
+    ) -> Iterable[KyuyoRecord]:
+        """再開時に前回までに完了したレコードを除く"""
+        if not completed_ids:
+            return records
+        return (record for record in records if record.record_id not in completed_ids)
+
+    @staticmethod
+    def _select_shard(
+        records: Iterable[KyuyoRecord], 
+        shard: Optional[Tuple[int, int]]
+    ) -> Iterable[KyuyoRecord]:
+        """シャードを指定した場合は、__id__のハッシュがそのシャードのレコードだけを返す"""
+        if shard is None:
+            return records
+        index, count = shard
+        return (
+            record for record in records 
+            if RecordPartitioner.partition_of(record.record_id, count) == index
+        )
+
+    @staticmethod
+    def _shard_label(shard: Optional[Tuple[int, int]]) -> str:
+        """件数の表示に付けるシャードの表記"""
+        return f"（シャード {shard[0]}/{shard[1]}）" if shard is not None else ""
+
+    def _write_shard_summary(
+        self, 
+        before_file_path: str, 
+        after_file_path: str, 
+        output_dir: str, 
+        options: ComparisonOptions
+    ) -> None:
+        """
+        比較したシャードの集計結果を、merge で統合するための部分サマリーとして出力ディレクトリに保存する
+        
+        Args:
+            before_file_path: 変更前のCSVファイルパス
+            after_file_path: 変更後のCSVファイルパス
+            output_dir: 出力ディレクトリ
+            options: 比較処理のオプション（shard を指定していること）
+        """
+        # 出力ファイルの形式は統合結果に影響しないため、集計に影響する条件だけを比べる
+        config_key = DiffManifest.config_key(
+            fields=self.comparison_service.comparison_fields, 
+            field_rules=options.field_rules
+        )
+        with self._measure('summarize'):
+            shard_summary = ShardSummary.write(
+                self.summary_aggregator, 
+                output_dir, 
+                options.shard, 
+                config_key, 
+                before_file_path, 
+                after_file_path, 
+                options.top_k
+            )
+        print(f"部分サマリー: {os.path.join(shard_summary.output_dir, ShardSummary.FILE_NAME)}")
+
+    def merge_shard_summaries(self, shard_dirs: List[str]) -> MergedShardSummary:
+        """
+        compare --shard で出力した全シャードの部分サマリーを読み込んで統合する
+        
+        Args:
+            shard_dirs: 各シャードの出力ディレクトリ（順不同）
             
-        except Exception as e:
-            print(f"エラーが発生しました: {e}")
-            raise
+        Returns:
+            統合したサマリー
+        """
+        with self._measure('merge') as block:
+            merged = MergedShardSummary([ShardSummary.load(shard_dir) for shard_dir in shard_dirs])
+            if block is not None:
+                block.records = merged.get_summary()['total_records']
+        return merged
+
+    def _measure(self, stage: str, records: int = 0, items: int = 0):
+        """
+        計測が有効な場合は区間を計測するコンテキストマネージャーを返す
+        
+        Args:
+            stage: 段階名
+            records: 処理するレコード数
+            items: 処理する給与項目数
+            
+        Returns:
+            コンテキストマネージャー（計測しない場合は with で None を返す）
+        """
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.measure(stage, records, items)
+
+    def _iterate(self, stage: str, iterable: Iterable[Any]) -> Iterable[Any]:
+        """計測が有効な場合はイテレーターの next() にかかった時間を計測する"""
+        if self.metrics is None:
+            return iterable
+        return self.metrics.iterate(stage, iterable)
+
+    def _print_progress(
+        self, 
+        processed: int, 
+        total: Optional[int], 
+        start_time: float
+    ) -> None:
+        """
+        出力進捗を表示
+        
+        Args:
+            processed: 処理済み件数
+            total: 総件数（不明な場合はNone）
+            start_time: 処理開始時刻
+        """
+        elapsed_time = time.time() - start_time
+        
+        if total:
+            progress_percentage = (processed / total) * 100
+            print(f"出力進捗: {processed}/{total} ({progress_percentage:.1f}%) - 経過時間: {elapsed_time:.1f}秒")
+        else:
+            print(f"出力進捗: {processed}件 - 経過時間: {elapsed_time:.1f}秒")
 
     def _validate_input_files(self, before_file_path: str, after_file_path: str) -> None:
         """
@@ -123,9 +1408,6 @@ class ArrayDiffController:
         Returns:
             出力ファイルパス
         """
-        # 出力ディレクトリを作成
-        Path(output_dir).mkdir(parents=True, exist_ok=True)
-        
         # ファイル名を生成（record_idを使用）
         filename = f"{record_id}.csv"
         
@@ -141,137 +1423,109 @@ class ArrayDiffController:
         Returns:
             レコード別サマリー情報
         """
+        aggregator = SummaryAggregator(self.comparison_service.comparison_fields)
         try:
-            csv_data = self.csv_reader.read_csv_as_dict(output_file_path)
-            
-            if not csv_data:
-                return {}
-            
-            record_id = csv_data[0]['record_id']
-            shain_id = csv_data[0]['shainId']
-            shain_name = csv_data[0]['shainName']
-            
-            total_items = len(csv_data)
-            total_mismatches = 0
-            
-            # 各フィールドの不一致数をカウント
-            field_mismatches = {}
-            comparison_fields = [
-                'finalValue', 'kyuyoKomokuCode', 'kyuyoKomokuKubun',
-                'kyuyoKomokuName', 'order', 'processValue'
-            ]
-            
-            for field in comparison_fields:
-                field_mismatches[field] = 0
-            
-            for record in csv_data:
-                for field in comparison_fields:
-                    is_match_key = f"{field}_is_match"
-                    if is_match_key in record:
-                        # CSVから読み込まれた値は文字列なので、適切に変換
-                        is_match_value = record[is_match_key]
-                        if isinstance(is_match_value, str):
-                            is_match = is_match_value.lower() == 'true'
-                        else:
-                            is_match = bool(is_match_value)
-                        
-                        if not is_match:
-                            field_mismatches[field] += 1
-                            total_mismatches += 1
-            
-            return {
-                'record_id': record_id,
-                'shain_id': shain_id,
-                'shain_name': shain_name,
-                'total_items': total_items,
-                'total_mismatches': total_mismatches,
-                'field_mismatches': field_mismatches,
-                'mismatch_rate': total_mismatches / total_items * 100 if total_items > 0 else 0
-            }
-            
+            return aggregator.add_output_file(output_file_path)
         except Exception as e:
             print(f"レコードサマリー取得中にエラーが発生しました: {e}")
             return {}
+        finally:
+            aggregator.close()
+
+    def get_mismatch_record_summaries(self, sqlite_path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        直前の比較処理で集計した不一致レコードのサマリーを取得
+        
+        Args:
+            sqlite_path: 比較結果を保存したSQLiteファイル（指定した場合はここから読み込む）
+            
+        Returns:
+            不一致があるレコードのサマリー情報のリスト
+        """
+        if sqlite_path is not None:
+            result_store = self._open_result_store(sqlite_path)
+            try:
+                return result_store.get_record_summaries()
+            finally:
+                result_store.close()
+        return self.summary_aggregator.get_record_summaries()
 
-    def get_comparison_summary(self, output_files: List[str]) -> Dict[str, Any]:
+    def get_comparison_summary(
+        self, 
+        output_files: Optional[List[str]] = None, 
+        sqlite_path: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         比較結果のサマリーを取得
         
         Args:
-            output_files: 出力ファイルパスのリスト
+            output_files: 出力ファイルパスのリスト（指定しない場合は直前の比較処理の集計結果を使用）
+            sqlite_path: 比較結果を保存したSQLiteファイル（指定した場合はここから読み込む）
             
         Returns:
             サマリー情報
         """
+        if sqlite_path is not None:
+            result_store = self._open_result_store(sqlite_path)
+            try:
+                return result_store.get_summary()
+            finally:
+                result_store.close()
+        if output_files is None:
+            return self.summary_aggregator.get_summary()
+        
+        aggregator = SummaryAggregator(self.comparison_service.comparison_fields)
         try:
-            total_records = len(output_files)
-            total_items = 0
-            total_mismatches = 0
-            
-            # 各フィールドの不一致数をカウント
-            field_mismatches = {}
-            comparison_fields = [
-                'finalValue', 'kyuyoKomokuCode', 'kyuyoKomokuKubun',
-                'kyuyoKomokuName', 'order', 'processValue'
-            ]
-            
-            for field in comparison_fields:
-                field_mismatches[field] = 0
-            
-            # 各レコードファイルを処理
-            for output_file in output_files:
-                try:
-                    csv_data = self.csv_reader.read_csv_as_dict(output_file)
-                    total_items += len(csv_data)
-                    
-                    for record in csv_data:
-                        for field in comparison_fields:
-                            is_match_key = f"{field}_is_match"
-                            if is_match_key in record:
-                                # CSVから読み込まれた値は文字列なので、適切に変換
-                                is_match_value = record[is_match_key]
-                                if isinstance(is_match_value, str):
-                                    is_match = is_match_value.lower() == 'true'
-                                else:
-                                    is_match = bool(is_match_value)
-                                
-                                if not is_match:
-                                    field_mismatches[field] += 1
-                                    total_mismatches += 1
-                except Exception as e:
-                    print(f"ファイル {output_file} の処理中にエラー: {e}")
-                    continue
-            
-            return {
-                'total_records': total_records,
-                'total_items': total_items,
-                'total_mismatches': total_mismatches,
-                'field_mismatches': field_mismatches,
-                'mismatch_rate': total_mismatches / total_items * 100 if total_items > 0 else 0
-            }
-            
+            aggregator.add_output_files(output_files)
+            return aggregator.get_summary()
         except Exception as e:
             print(f"サマリー取得中にエラーが発生しました: {e}")
             return {}
+        finally:
+            aggregator.close()
+
+    def _open_result_store(self, sqlite_path: str) -> SqliteResultStore:
+        """比較結果を保存したSQLiteファイルを読み込み用に開く（使用後は close すること）"""
+        if not os.path.exists(sqlite_path):
+            raise FileNotFoundError(f"比較結果データベースが見つかりません: {sqlite_path}")
+        result_store = SqliteResultStore(sqlite_path, self.comparison_service.comparison_fields)
+        result_store.open(reset=False)
+        return result_store
 
     def generate_html_report(
         self, 
-        output_files: List[str], 
+        output_files: Optional[List[str]], 
         before_file_path: str, 
         after_file_path: str, 
-        html_output_path: str = None
+        html_output_path: str = None, 
+        sqlite_path: Optional[str] = None, 
+        page_size: int = 0, 
+        page_by: str = 'row', 
+        html_mode: str = 'table', 
+        compress: bool = False, 
+        compression: Optional[str] = None, 
+        compression_level: Optional[int] = None, 
+        merged_summary: Optional[MergedShardSummary] = None
     ) -> str:
         """
         HTMLレポートを生成
         
         Args:
-            output_files: 出力ファイルパスのリスト
+            output_files: 出力ファイルパスのリスト（Noneの場合は直前の比較処理の集計結果を使用）
             before_file_path: 変更前ファイルパス
             after_file_path: 変更後ファイルパス
             html_output_path: HTML出力ファイルパス（指定しない場合は自動生成）
+            sqlite_path: 比較結果を保存したSQLiteファイル（指定した場合はここから読み込む）
+            page_size: 不一致詳細の1ページあたりの件数（0の場合は1ファイルに出力）
+            page_by: page_size の単位（'row': 不一致の行数、'record': レコード数）
+            html_mode: 表示形式（'table': 1行ずつ <tr> を出力、'virtual': JSONを埋め込み仮想スクロール表示）
+            compress: 'virtual' の場合に埋め込むJSONを gzip + Base64 で圧縮する
+            compression: HTMLファイルの圧縮形式（'gzip' / 'xz'、出力パスに拡張子を付ける）
+            compression_level: HTMLファイルの圧縮レベル（0〜9）
+            merged_summary: 全シャードを統合したサマリー（指定した場合はここから読み込む）
             
         Returns:
-            生成されたHTMLファイルのパス
+            生成されたHTMLファイル（ページ分割時は目次ページ）のパス
         """
         try:
             # ファイル名を取得
@@ -282,18 +1536,65 @@ class ArrayDiffController:
             if html_output_path is None:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 html_output_path = f"DIFF_KYUYOKOMOKU/comparison_report_{timestamp}.html"
+            html_output_path = CompressedFile.add_extension(html_output_path, compression)
             
-            print("HTMLレポートを生成中...")
+            if html_mode == 'virtual':
+                html_generator = VirtualTableHtmlGenerator(
+                    compress, output_compression_level=compression_level
+                )
+            elif html_mode == 'table':
+                html_generator = self.html_generator
+                if compression_level is not None:
+                    html_generator = HtmlGenerator(compression_level)
+            else:
+                raise ValueError(f"不明なHTML表示形式です: {html_mode}")
             
-            # HTMLレポートデータを生成
-            report_data = self.html_report_service.generate_html_report_data(
-                output_files, before_file_name, after_file_name
-            )
+            print("HTMLレポートを生成中...")
             
-            # HTMLファイルを生成
-            html_file_path = self.html_generator.generate_html_report(
-                report_data, html_output_path
-            )
+            # HTMLレポートデータを生成してファイルに書き込む
+            # （不一致詳細は書き込み中に集計元から1件ずつ読み出す）
+            with self._measure('render') as block:
+                if sqlite_path is not None:
+                    result_store = self._open_result_store(sqlite_path)
+                    try:
+                        report_data = self.html_report_service.generate_html_report_data_from_store(
+                            result_store, before_file_name, after_file_name
+                        )
+                        html_file_path = html_generator.generate_html_report(
+                            report_data, html_output_path, page_size, page_by
+                        )
+                    finally:
+                        result_store.close()
+                elif merged_summary is not None:
+                    report_data = self.html_report_service.generate_html_report_data_from_shards(
+                        merged_summary, before_file_name, after_file_name
+                    )
+                    html_file_path = html_generator.generate_html_report(
+                        report_data, html_output_path, page_size, page_by
+                    )
+                elif output_files is None:
+                    report_data = self.html_report_service.generate_html_report_data_from_aggregator(
+                        self.summary_aggregator, before_file_name, after_file_name
+                    )
+                    html_file_path = html_generator.generate_html_report(
+                        report_data, html_output_path, page_size, page_by
+                    )
+                else:
+                    # 出力済みのレコード別CSVを読み直して集計する
+                    aggregator = SummaryAggregator(self.comparison_service.comparison_fields)
+                    try:
+                        aggregator.add_output_files(output_files)
+                        report_data = self.html_report_service.generate_html_report_data_from_aggregator(
+                            aggregator, before_file_name, after_file_name
+                        )
+                        html_file_path = html_generator.generate_html_report(
+                            report_data, html_output_path, page_size, page_by
+                        )
+                    finally:
+                        aggregator.close()
+                if block is not None:
+                    # 不一致詳細の行数を処理件数として記録する
+                    block.items = report_data.summary.total_mismatches
             
             print(f"HTMLレポートを生成しました: {html_file_path}")
             return html_file_path
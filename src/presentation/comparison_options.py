@@ -0,0 +1,65 @@
+"""
+比較処理のオプション定義
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from ..business.comparison_rules import FieldRule
+from ..data.csv_sorter import CsvSorter
+from ..business.shard_summary import ShardSummary
+
+
+# 指定可能な出力形式
+OUTPUT_LAYOUTS: Tuple[str, ...] = ('per-record', 'combined', 'partitioned')
+
+# 一致したデータの出力を省略する単位
+#   row   : 全フィールドが一致した行を出力しない
+#   record: 全項目が一致したレコードを出力しない（不一致があるレコードは全行を出力）
+MISMATCHES_ONLY_MODES: Tuple[str, ...] = ('row', 'record')
+
+
+@dataclass
+class ComparisonOptions:
+    """比較処理のオプション"""
+    # 入力を1件ずつ読み進めてソートマージ結合で比較する
+    stream: bool = False
+    # ストリーミング比較の前に入力を__id__順に外部ソートする
+    external_sort: bool = False
+    # 外部ソートで1つのランに含める最大行数
+    sort_chunk_size: int = CsvSorter.DEFAULT_CHUNK_SIZE
+    # 入力を__id__のハッシュで一時ファイルに分割し、パーティションの組ごとに比較する
+    external_join: bool = False
+    # external_join で1つのパーティションの組を比較するときのメモリ上限（MB）
+    memory_budget_mb: int = 1024
+    # 比較処理に使用するワーカープロセス数（1の場合は逐次処理）
+    workers: int = 1
+    # 出力形式（per-record: レコードごとのCSV / combined: 1つのCSV / partitioned: ハッシュ分割したN個のCSV）
+    output_layout: str = 'per-record'
+    # output_layout が partitioned の場合のファイル数
+    partitions: int = 8
+    # 比較結果を保存するSQLiteファイルのパス（Noneの場合は保存しない）
+    sqlite_path: Optional[str] = None
+    # フィールドごとの比較ルール（Noneの場合は既定のルール）
+    field_rules: Optional[List[FieldRule]] = None
+    # 一致したデータの出力を省略する単位（Noneの場合は全件出力。サマリーには常に全件を集計）
+    mismatches_only: Optional[str] = None
+    # 出力CSVの圧縮形式（'gzip' / 'xz'、Noneの場合は圧縮しない）
+    compression: Optional[str] = None
+    # 出力CSVの圧縮レベル（0〜9、Noneの場合は既定値）
+    compression_level: Optional[int] = None
+    # パース済みスナップショットのキャッシュディレクトリ（Noneの場合はキャッシュしない）
+    snapshot_cache_dir: Optional[str] = None
+    # スナップショットキャッシュの合計サイズの上限（MB）
+    snapshot_cache_max_mb: int = 2048
+    # 前回の出力のマニフェストを使い、入力が変わったレコードだけを比較し直す
+    incremental: bool = False
+    # 比較中の途中経過を出力ディレクトリのジャーナルに記録する（resume で再開できるようにする）
+    checkpoint: bool = False
+    # 前回途中で終了した比較処理を、出力ディレクトリのジャーナルから再開する（再開後もジャーナルを記録する）
+    resume: bool = False
+    # 読み込み・パース・比較・書き込みを重ねて実行する（パース・比較は workers 個のプロセスで行う）
+    pipeline: bool = False
+    # 比較するシャード（シャード番号, シャード数）。__id__のハッシュがこのシャードのレコードだけを比較する
+    shard: Optional[Tuple[int, int]] = None
+    # shard の部分サマリーに保存する不一致数の上位のレコード数
+    top_k: int = ShardSummary.DEFAULT_TOP_K
@@ -0,0 +1,403 @@
+"""
+比較ジョブサーバー
+"""
+import asyncio
+import contextlib
+import dataclasses
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+
+from .array_diff_controller import ArrayDiffController
+from .comparison_options import ComparisonOptions
+
+
+class _HttpError(Exception):
+    """HTTPのエラーレスポンスを返すための例外"""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class ComparisonServer:
+    """変更前ファイルをメモリに保持したまま比較ジョブを受け付けるHTTPサーバー
+
+    同じ変更前ファイルと多数の変更後ファイルを比較する場合に、ジョブごとの
+    インタープリターの起動と変更前ファイルの読み込み・パースを省略する。
+    変更前ファイルは起動時に明細JSONまでパースしてメモリに保持する
+    （ファイルが更新された場合は次のジョブで読み込み直す）。
+
+    エンドポイント:
+        GET  /health: 変更前ファイルとジョブキューの状態をJSONで返す
+        POST /jobs  : 比較ジョブを実行し、完了後にサマリーと出力パスをJSONで返す
+
+    ジョブはキューに入れて1件ずつ順に実行する（コントローラーが集計結果を保持するため）。
+    実行待ちのジョブが queue_size 件ある場合は 503 を返し、クライアントに再試行させる。
+    認証は行わないため、既定ではローカルホストでのみ待ち受ける。
+    """
+
+    # リクエストボディの上限（バイト）
+    MAX_BODY_BYTES = 1024 * 1024
+
+    # リクエストを読み込むまでのタイムアウト（秒）
+    READ_TIMEOUT = 30
+
+    # キューが満杯の場合に再試行までの待ち時間として返す秒数
+    RETRY_AFTER = 5
+
+    # ジョブごとに指定できる比較オプション: リクエストのキー → (ComparisonOptions の属性, 型)
+    JOB_OPTIONS = {
+        'output_layout': ('output_layout', (str,)),
+        'partitions': ('partitions', (int,)),
+        'mismatches_only': ('mismatches_only', (str, type(None))),
+        'compress': ('compression', (str, type(None))),
+        'compress_level': ('compression_level', (int, type(None))),
+        'incremental': ('incremental', (bool,)),
+    }
+
+    # HTMLレポートのオプション: リクエストのキー → (generate_html_report の引数, 型)
+    HTML_OPTIONS = {
+        'html_page_size': ('page_size', (int,)),
+        'html_page_by': ('page_by', (str,)),
+        'html_mode': ('html_mode', (str,)),
+        'html_compress': ('compress', (bool,)),
+    }
+
+    def __init__(
+        self,
+        before_file_path: str,
+        options: ComparisonOptions,
+        output_root: str,
+        host: str = '127.0.0.1',
+        port: int = 8765,
+        queue_size: int = 8
+    ):
+        """
+        Args:
+            before_file_path: 変更前のCSVファイルパス（全ジョブで共通）
+            options: 比較処理のオプションの既定値（JOB_OPTIONS はジョブごとに変更できる）
+            output_root: 出力ディレクトリを指定しないジョブの出力先の親ディレクトリ
+            host: 待ち受けるホスト
+            port: 待ち受けるポート
+            queue_size: 実行待ちにできるジョブ数の上限
+        """
+        if queue_size < 1:
+            raise ValueError(f"キューの上限は1以上を指定してください: {queue_size}")
+        if options.stream or options.external_sort or options.workers > 1:
+            raise ValueError("サーバーではストリーミング比較・並列比較は使用できません")
+
+        self.before_file_path = before_file_path
+        self.options = options
+        self.output_root = output_root
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.controller = ArrayDiffController()
+
+        self._queue: Optional[asyncio.Queue] = None
+        # コントローラーを使うジョブは1件ずつ実行する
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._next_job_id = 1
+        self._running_job_id: Optional[int] = None
+        self._completed = 0
+        self._failed = 0
+        self._baseline_records = 0
+
+    def run(self) -> None:
+        """変更前ファイルを読み込み、停止されるまでジョブを受け付ける"""
+        start_time = time.time()
+        self._log(f"変更前ファイルを読み込み中: {self.before_file_path}")
+        self._baseline_records = len(self.controller.load_baseline(self.before_file_path))
+        self._log(f"変更前レコード数: {self._baseline_records}（{time.time() - start_time:.2f}秒）")
+
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def _serve(self) -> None:
+        """HTTPサーバーとジョブの実行を開始する"""
+        self._queue = asyncio.Queue(self.queue_size)
+        worker = asyncio.ensure_future(self._run_worker())
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self._log(f"http://{self.host}:{self.port}/ でジョブを受け付けています（Ctrl+C で停止）")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            worker.cancel()
+
+    async def _run_worker(self) -> None:
+        """キューのジョブを1件ずつ取り出して実行する"""
+        loop = asyncio.get_running_loop()
+        while True:
+            job, future = await self._queue.get()
+            self._running_job_id = job['job_id']
+            job['started_at'] = time.perf_counter()
+            self._log(f"ジョブ {job['job_id']} を開始: {job['after_file']}")
+            try:
+                result = await loop.run_in_executor(self._executor, self._run_job, job)
+            except Exception as e:
+                self._failed += 1
+                self._log(f"ジョブ {job['job_id']} が失敗しました: {e}")
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                self._completed += 1
+                self._log(f"ジョブ {job['job_id']} が完了しました（{result['elapsed_seconds']:.2f}秒）")
+                if not future.cancelled():
+                    future.set_result(result)
+            finally:
+                self._running_job_id = None
+                self._queue.task_done()
+
+    def _run_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        比較ジョブを実行する（ワーカースレッドで実行）
+
+        Args:
+            job: _create_job で作成したジョブ
+
+        Returns:
+            レスポンスのJSONの内容
+        """
+        start_time = time.perf_counter()
+        # 進捗表示はサーバーのログに出さない
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            output_files = self.controller.process_comparison(
+                self.before_file_path, job['after_file'], job['output_dir'], job['options']
+            )
+            summary = self.controller.get_comparison_summary()
+            mismatch_records = len(self.controller.get_mismatch_record_summaries())
+
+            html_report = None
+            if job['html'] is not None:
+                html_report = self.controller.generate_html_report(
+                    None,
+                    self.before_file_path,
+                    job['after_file'],
+                    compression=job['options'].compression,
+                    compression_level=job['options'].compression_level,
+                    **job['html']
+                )
+
+        return {
+            'job_id': job['job_id'],
+            'status': 'completed',
+            'before_file': self.before_file_path,
+            'after_file': job['after_file'],
+            'output_dir': job['output_dir'],
+            'summary': dict(summary, mismatch_records=mismatch_records),
+            'html_report': html_report,
+            'output_files': output_files,
+            'queued_seconds': round(job['started_at'] - job['queued_at'], 3),
+            'elapsed_seconds': round(time.perf_counter() - start_time, 3),
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """1件のHTTPリクエストを処理する（レスポンス後に接続を閉じる）"""
+        try:
+            try:
+                method, path, body = await asyncio.wait_for(self._read_request(reader), self.READ_TIMEOUT)
+                status, payload, headers = await self._dispatch(method, path, body)
+            except _HttpError as e:
+                status, payload, headers = e.status, {'error': str(e)}, e.headers
+            except asyncio.TimeoutError:
+                status, payload, headers = 408, {'error': 'リクエストの読み込みがタイムアウトしました'}, {}
+            await self._write_response(writer, status, payload, headers)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        """
+        HTTPリクエストを読み込む
+
+        Returns:
+            (メソッド, パス, ボディ)
+        """
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            parts = request_line.split()
+            if len(parts) != 3:
+                raise _HttpError(400, f"不正なリクエストです: {request_line}")
+            method, target, _ = parts
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            # 行が長すぎる・Content-Length が数値でない
+            raise _HttpError(400, "リクエストのヘッダーが不正です")
+
+        if length < 0:
+            raise _HttpError(400, "リクエストのヘッダーが不正です")
+        if length > self.MAX_BODY_BYTES:
+            raise _HttpError(413, f"リクエストボディは{self.MAX_BODY_BYTES}バイト以下にしてください")
+        try:
+            body = await reader.readexactly(length) if length else b''
+        except asyncio.IncompleteReadError:
+            raise _HttpError(400, "リクエストボディが Content-Length より短いです")
+        return method.upper(), target.split('?', 1)[0], body
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        """
+        リクエストを処理する
+
+        Returns:
+            (ステータスコード, レスポンスのJSONの内容, 追加のヘッダー)
+        """
+        if path == '/health':
+            if method != 'GET':
+                raise _HttpError(405, "GET を使用してください", {'Allow': 'GET'})
+            return 200, self._health(), {}
+
+        if path == '/jobs':
+            if method != 'POST':
+                raise _HttpError(405, "POST を使用してください", {'Allow': 'POST'})
+            job = self._create_job(body)
+            future = asyncio.get_running_loop().create_future()
+            try:
+                self._queue.put_nowait((job, future))
+            except asyncio.QueueFull:
+                raise _HttpError(
+                    503,
+                    f"実行待ちのジョブが上限（{self.queue_size}件）に達しています",
+                    {'Retry-After': str(self.RETRY_AFTER)}
+                )
+            self._next_job_id += 1
+            self._log(f"ジョブ {job['job_id']} を受け付けました（実行待ち: {self._queue.qsize()}件）")
+
+            try:
+                return 200, await future, {}
+            except FileNotFoundError as e:
+                raise _HttpError(404, str(e))
+            except ValueError as e:
+                raise _HttpError(400, str(e))
+            except Exception as e:
+                raise _HttpError(500, f"ジョブの実行中にエラーが発生しました: {e}")
+
+        raise _HttpError(404, f"不明なパスです: {path}")
+
+    def _create_job(self, body: bytes) -> Dict[str, Any]:
+        """
+        リクエストボディのJSONからジョブを作成
+
+        Args:
+            body: リクエストボディ
+                after_file（必須）: 変更後のCSVファイルパス
+                output_dir        : 出力ディレクトリ（省略時は output_root/job_<ジョブID>）
+                html              : true の場合はHTMLレポートを生成
+                html_output       : HTML出力ファイルパス（省略時は出力ディレクトリの report.html）
+                JOB_OPTIONS / HTML_OPTIONS のキー: 比較・HTMLレポートのオプション
+
+        Returns:
+            ジョブ
+        """
+        try:
+            request = json.loads(body.decode('utf-8') or '{}')
+        except (UnicodeDecodeError, ValueError) as e:
+            raise _HttpError(400, f"リクエストボディのJSONが不正です: {e}")
+        if not isinstance(request, dict):
+            raise _HttpError(400, "リクエストボディはJSONオブジェクトにしてください")
+
+        unknown = set(request) - {'after_file', 'output_dir', 'html', 'html_output'} - set(self.JOB_OPTIONS) - set(self.HTML_OPTIONS)
+        if unknown:
+            raise _HttpError(400, f"不明なキーです: {', '.join(sorted(unknown))}")
+
+        after_file = self._get_value(request, 'after_file', (str,))
+        if not after_file:
+            raise _HttpError(400, "after_file を指定してください")
+
+        job_id = self._next_job_id
+        output_dir = self._get_value(request, 'output_dir', (str,)) or os.path.join(
+            self.output_root, f'job_{job_id:06d}'
+        )
+
+        overrides = {
+            attribute: self._get_value(request, key, types)
+            for key, (attribute, types) in self.JOB_OPTIONS.items()
+            if key in request
+        }
+        options = dataclasses.replace(self.options, **overrides)
+
+        html = None
+        if self._get_value(request, 'html', (bool,)):
+            html = {
+                argument: self._get_value(request, key, types)
+                for key, (argument, types) in self.HTML_OPTIONS.items()
+                if key in request
+            }
+            html['html_output_path'] = self._get_value(request, 'html_output', (str,)) or os.path.join(
+                output_dir, 'report.html'
+            )
+
+        return {
+            'job_id': job_id,
+            'after_file': after_file,
+            'output_dir': output_dir,
+            'options': options,
+            'html': html,
+            'queued_at': time.perf_counter(),
+        }
+
+    @staticmethod
+    def _get_value(request: Dict[str, Any], key: str, types: Tuple[type, ...]) -> Any:
+        """リクエストの値を型を確認して取得（省略時はNone）"""
+        value = request.get(key)
+        # bool は int のサブクラスのため、int のキーに true / false を指定した場合は不正とする
+        if value is not None and (not isinstance(value, types) or (isinstance(value, bool) and bool not in types)):
+            expected = ' / '.join('null' if t is type(None) else t.__name__ for t in types)
+            raise _HttpError(400, f"{key} の型が不正です（{expected} を指定してください）")
+        return value
+
+    def _health(self) -> Dict[str, Any]:
+        """サーバーの状態"""
+        return {
+            'status': 'ok',
+            'before_file': self.before_file_path,
+            'baseline_records': self._baseline_records,
+            'queued_jobs': self._queue.qsize(),
+            'queue_size': self.queue_size,
+            'running_job_id': self._running_job_id,
+            'completed_jobs': self._completed,
+            'failed_jobs': self._failed,
+        }
+
+    @staticmethod
+    async def _write_response(
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Dict[str, Any],
+        headers: Dict[str, str]
+    ) -> None:
+        """JSONのレスポンスを書き込む"""
+        data = json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8')
+        lines: List[str] = [
+            f'HTTP/1.1 {status} {HTTPStatus(status).phrase}',
+            'Content-Type: application/json; charset=utf-8',
+            f'Content-Length: {len(data)}',
+            'Connection: close',
+        ]
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + data)
+        await writer.drain()
+
+    @staticmethod
+    def _log(message: str) -> None:
+        """サーバーのログを標準エラー出力に表示（標準出力はジョブの実行中に抑制するため）"""
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}", file=sys.stderr, flush=True)
@@ -1,55 +1,132 @@
 """
 HTMLレポート生成器
 """
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sized, TextIO, Tuple
 from pathlib import Path
+from urllib.parse import quote
+import itertools
+import math
 import os
 
-from ..data.html_models import HtmlReportData
+from ..data.compressed_file import CompressedFile
+from ..data.html_models import (
+    HtmlSummaryData,
+    HtmlRecordSummaryData,
+    HtmlMismatchDetailData,
+    HtmlReportData
+)
+
+
+# 不一致詳細ページの分割単位
+#   row   : 不一致詳細の行数で分割する
+#   record: レコード数で分割する（1レコードの行は複数ページにまたがらない）
+PAGE_BY_MODES = ('row', 'record')
 
 
 class HtmlGenerator:
-    """HTMLレポート生成器"""
+    """HTMLレポート生成器
+
+    出力パスの拡張子が .gz / .xz の場合は gzip / xz で逐次圧縮して書き込む
+    （例: report.html.gz、ページ分割時の不一致詳細ページも同じ形式で圧縮する）。
+    """
     
-    def generate_html_report(self, report_data: HtmlReportData, output_path: str) -> str:
+    # ファイルへの書き込みバッファサイズ
+    WRITE_BUFFER_SIZE = 1024 * 1024
+    
+    # 不一致詳細の表の閉じタグ
+    _MISMATCH_DETAIL_TABLE_FOOTER = """
+                </tbody>
+            </table>
+        </section>
+        """
+
+    def __init__(self, output_compression_level: Optional[int] = None):
+        """
+        Args:
+            output_compression_level: 出力ファイルを圧縮する場合の圧縮レベル（0〜9）
+        """
+        self.output_compression_level = output_compression_level
+
+    def generate_html_report(
+        self, 
+        report_data: HtmlReportData, 
+        output_path: str, 
+        page_size: int = 0, 
+        page_by: str = 'row'
+    ) -> str:
         """
         HTMLレポートを生成
         
+        レポート全体を文字列として組み立てず、セクションと行を1つずつファイルに書き込む。
+        record_summaries / mismatch_details はイテレーターでもよく、先頭から1回だけ走査する。
+        
         Args:
             report_data: HTMLレポートデータ
-            output_path: 出力ファイルパス
+            output_path: 出力ファイルパス（ページ分割時は目次ページのパス）
+            page_size: 不一致詳細の1ページあたりの件数（0の場合は1ファイルに出力）
+            page_by: page_size の単位（'row' または 'record'）
             
         Returns:
-            生成されたHTMLファイルのパス
+            生成されたHTMLファイル（ページ分割時は目次ページ）のパス
         """
+        if page_size < 0:
+            raise ValueError(f"ページサイズは0以上を指定してください: {page_size}")
+        if page_by not in PAGE_BY_MODES:
+            raise ValueError(f"不明なページ分割単位です: {page_by}")
+        
         # 出力ディレクトリを作成
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
         
-        # HTMLコンテンツを生成
-        html_content = self._generate_html_content(report_data)
+        if page_size > 0:
+            return self._generate_paginated_report(report_data, output_path, page_size, page_by)
         
-        # ファイルに書き込み
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        # ファイルに逐次書き込み
+        with self._open_output(output_path) as f:
+            self._write_html_content(f, report_data)
         
         return output_path
     
-    def _generate_html_content(self, report_data: HtmlReportData) -> str:
-        """HTMLコンテンツを生成"""
+    def _open_output(self, output_path: str) -> TextIO:
+        """出力ファイルを開く（拡張子が .gz / .xz の場合は圧縮して書き込む）"""
+        return CompressedFile.open_text(
+            output_path, 'w', level=self.output_compression_level, buffering=self.WRITE_BUFFER_SIZE
+        )
+    
+    def _write_html_content(self, f: TextIO, report_data: HtmlReportData) -> None:
+        """HTMLコンテンツを書き込む"""
+        f.write(self._generate_html_header(report_data))
+        f.write(self._generate_summary_section(report_data.summary))
+        f.write("\n            ")
+        self._write_record_summary_section(f, report_data.summary, report_data.record_summaries)
+        f.write("\n            ")
+        self._write_mismatch_detail_section(f, report_data.summary, report_data.mismatch_details)
+        f.write("""
+        </main>
+    </div>
+</body>
+</html>""")
+    
+    def _generate_html_header(
+        self, 
+        report_data: HtmlReportData, 
+        title: str = '配列差分比較レポート', 
+        extra_styles: str = ''
+    ) -> str:
+        """<main> の開始タグまでのHTMLを生成"""
         return f"""<!DOCTYPE html>
 <html lang="ja">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>配列差分比較レポート</title>
+    <title>{title}</title>
     <style>
-        {self._get_css_styles()}
+        {self._get_css_styles()}{extra_styles}
     </style>
 </head>
 <body>
     <div class="container">
         <header>
-            <h1>配列差分比較レポート</h1>
+            <h1>{title}</h1>
             <div class="file-info">
                 <p><strong>変更前ファイル:</strong> {report_data.before_file_name}</p>
                 <p><strong>変更後ファイル:</strong> {report_data.after_file_name}</p>
@@ -58,13 +135,271 @@ class HtmlGenerator:
         </header>
 
         <main>
-            {self._generate_summary_section(report_data.summary)}
-            {self._generate_record_summary_section(report_data.record_summaries)}
-            {self._generate_mismatch_detail_section(report_data.mismatch_details)}
+            """
+    
+    def _generate_paginated_report(
+        self, 
+        report_data: HtmlReportData, 
+        output_path: str, 
+        page_size: int, 
+        page_by: str
+    ) -> str:
+        """
+        目次ページと固定サイズの不一致詳細ページに分けてHTMLレポートを生成
+        
+        不一致詳細ページを先に書き出し、各ページに含まれるレコードを記録してから
+        サマリーとレコードサマリー（各ページへのリンク付き）を目次ページに書き込む。
+        
+        Args:
+            report_data: HTMLレポートデータ
+            output_path: 目次ページのパス
+            page_size: 1ページあたりの件数
+            page_by: page_size の単位（'row' または 'record'）
+            
+        Returns:
+            目次ページのパス
+        """
+        summary = report_data.summary
+        if page_by == 'row':
+            total_pages = math.ceil(summary.total_mismatches / page_size)
+        else:
+            total_pages = math.ceil(
+                (self._count_records(summary, report_data.record_summaries) or 0) / page_size
+            )
+        
+        index_name = os.path.basename(output_path)
+        stem, extension = CompressedFile.split_extension(output_path)
+        
+        # (ファイル名, 先頭レコードID, 末尾レコードID, 行数)
+        pages: List[Tuple[str, str, str, int]] = []
+        record_links: Dict[str, str] = {}
+        
+        page_file: Optional[TextIO] = None
+        page_name = ''
+        first_record_id = last_record_id = None
+        page_rows = page_records = 0
+        
+        try:
+            for detail in report_data.mismatch_details:
+                new_record = detail.record_id != last_record_id
+                if page_file is not None:
+                    if page_by == 'row':
+                        page_full = page_rows >= page_size
+                    else:
+                        page_full = new_record and page_records >= page_size
+                    if page_full:
+                        self._close_detail_page(page_file, index_name, stem, len(pages) + 1, total_pages)
+                        pages.append((page_name, first_record_id, last_record_id, page_rows))
+                        page_file = None
+                
+                if page_file is None:
+                    page_path = self._detail_page_path(stem, extension, len(pages) + 1)
+                    page_name = os.path.basename(page_path)
+                    page_file = self._open_detail_page(
+                        page_path, report_data, index_name, stem, len(pages) + 1, total_pages
+                    )
+                    first_record_id = detail.record_id
+                    page_rows = page_records = 0
+                    new_record = True
+                
+                if new_record:
+                    page_records += 1
+                    record_links.setdefault(detail.record_id, page_name)
+                
+                page_file.write(self._generate_mismatch_detail_row(detail))
+                last_record_id = detail.record_id
+                page_rows += 1
+            
+            if page_file is not None:
+                self._close_detail_page(page_file, index_name, stem, len(pages) + 1, total_pages)
+                pages.append((page_name, first_record_id, last_record_id, page_rows))
+                page_file = None
+        finally:
+            if page_file is not None:
+                page_file.close()
+        
+        with self._open_output(output_path) as f:
+            f.write(self._generate_html_header(report_data, extra_styles=self._get_pagination_css_styles()))
+            f.write(self._generate_summary_section(summary))
+            f.write("\n            ")
+            f.write(self._generate_page_list_section(summary, pages))
+            f.write("\n            ")
+            self._write_record_summary_section(f, summary, report_data.record_summaries, record_links)
+            f.write("""
+        </main>
+    </div>
+</body>
+</html>""")
+        
+        return output_path
+    
+    def _open_detail_page(
+        self, 
+        page_path: str, 
+        report_data: HtmlReportData, 
+        index_name: str, 
+        stem: str, 
+        page_number: int, 
+        total_pages: int
+    ) -> TextIO:
+        """不一致詳細ページを開いて表の行の手前まで書き込む"""
+        f = self._open_output(page_path)
+        try:
+            f.write(self._generate_html_header(
+                report_data, 
+                title=f'不一致詳細 ({page_number} / {total_pages})', 
+                extra_styles=self._get_pagination_css_styles()
+            ))
+            f.write(self._generate_page_navigation(index_name, stem, page_number, total_pages))
+            f.write(f"""
+        <section class="mismatch-detail-section">
+            <h2 class="section-title">不一致詳細</h2>
+            {self._generate_mismatch_detail_table_header()}""")
+        except Exception:
+            f.close()
+            raise
+        return f
+    
+    def _close_detail_page(
+        self, 
+        f: TextIO, 
+        index_name: str, 
+        stem: str, 
+        page_number: int, 
+        total_pages: int
+    ) -> None:
+        """不一致詳細ページの残りを書き込んで閉じる"""
+        try:
+            f.write(self._MISMATCH_DETAIL_TABLE_FOOTER)
+            f.write(self._generate_page_navigation(index_name, stem, page_number, total_pages))
+            f.write("""
         </main>
     </div>
 </body>
-</html>"""
+</html>""")
+        finally:
+            f.close()
+    
+    def _generate_page_navigation(
+        self, 
+        index_name: str, 
+        stem: str, 
+        page_number: int, 
+        total_pages: int
+    ) -> str:
+        """不一致詳細ページのナビゲーションを生成"""
+        links = [f'<a href="{quote(index_name)}">目次に戻る</a>']
+        if page_number > 1:
+            links.append(f'<a href="{self._detail_page_href(stem, index_name, page_number - 1)}">前のページ</a>')
+        links.append(f'<span>{page_number} / {total_pages}</span>')
+        if page_number < total_pages:
+            links.append(f'<a href="{self._detail_page_href(stem, index_name, page_number + 1)}">次のページ</a>')
+        return f"""
+            <nav class="page-nav">
+                {' '.join(links)}
+            </nav>"""
+    
+    def _generate_page_list_section(
+        self, 
+        summary: HtmlSummaryData, 
+        pages: List[Tuple[str, str, str, int]]
+    ) -> str:
+        """不一致詳細ページの一覧セクションを生成"""
+        if not pages:
+            return """
+            <section class="mismatch-detail-section">
+                <h2 class="section-title">不一致詳細</h2>
+                <div class="no-data">不一致はありません。</div>
+            </section>
+            """
+        
+        rows = []
+        for page_number, (page_name, first_record_id, last_record_id, row_count) in enumerate(pages, 1):
+            rows.append(f"""
+                    <tr>
+                        <td><a href="{quote(page_name)}">{page_number}</a></td>
+                        <td>{first_record_id}</td>
+                        <td>{last_record_id}</td>
+                        <td>{row_count:,}</td>
+                    </tr>""")
+        
+        return f"""
+        <section class="mismatch-detail-section">
+            <h2 class="section-title">不一致詳細</h2>
+            <p>総不一致数: <strong>{summary.total_mismatches}</strong>（{len(pages)} ページ）</p>
+            <table class="page-list-table">
+                <thead>
+                    <tr>
+                        <th>ページ</th>
+                        <th>先頭レコードID</th>
+                        <th>末尾レコードID</th>
+                        <th>不一致数</th>
+                    </tr>
+                </thead>
+                <tbody>{''.join(rows)}
+                </tbody>
+            </table>
+        </section>
+        """
+    
+    @staticmethod
+    def _detail_page_path(stem: str, extension: str, page_number: int) -> str:
+        """不一致詳細ページのパスを取得"""
+        return f"{stem}_details_{page_number:04d}{extension or '.html'}"
+    
+    @staticmethod
+    def _detail_page_href(stem: str, index_name: str, page_number: int) -> str:
+        """目次ページと同じディレクトリにある不一致詳細ページへのリンク先を取得"""
+        extension = CompressedFile.split_extension(index_name)[1]
+        page_name = os.path.basename(HtmlGenerator._detail_page_path(stem, extension, page_number))
+        return quote(page_name)
+    
+    @staticmethod
+    def _count_records(summary: HtmlSummaryData, record_summaries: Iterable[Any]) -> Optional[int]:
+        """不一致があるレコード数を取得"""
+        if isinstance(record_summaries, Sized):
+            return len(record_summaries)
+        return summary.mismatch_record_count
+    
+    def _get_pagination_css_styles(self) -> str:
+        """ページ分割時に追加するCSSスタイルを取得"""
+        return """
+        .page-nav {
+            display: flex;
+            gap: 20px;
+            align-items: center;
+            background: white;
+            padding: 15px 30px;
+            border-radius: 10px;
+            margin-bottom: 30px;
+            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.1);
+        }
+        
+        .page-nav a, .record-table a, .page-list-table a {
+            color: #3498db;
+            text-decoration: none;
+            font-weight: bold;
+        }
+        
+        .page-list-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-top: 20px;
+        }
+        
+        .page-list-table th,
+        .page-list-table td {
+            padding: 10px;
+            text-align: left;
+            border-bottom: 1px solid #ddd;
+        }
+        
+        .page-list-table th {
+            background-color: #f8f9fa;
+            font-weight: bold;
+            color: #2c3e50;
+        }
+        """
     
     def _get_css_styles(self) -> str:
         """CSSスタイルを取得"""
@@ -337,20 +672,38 @@ class HtmlGenerator:
             """)
         return ''.join(items)
     
-    def _generate_record_summary_section(self, record_summaries) -> str:
-        """レコードサマリーセクションを生成"""
-        if not record_summaries:
-            return """
+    def _write_record_summary_section(
+        self, 
+        f: TextIO, 
+        summary: HtmlSummaryData, 
+        record_summaries: Iterable[HtmlRecordSummaryData], 
+        record_links: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        レコードサマリーセクションを書き込む
+        
+        Args:
+            f: 書き込み先
+            summary: サマリーデータ
+            record_summaries: レコードサマリーデータ
+            record_links: record_id → 不一致詳細ページのファイル名（ページ分割時のみ）
+        """
+        first, rows = self._peek(record_summaries)
+        if first is None:
+            f.write("""
             <section class="record-summary-section">
                 <h2 class="section-title">個別レコードサマリー</h2>
                 <div class="no-data">不一致があるレコードはありません。</div>
             </section>
-            """
+            """)
+            return
         
-        return f"""
+        record_count = self._count_records(summary, record_summaries)
+        
+        f.write(f"""
         <section class="record-summary-section">
             <h2 class="section-title">個別レコードサマリー（不一致があるレコードのみ）</h2>
-            <p>不一致があるレコード数: <strong>{len(record_summaries)}</strong></p>
+            <p>不一致があるレコード数: <strong>{record_count}</strong></p>
             <table class="record-table">
                 <thead>
                     <tr>
@@ -364,20 +717,23 @@ class HtmlGenerator:
                     </tr>
                 </thead>
                 <tbody>
-                    {self._generate_record_summary_rows(record_summaries)}
+                    """)
+        for record in rows:
+            link = record_links.get(record.record_id) if record_links else None
+            f.write(self._generate_record_summary_row(record, link))
+        f.write("""
                 </tbody>
             </table>
         </section>
-        """
+        """)
     
-    def _generate_record_summary_rows(self, record_summaries) -> str:
-        """レコードサマリー行を生成"""
-        rows = []
-        for record in record_summaries:
-            field_mismatch_text = ', '.join([f"{field}: {count}" for field, count in record.field_mismatches.items() if count > 0])
-            rows.append(f"""
+    def _generate_record_summary_row(self, record: HtmlRecordSummaryData, link: Optional[str] = None) -> str:
+        """レコードサマリー行を生成（link を指定した場合はレコードIDをリンクにする）"""
+        field_mismatch_text = ', '.join([f"{field}: {count}" for field, count in record.field_mismatches.items() if count > 0])
+        record_id = f'<a href="{quote(link)}">{record.record_id}</a>' if link else record.record_id
+        return f"""
                 <tr>
-                    <td>{record.record_id}</td>
+                    <td>{record_id}</td>
                     <td>{record.shain_id}</td>
                     <td>{record.shain_name}</td>
                     <td>{record.total_items:,}</td>
@@ -385,24 +741,38 @@ class HtmlGenerator:
                     <td class="mismatch-rate">{record.mismatch_rate:.2f}%</td>
                     <td>{field_mismatch_text}</td>
                 </tr>
-            """)
-        return ''.join(rows)
+            """
     
-    def _generate_mismatch_detail_section(self, mismatch_details) -> str:
-        """不一致詳細セクションを生成"""
-        if not mismatch_details:
-            return """
+    def _write_mismatch_detail_section(
+        self, 
+        f: TextIO, 
+        summary: HtmlSummaryData, 
+        mismatch_details: Iterable[HtmlMismatchDetailData]
+    ) -> None:
+        """不一致詳細セクションを書き込む"""
+        first, rows = self._peek(mismatch_details)
+        if first is None:
+            f.write("""
             <section class="mismatch-detail-section">
                 <h2 class="section-title">不一致詳細</h2>
                 <div class="no-data">不一致はありません。</div>
             </section>
-            """
+            """)
+            return
         
-        return f"""
+        # 件数は詳細を数え直さずサマリーの総不一致数を使う
+        f.write(f"""
         <section class="mismatch-detail-section">
             <h2 class="section-title">不一致詳細</h2>
-            <p>総不一致数: <strong>{len(mismatch_details)}</strong></p>
-            <table class="mismatch-detail-table">
+            <p>総不一致数: <strong>{summary.total_mismatches}</strong></p>
+            {self._generate_mismatch_detail_table_header()}""")
+        for detail in rows:
+            f.write(self._generate_mismatch_detail_row(detail))
+        f.write(self._MISMATCH_DETAIL_TABLE_FOOTER)
+    
+    def _generate_mismatch_detail_table_header(self) -> str:
+        """不一致詳細の表の行の手前までを生成"""
+        return """<table class="mismatch-detail-table">
                 <thead>
                     <tr>
                         <th>レコードID</th>
@@ -416,17 +786,11 @@ class HtmlGenerator:
                     </tr>
                 </thead>
                 <tbody>
-                    {self._generate_mismatch_detail_rows(mismatch_details)}
-                </tbody>
-            </table>
-        </section>
-        """
+                    """
     
-    def _generate_mismatch_detail_rows(self, mismatch_details) -> str:
+    def _generate_mismatch_detail_row(self, detail: HtmlMismatchDetailData) -> str:
         """不一致詳細行を生成"""
-        rows = []
-        for detail in mismatch_details:
-            rows.append(f"""
+        return f"""
                 <tr>
                     <td>{detail.record_id}</td>
                     <td>{detail.shain_id}</td>
@@ -437,5 +801,21 @@ class HtmlGenerator:
                     <td class="before-value">{detail.before_value}</td>
                     <td class="after-value">{detail.after_value}</td>
                 </tr>
-            """)
-        return ''.join(rows)
+            """
+    
+    @staticmethod
+    def _peek(rows: Iterable[Any]) -> Tuple[Any, Iterator[Any]]:
+        """
+        先頭の要素を取り出して空かどうかを判定する
+        
+        Args:
+            rows: リストまたはイテレーター
+            
+        Returns:
+            (先頭の要素（空の場合はNone）, 先頭の要素を含めて走査できるイテレーター)
+        """
+        iterator = iter(rows)
+        first = next(iterator, None)
+        if first is None:
+            return None, iterator
+        return first, itertools.chain((first,), iterator)
@@ -0,0 +1,417 @@
+"""
+仮想スクロール表示のHTMLレポート生成器
+"""
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+import base64
+import json
+import zlib
+
+from ..data.html_models import HtmlMismatchDetailData, HtmlReportData, HtmlSummaryData
+from .html_generator import HtmlGenerator
+
+
+# HTMLレポートの表示形式
+#   table  : 不一致詳細を1行ずつ <tr> として出力する
+#   virtual: 不一致詳細をJSONとして埋め込み、ブラウザ側で表示範囲の行だけを描画する
+HTML_MODES = ('table', 'virtual')
+
+
+class _EmbeddedJsonWriter:
+    """<script> 要素に埋め込むJSONを書き込むクラス
+
+    compress=True の場合は gzip で圧縮して Base64 に変換しながら書き込む。
+    いずれの場合も全体を文字列として組み立てずに逐次書き込む。
+    """
+
+    # Base64 変換は3バイト単位で行うため、この倍数ごとに書き出す
+    BASE64_CHUNK_SIZE = 3 * 16384
+
+    def __init__(self, f: TextIO, compress: bool, compression_level: int):
+        self._f = f
+        self._compressor = zlib.compressobj(compression_level, zlib.DEFLATED, 31) if compress else None
+        self._pending = b''
+
+    def write(self, text: str) -> None:
+        """JSONの断片を書き込む"""
+        if self._compressor is None:
+            # </script> で要素が閉じられないようにする
+            self._f.write(text.replace('</', '<\\/'))
+            return
+
+        self._pending += self._compressor.compress(text.encode('utf-8'))
+        if len(self._pending) >= self.BASE64_CHUNK_SIZE:
+            size = len(self._pending) - len(self._pending) % 3
+            self._f.write(base64.b64encode(self._pending[:size]).decode('ascii'))
+            self._pending = self._pending[size:]
+
+    def close(self) -> None:
+        """圧縮中のデータを書き出す"""
+        if self._compressor is None:
+            return
+
+        self._pending += self._compressor.flush()
+        self._f.write(base64.b64encode(self._pending).decode('ascii'))
+        self._pending = b''
+
+
+class VirtualTableHtmlGenerator(HtmlGenerator):
+    """仮想スクロール表示のHTMLレポート生成器
+
+    不一致詳細を <tr> の並びではなく1つのJSONとして埋め込み、
+    ブラウザ側で表示範囲の行だけを描画する。レコード・給与項目は
+    辞書化して行からは番号で参照するため、同じ文字列を繰り返し出力しない。
+    レコード・給与項目・フィールドによる絞り込みはブラウザ側で行う。
+
+    埋め込むJSONの形式:
+        rows   : [レコード番号, 給与項目番号, フィールド番号, 変更前値, 変更後値] のリスト
+        records: [レコードID, 社員ID, 社員名] のリスト
+        items  : [給与項目コード, 給与項目名] のリスト
+        fields : フィールド名のリスト
+    """
+
+    # 仮想スクロール表示の1行の高さ（px）
+    ROW_HEIGHT = 36
+
+    # まとめて書き込む行数
+    WRITE_BATCH_SIZE = 1000
+
+    def __init__(
+        self,
+        compress: bool = False,
+        compression_level: int = 6,
+        output_compression_level: Optional[int] = None
+    ):
+        """
+        Args:
+            compress: Trueの場合は埋め込むJSONを gzip + Base64 で圧縮する
+            compression_level: 埋め込むJSONの gzip の圧縮レベル（1〜9）
+            output_compression_level: 出力ファイルを圧縮する場合の圧縮レベル（0〜9）
+        """
+        if not 1 <= compression_level <= 9:
+            raise ValueError(f"圧縮レベルは1〜9を指定してください: {compression_level}")
+
+        super().__init__(output_compression_level)
+
+        self.compress = compress
+        self.compression_level = compression_level
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    def generate_html_report(
+        self,
+        report_data: HtmlReportData,
+        output_path: str,
+        page_size: int = 0,
+        page_by: str = 'row'
+    ) -> str:
+        """
+        HTMLレポートを生成
+
+        Args:
+            report_data: HTMLレポートデータ
+            output_path: 出力ファイルパス
+            page_size: 仮想スクロール表示ではページ分割できないため0のみ指定可能
+            page_by: 未使用
+
+        Returns:
+            生成されたHTMLファイルのパス
+        """
+        if page_size != 0:
+            raise ValueError("仮想スクロール表示のHTMLレポートはページ分割できません")
+        return super().generate_html_report(report_data, output_path)
+
+    def _write_html_content(self, f: TextIO, report_data: HtmlReportData) -> None:
+        """HTMLコンテンツを書き込む"""
+        f.write(self._generate_html_header(report_data, extra_styles=self._get_virtual_table_css_styles()))
+        f.write(self._generate_summary_section(report_data.summary))
+        f.write("\n            ")
+        self._write_record_summary_section(f, report_data.summary, report_data.record_summaries)
+        f.write("\n            ")
+        self._write_virtual_table_section(f, report_data.summary, report_data.mismatch_details)
+        f.write(f"""
+        </main>
+    </div>
+    <script>
+{self._get_virtual_table_script()}
+    </script>
+</body>
+</html>""")
+
+    def _write_virtual_table_section(
+        self,
+        f: TextIO,
+        summary: HtmlSummaryData,
+        mismatch_details: Iterable[HtmlMismatchDetailData]
+    ) -> None:
+        """不一致詳細セクション（仮想スクロール表）と埋め込みデータを書き込む"""
+        encoding = 'gzip-base64' if self.compress else 'json'
+        field_options = ''.join(
+            f'<option value="{field}">{field}</option>' for field in summary.field_mismatches
+        )
+
+        f.write(f"""
+        <section class="mismatch-detail-section">
+            <h2 class="section-title">不一致詳細</h2>
+            <p>総不一致数: <strong>{summary.total_mismatches}</strong> / 表示中: <strong id="vt-count">0</strong></p>
+            <div class="vt-filters">
+                <input type="search" id="vt-filter-record" placeholder="レコードID・社員ID・社員名">
+                <input type="search" id="vt-filter-item" placeholder="給与項目コード・給与項目名">
+                <select id="vt-filter-field"><option value="">すべてのフィールド</option>{field_options}</select>
+            </div>
+            <div class="vt-header vt-row">
+                <div>レコードID</div>
+                <div>社員ID</div>
+                <div>社員名</div>
+                <div>給与項目コード</div>
+                <div>給与項目名</div>
+                <div>フィールド名</div>
+                <div>変更前値</div>
+                <div>変更後値</div>
+            </div>
+            <div class="vt-viewport" id="vt-viewport">
+                <div class="vt-spacer" id="vt-spacer"></div>
+                <div class="vt-rows" id="vt-rows"></div>
+            </div>
+            <div class="no-data" id="vt-loading">読み込み中...</div>
+        </section>
+        <script type="application/json" id="mismatch-data" data-encoding="{encoding}">""")
+
+        writer = _EmbeddedJsonWriter(f, self.compress, self.compression_level)
+        records, items, fields = self._write_rows(writer, summary, mismatch_details)
+        writer.write('],"records":')
+        writer.write(self._encode(records))
+        writer.write(',"items":')
+        writer.write(self._encode(items))
+        writer.write(',"fields":')
+        writer.write(self._encode(fields))
+        writer.write('}')
+        writer.close()
+
+        f.write("</script>")
+
+    def _write_rows(
+        self,
+        writer: _EmbeddedJsonWriter,
+        summary: HtmlSummaryData,
+        mismatch_details: Iterable[HtmlMismatchDetailData]
+    ) -> Tuple[List[List[str]], List[List[str]], List[str]]:
+        """
+        不一致詳細を番号参照の行として書き込む
+
+        Returns:
+            (レコードのリスト, 給与項目のリスト, フィールド名のリスト)
+        """
+        encode = self._encode
+        encode_string = json.encoder.encode_basestring
+        field_numbers = {field: number for number, field in enumerate(summary.field_mismatches)}
+        records: List[List[str]] = []
+        items: List[List[str]] = []
+        item_numbers: Dict[Tuple[str, str], int] = {}
+        last_record_id = None
+
+        writer.write('{"rows":[')
+        batch: List[str] = []
+        separator = ''
+        for detail in mismatch_details:
+            # 不一致詳細はレコードごとにまとまって並んでいる
+            if detail.record_id != last_record_id:
+                records.append([detail.record_id, detail.shain_id, detail.shain_name])
+                last_record_id = detail.record_id
+
+            item_key = (detail.kyuyo_komoku_code, detail.kyuyo_komoku_name)
+            item_number = item_numbers.get(item_key)
+            if item_number is None:
+                item_number = item_numbers[item_key] = len(items)
+                items.append(list(item_key))
+
+            field_number = field_numbers.get(detail.field_name)
+            if field_number is None:
+                field_number = field_numbers[detail.field_name] = len(field_numbers)
+
+            before_value, after_value = detail.before_value, detail.after_value
+            batch.append(
+                f'[{len(records) - 1},{item_number},{field_number},'
+                f'{encode_string(before_value) if type(before_value) is str else encode(before_value)},'
+                f'{encode_string(after_value) if type(after_value) is str else encode(after_value)}]'
+            )
+            if len(batch) >= self.WRITE_BATCH_SIZE:
+                writer.write(separator + ','.join(batch))
+                batch.clear()
+                separator = ','
+
+        if batch:
+            writer.write(separator + ','.join(batch))
+
+        return records, items, list(field_numbers)
+
+    def _get_virtual_table_css_styles(self) -> str:
+        """仮想スクロール表示のCSSスタイルを取得"""
+        return f"""
+        .vt-filters {{
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 10px;
+            margin: 20px 0 10px;
+        }}
+
+        .vt-filters input,
+        .vt-filters select {{
+            padding: 8px;
+            border: 1px solid #ddd;
+            border-radius: 5px;
+            font-size: 0.9em;
+        }}
+
+        .vt-row {{
+            display: grid;
+            grid-template-columns: 1.2fr 1fr 1fr 1fr 1.2fr 1fr 1fr 1fr;
+            height: {self.ROW_HEIGHT}px;
+            align-items: center;
+            border-bottom: 1px solid #ddd;
+            font-size: 0.9em;
+        }}
+
+        .vt-row > div {{
+            padding: 0 10px;
+            overflow: hidden;
+            white-space: nowrap;
+            text-overflow: ellipsis;
+        }}
+
+        .vt-header {{
+            background-color: #f8f9fa;
+            font-weight: bold;
+            color: #2c3e50;
+        }}
+
+        .vt-viewport {{
+            position: relative;
+            height: 600px;
+            overflow-y: auto;
+        }}
+
+        .vt-rows {{
+            position: absolute;
+            top: 0;
+            left: 0;
+            right: 0;
+        }}
+
+        .vt-rows .vt-row:hover {{
+            background-color: #f5f5f5;
+        }}
+
+        .vt-rows .before-value,
+        .vt-rows .after-value {{
+            font-weight: bold;
+        }}
+        """
+
+    def _get_virtual_table_script(self) -> str:
+        """仮想スクロール表示と絞り込みのスクリプトを取得"""
+        return """
+        (function () {
+            const ROW_HEIGHT = %d;
+            const OVERSCAN = 20;
+            const viewport = document.getElementById('vt-viewport');
+            const spacer = document.getElementById('vt-spacer');
+            const rowsElement = document.getElementById('vt-rows');
+            const countElement = document.getElementById('vt-count');
+            const loading = document.getElementById('vt-loading');
+            const filterRecord = document.getElementById('vt-filter-record');
+            const filterItem = document.getElementById('vt-filter-item');
+            const filterField = document.getElementById('vt-filter-field');
+            let data = null;
+            let visible = new Int32Array(0);
+            let renderedStart = -1;
+
+            async function loadData() {
+                const element = document.getElementById('mismatch-data');
+                let text = element.textContent;
+                if (element.dataset.encoding === 'gzip-base64') {
+                    const binary = atob(text.trim());
+                    const bytes = new Uint8Array(binary.length);
+                    for (let i = 0; i < binary.length; i++) {
+                        bytes[i] = binary.charCodeAt(i);
+                    }
+                    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+                    text = await new Response(stream).text();
+                }
+                return JSON.parse(text);
+            }
+
+            function applyFilters() {
+                const recordQuery = filterRecord.value.trim().toLowerCase();
+                const itemQuery = filterItem.value.trim().toLowerCase();
+                const fieldQuery = filterField.value === '' ? -1 : data.fields.indexOf(filterField.value);
+                const recordMatches = data.records.map(record =>
+                    recordQuery === '' || record.some(value => String(value).toLowerCase().includes(recordQuery)));
+                const itemMatches = data.items.map(item =>
+                    itemQuery === '' || item.some(value => String(value).toLowerCase().includes(itemQuery)));
+                const matched = new Int32Array(data.rows.length);
+                let count = 0;
+                for (let i = 0; i < data.rows.length; i++) {
+                    const row = data.rows[i];
+                    if (recordMatches[row[0]] && itemMatches[row[1]] && (fieldQuery < 0 || row[2] === fieldQuery)) {
+                        matched[count++] = i;
+                    }
+                }
+                visible = matched.subarray(0, count);
+                countElement.textContent = count.toLocaleString();
+                spacer.style.height = (count * ROW_HEIGHT) + 'px';
+                viewport.scrollTop = 0;
+                renderedStart = -1;
+                render();
+            }
+
+            function createCell(text, className) {
+                const cell = document.createElement('div');
+                cell.textContent = text;
+                cell.title = text;
+                if (className) {
+                    cell.className = className;
+                }
+                return cell;
+            }
+
+            function render() {
+                const start = Math.max(0, Math.floor(viewport.scrollTop / ROW_HEIGHT) - OVERSCAN);
+                if (start === renderedStart) {
+                    return;
+                }
+                renderedStart = start;
+                const end = Math.min(visible.length, start + Math.ceil(viewport.clientHeight / ROW_HEIGHT) + OVERSCAN * 2);
+                const fragment = document.createDocumentFragment();
+                for (let i = start; i < end; i++) {
+                    const row = data.rows[visible[i]];
+                    const record = data.records[row[0]];
+                    const item = data.items[row[1]];
+                    const line = document.createElement('div');
+                    line.className = 'vt-row';
+                    line.append(
+                        createCell(record[0]), createCell(record[1]), createCell(record[2]),
+                        createCell(item[0]), createCell(item[1]), createCell(data.fields[row[2]]),
+                        createCell(row[3], 'before-value'), createCell(row[4], 'after-value'));
+                    fragment.appendChild(line);
+                }
+                rowsElement.style.transform = 'translateY(' + (start * ROW_HEIGHT) + 'px)';
+                rowsElement.replaceChildren(fragment);
+            }
+
+            let filterTimer = null;
+            function scheduleFilters() {
+                clearTimeout(filterTimer);
+                filterTimer = setTimeout(applyFilters, 200);
+            }
+
+            loadData().then(loaded => {
+                data = loaded;
+                loading.remove();
+                viewport.addEventListener('scroll', () => requestAnimationFrame(render));
+                filterRecord.addEventListener('input', scheduleFilters);
+                filterItem.addEventListener('input', scheduleFilters);
+                filterField.addEventListener('change', applyFilters);
+                applyFilters();
+            }).catch(error => {
+                loading.textContent = '不一致詳細の読み込みに失敗しました: ' + error;
+            });
+        })();""" % self.ROW_HEIGHT